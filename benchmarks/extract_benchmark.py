@@ -0,0 +1,98 @@
+"""
+Compare the HTML extraction backends in src/extract.py on a corpus of saved pages.
+
+Usage:
+    python benchmarks/extract_benchmark.py path/to/html_corpus [--repeat 5]
+    python benchmarks/extract_benchmark.py --save path/to/html_corpus https://example.com ...
+
+Reports pages/s, MB/s and peak traced memory (tracemalloc) per backend.
+Without a corpus directory, a synthetic 2 MB landing page is used.
+"""
+import sys
+import time
+import argparse
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent / "src"))
+
+from extract import EXTRACTORS, extract_page_text  # noqa: E402
+
+
+def synthetic_page() -> bytes:
+    body = "".join(
+        f"<section><h2>Feature {i}</h2><p>Our platform  helps teams ship {i}x faster.</p>"
+        f"<script>window.__data_{i} = {{}};</script></section>\n"
+        for i in range(20000)
+    )
+    return (
+        "<html><head><title>Synthetic Startup</title>"
+        "<meta name='description' content='A very long landing page'></head>"
+        f"<body><nav>Home Pricing Blog</nav>{body}<footer>(c) 2024</footer></body></html>"
+    ).encode("utf-8")
+
+
+def load_corpus(directory: str) -> list:
+    if not directory:
+        return [("synthetic.html", synthetic_page())]
+    pages = [(p.name, p.read_bytes()) for p in sorted(Path(directory).glob("*.htm*"))]
+    if not pages:
+        sys.exit(f"No .html files found in {directory}")
+    return pages
+
+
+def save_pages(directory: str, urls: list):
+    from fetch import default_fetcher
+
+    fetcher = default_fetcher()
+    Path(directory).mkdir(parents=True, exist_ok=True)
+    for i, url in enumerate(urls):
+        path = Path(directory) / f"page_{i:03d}.html"
+        path.write_bytes(fetcher.get(url))
+        print(f"saved {url} -> {path}")
+
+
+def bench(extract, pages: list, repeat: int) -> dict:
+    total_bytes = sum(len(content) for _, content in pages) * repeat
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        for _, content in pages:
+            extract(content)
+    elapsed = time.perf_counter() - started
+
+    tracemalloc.start()
+    for _, content in pages:
+        extract(content)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "pages_per_s": len(pages) * repeat / elapsed,
+        "mb_per_s": total_bytes / elapsed / 1e6,
+        "peak_mb": peak / 1e6
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", nargs="?", help="directory of saved .html pages")
+    parser.add_argument("urls", nargs="*", help="with --save: pages to download into the corpus")
+    parser.add_argument("--save", action="store_true", help="download URLs into the corpus directory and exit")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    if args.save:
+        save_pages(args.corpus, args.urls)
+        return
+
+    pages = load_corpus(args.corpus)
+    print(f"{len(pages)} pages, {sum(len(c) for _, c in pages) / 1e6:.2f} MB, repeat={args.repeat}\n")
+    print(f"{'BACKEND':<10}{'PAGES/S':>12}{'MB/S':>10}{'PEAK MB':>10}")
+    for name in EXTRACTORS:
+        result = bench(lambda content: extract_page_text(content, backend=name), pages, args.repeat)
+        print(f"{name:<10}{result['pages_per_s']:>12.1f}{result['mb_per_s']:>10.1f}{result['peak_mb']:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
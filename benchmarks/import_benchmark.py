@@ -0,0 +1,80 @@
+"""
+Measure the cold-start cost of src/agent.py.
+
+Usage:
+    python benchmarks/import_benchmark.py [--repeat 5] [--top 15]
+
+Each scenario runs in a fresh interpreter, so nothing is already in sys.modules:
+  import      - `import agent` alone (what ui/app.py and batch.py pay up front)
+  graph       - plus compiling the checkpointed graph
+  everything  - plus the Gemini client, tools and async graph (what the old eager import cost)
+Reports the median wall time per scenario and the heaviest modules from `python -X importtime`.
+"""
+import os
+import sys
+import time
+import argparse
+import statistics
+import subprocess
+from pathlib import Path
+
+SRC = Path(__file__).parent.parent / "src"
+
+SCENARIOS = {
+    "import": "import agent",
+    "graph": "import agent; agent.get_app()",
+    "everything": "import agent; agent.get_llm(); agent.get_tools(); agent.get_app(); agent.get_async_app()"
+}
+
+
+def child_env() -> dict:
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [str(SRC), env.get("PYTHONPATH")]))
+    # Building the client needs a key but makes no request
+    env.setdefault("GOOGLE_API_KEY", "benchmark-placeholder")
+    return env
+
+
+def time_scenario(code: str, repeat: int) -> list:
+    runs = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", code], env=child_env(), check=True, capture_output=True)
+        runs.append(time.perf_counter() - started)
+    return runs
+
+
+def heaviest_imports(code: str, top: int) -> list:
+    """(cumulative seconds, module) for the slowest imports at any depth, from -X importtime"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            env=child_env(), check=True, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        rows.append((int(cumulative) / 1e6, name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="heaviest imports to list per scenario")
+    args = parser.parse_args()
+
+    baseline = statistics.median(time_scenario("pass", args.repeat))
+    print(f"interpreter startup: {baseline * 1000:.0f} ms (subtracted below)\n")
+    print(f"{'SCENARIO':<12}{'MEDIAN MS':>12}{'MIN MS':>10}")
+    for name, code in SCENARIOS.items():
+        runs = time_scenario(code, args.repeat)
+        print(f"{name:<12}{(statistics.median(runs) - baseline) * 1000:>12.0f}{(min(runs) - baseline) * 1000:>10.0f}")
+
+    for name in ("import", "everything"):
+        print(f"\nheaviest imports ({name}):")
+        for seconds, module in heaviest_imports(SCENARIOS[name], args.top):
+            print(f"  {seconds * 1000:>8.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
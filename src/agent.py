@@ -1,40 +1,246 @@
 import os
+import sys
+import re
 import json
-from typing import TypedDict, List
+import time
+import asyncio
+import uuid
+import weakref
+import sqlite3
+import operator
+import hashlib
+import functools
+import threading
+import contextvars
+from contextlib import aclosing, closing, contextmanager
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import TYPE_CHECKING, TypedDict, List, Annotated, Optional
 from dotenv import load_dotenv
 
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage, SystemMessage
-from langchain.tools import Tool
-from langchain_community.utilities import GoogleSerperAPIWrapper
-
-from langgraph.graph import StateGraph, END
-
-import PyPDF2
-import requests
-from bs4 import BeautifulSoup
+from cache import DiskCache, SingleFlight, cached_llm, hash_key
+from ratelimit import is_retryable, rate_limited
+from budget import fit_sections, format_budget_report
+from prompt_registry import PromptRegistry
+from context_cache import context_cache_from_env
+from condense import condense_tool_results
+from evidence import evidence_for
+from knowledge import format_knowledge, knowledge_base_from_env
+from schemas import REPORTS, MarketReport, ProductReport, TractionReport, structured_output, validate_report
+from paths import DATA_DIR
+
+# langchain, langgraph, PyPDF2 and the HTTP/HTML stacks are imported where they are first used,
+# and the clients, tools and graphs below are built on first use, so importing this module is cheap
+# (benchmarks/import_benchmark.py) and a missing API key only fails the first LLM call
+if TYPE_CHECKING:
+    from langgraph.graph import StateGraph
+    from langgraph.checkpoint.sqlite import SqliteSaver
 
 load_dotenv()
 
 # llm setup - Google Gemini 2.5 Flash
 MODEL_NAME = "gemini-2.5-flash"
 
-# Check if API key is set
-if not os.getenv("GOOGLE_API_KEY"):
-    raise ValueError("GOOGLE_API_KEY environment variable is not set. Please set your Google API key.")
+_build_lock = threading.RLock()
+
+
+def lazy(build):
+    """Turn a zero-argument builder into a getter that builds once, on first call, even if threads race for it"""
+    built = functools.lru_cache(maxsize=None)(build)
+
+    @functools.wraps(build)
+    def get():
+        with _build_lock:
+            return built()
+
+    get.cache_clear = built.cache_clear
+    return get
+
+
+# Gemini settings; together with the API keys they identify a client configuration
+MODEL_SETTINGS = {"model": MODEL_NAME, "temperature": 0.3, "max_tokens": 4000}
+
+
+def key_fingerprint(key: Optional[str]) -> str:
+    """Short one-way id of an API key, safe to put in cache keys and logs"""
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()[:12] if key else "unset"
+
+
+def resources_key(google_api_key: Optional[str], serper_api_key: Optional[str],
+                  model_settings: dict = MODEL_SETTINGS) -> tuple:
+    return key_fingerprint(google_api_key), key_fingerprint(serper_api_key), tuple(sorted(model_settings.items()))
+
+
+class DealResources:
+    """
+    The clients one configuration (API keys + model settings) needs: the Gemini client behind
+    its rate limiter and response cache, the deal context cache and the Serper wrapper.
+    Built once per configuration and shared by every run that uses it (see resources_for()).
+    """
+
+    def __init__(self, google_api_key: Optional[str], serper_api_key: Optional[str],
+                 model_settings: dict = MODEL_SETTINGS):
+        from langchain_google_genai import ChatGoogleGenerativeAI
+
+        # Check if API key is set
+        if not google_api_key:
+            raise ValueError("GOOGLE_API_KEY environment variable is not set. Please set your Google API key.")
+
+        self.key = resources_key(google_api_key, serper_api_key, model_settings)
+        model = model_settings["model"]
+        llm = ChatGoogleGenerativeAI(
+            **model_settings,
+            google_api_key=google_api_key,
+            max_retries=1  # retries and backoff are done by the rate limiter below
+        )
+
+        # Gemini quota (DEALSCOUT_LLM_RPM / DEALSCOUT_LLM_TPM) is per API key, shared by every thread
+        # and process using it, and 429/5xx errors are retried with backoff
+        self.rate_limited_llm = rate_limited(llm, scope=f"{model}:{key_fingerprint(google_api_key)}")
+        self.llm_limiter = self.rate_limited_llm.limiter
+
+        # Identical requests are answered from the on-disk cache (DEALSCOUT_LLM_CACHE=0 disables it);
+        # cache hits never touch the quota
+        self.llm = cached_llm(self.rate_limited_llm)
+
+        # The deal's pitch (and later its reports) uploaded once as Gemini cached content and referenced
+        # by handle (DEALSCOUT_CONTEXT_CACHE=gemini, or fake to run offline; off by default)
+        self.context_cache = context_cache_from_env(model, google_api_key)
+
+        self.search = None
+        if serper_api_key:
+            from langchain_community.utilities import GoogleSerperAPIWrapper
+            self.search = GoogleSerperAPIWrapper(serper_api_key=serper_api_key)
+
+
+_resources = {}
+
+
+def resources_for(google_api_key: Optional[str], serper_api_key: Optional[str],
+                  model_settings: dict = MODEL_SETTINGS) -> DealResources:
+    """The DealResources for this configuration, built on first request"""
+    key = resources_key(google_api_key, serper_api_key, model_settings)
+    with _build_lock:
+        if key not in _resources:
+            print(f"   Building clients for Gemini key {key[0]}, Serper key {key[1]}")
+            _resources[key] = DealResources(google_api_key, serper_api_key, model_settings)
+        return _resources[key]
+
+
+# Resources bound to the current run (see using_resources); LangGraph and asyncio copy it into node threads and tasks
+active_resources = contextvars.ContextVar("dealscout_resources", default=None)
+
+
+@contextmanager
+def using_resources(resources: Optional[DealResources]):
+    """Run the enclosed graph calls with these resources (None keeps the default)"""
+    if resources is None:
+        yield
+        return
+    token = active_resources.set(resources)
+    try:
+        yield
+    finally:
+        active_resources.reset(token)
+
+
+def get_resources() -> DealResources:
+    """The resources bound to this run, or else those for the API keys currently in the environment"""
+    return active_resources.get() or resources_for(os.getenv("GOOGLE_API_KEY"), os.getenv("SERPER_API_KEY"))
+
+
+def get_llm():
+    return get_resources().llm
+
+
+def get_llm_limiter():
+    return get_resources().llm_limiter
+
 
-llm = ChatGoogleGenerativeAI(
-    model=MODEL_NAME,
-    temperature=0.3,
-    max_tokens=4000,
-    google_api_key=os.getenv("GOOGLE_API_KEY")
-)
+def get_context_cache():
+    return get_resources().context_cache
 
 
 # tools setup
 
+# Evidence index of the deal the current node belongs to (see evidence_node); the tools consult it first
+active_evidence = contextvars.ContextVar("dealscout_evidence", default=None)
+
+
 # tool 1: google search
-search = GoogleSerperAPIWrapper() if os.getenv("SERPER_API_KEY") else None
+def get_search():
+    return get_resources().search
+
+
+# Serper results are cached on disk by normalized query, and identical in-flight queries share one request
+@lazy
+def get_search_cache() -> DiskCache:
+    return DiskCache.named(
+        "search",
+        ttl_seconds=float(os.getenv("DEALSCOUT_SEARCH_CACHE_TTL", 24 * 3600)),
+        max_bytes=64 * 1024 * 1024
+    )
+
+
+search_flight = SingleFlight()
+
+def normalize_query(query: str) -> str:
+    """Case, punctuation and whitespace don't change the search cache key; word order does (Serper ranks by it)"""
+    words = re.sub(r"[^\w\s$%.-]", " ", query.lower()).split()
+    return " ".join(words)
+
+def search_cache_key(query: str) -> str:
+    search = get_search()
+    return hash_key({
+        "query": normalize_query(query),
+        "gl": getattr(search, "gl", None),
+        "hl": getattr(search, "hl", None),
+        "k": getattr(search, "k", None)
+    })
+
+def cached_search_results(query: str) -> dict:
+    """search.results(query) through the search cache"""
+    search_cache = get_search_cache()
+    key = search_cache_key(query)
+    cached = search_cache.get(key)
+    if cached is not None:
+        return json.loads(cached)
+    
+    def fetch():
+        # Another thread may have stored it while we waited to lead
+        cached = search_cache.get(key)
+        if cached is not None:
+            return json.loads(cached)
+        results = get_search().results(query)
+        search_cache.put(key, json.dumps(results))
+        return results
+    
+    return search_flight.do(key, fetch)
+
+async def acached_search_results(query: str) -> dict:
+    """Async variant of cached_search_results"""
+    search_cache = get_search_cache()
+    key = search_cache_key(query)
+    cached = await asyncio.to_thread(search_cache.get, key)
+    if cached is not None:
+        return json.loads(cached)
+    
+    async def fetch():
+        # A flight that just finished may have stored it after our lookup
+        cached = await asyncio.to_thread(search_cache.get, key)
+        if cached is not None:
+            return json.loads(cached)
+        results = await get_search().aresults(query)
+        await asyncio.to_thread(search_cache.put, key, json.dumps(results))
+        return results
+    
+    return await search_flight.ado(key, fetch)
+
+def format_search_results(results: dict) -> str:
+    """Format the top organic Serper results as numbered text"""
+    output = []
+    for i, result in enumerate(results.get('organic', [])[:5], 1):
+        output.append(f"{i}. {result.get('title', 'No title')}\n   {result.get('snippet', 'No snippet')}\n   {result.get('link', '')}")
+    return "\n\n".join(output) if output else "No results found"
 
 def google_search_tool(query: str = None, **kwargs) -> str:
     """Search Google for current information"""
@@ -45,19 +251,59 @@ def google_search_tool(query: str = None, **kwargs) -> str:
     if not query:
         return "Error: No search query provided"
     
-    if not search:
+    evidence = active_evidence.get()
+    local = evidence.answer(normalize_query(query)) if evidence else None
+    if local is not None:
+        return local
+    
+    if not get_search():
         return "Google Search not configured. Set SERPER_API_KEY in .env"
     try:
-        results = search.results(query)
-        
-        output = []
-        for i, result in enumerate(results.get('organic', [])[:5], 1):
-            output.append(f"{i}. {result.get('title', 'No title')}\n   {result.get('snippet', 'No snippet')}\n   {result.get('link', '')}")
-        return "\n\n".join(output) if output else "No results found"
+        results = format_search_results(cached_search_results(query))
     except Exception as e:
         return f"Search error: {str(e)}"
+    if evidence:
+        evidence.add_search(normalize_query(query), results)
+    return results
+
+async def agoogle_search_tool(query: str = None, **kwargs) -> str:
+    """Async variant of google_search_tool"""
+    
+    if query is None and kwargs:
+        query = kwargs.get('query') or kwargs.get('__arg1')
+    
+    if not query:
+        return "Error: No search query provided"
+    
+    evidence = active_evidence.get()
+    local = evidence.answer(normalize_query(query)) if evidence else None
+    if local is not None:
+        return local
+    
+    if not get_search():
+        return "Google Search not configured. Set SERPER_API_KEY in .env"
+    try:
+        results = format_search_results(await acached_search_results(query))
+    except Exception as e:
+        return f"Search error: {str(e)}"
+    if evidence:
+        evidence.add_search(normalize_query(query), results)
+    return results
 
 # tool 2: web scraper
+# Pooled keep-alive session plus an ETag/Last-Modified aware page cache (see fetch.py)
+@lazy
+def get_page_fetcher():
+    from fetch import default_fetcher
+    return default_fetcher()
+
+
+def normalize_url(url: str) -> str:
+    """Ensure URL starts with http"""
+    if not url.startswith(('http://', 'https://')):
+        url = 'https://' + url
+    return url
+
 def scrape_website_tool(url: str = None, **kwargs) -> str:
     """Scrape and extract text from a website"""
     
@@ -67,84 +313,98 @@ def scrape_website_tool(url: str = None, **kwargs) -> str:
     if not url:
         return "Error: No URL provided"
     
-    # Ensure URL starts with http
-    if not url.startswith(('http://', 'https://')):
-        url = 'https://' + url
+    url = normalize_url(url)
     
+    evidence = active_evidence.get()
+    local = evidence.page(url) if evidence else None
+    if local is not None:
+        return local
+    
+    from extract import extract_page_text
+
     try:
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=15)
-        response.raise_for_status()
-        
-        soup = BeautifulSoup(response.content, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style", "nav", "footer"]):
-            script.decompose()
-        
-        # Try to get meta description
-        meta_desc = ""
-        meta = soup.find("meta", attrs={"name": "description"}) or soup.find("meta", attrs={"property": "og:description"})
-        if meta:
-            meta_desc = meta.get("content", "")
-        
-        # Get title
-        title = soup.find("title")
-        title_text = title.get_text().strip() if title else ""
-        
-        # Get main content
-        text = soup.get_text()
-        
-        # Clean up text
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = '\n'.join(chunk for chunk in chunks if chunk)
-        
-        # Combine title, meta description, and content
-        result = ""
-        if title_text:
-            result += f"Title: {title_text}\n\n"
-        if meta_desc:
-            result += f"Description: {meta_desc}\n\n"
-        result += f"Content:\n{text[:5000]}"
-        
-        return result if len(result) > 100 else f"Title: {title_text}\n\nContent:\n{text[:3000]}"
+        # The extractor parses chunks as they stream in; once its text budget is full we stop downloading
+        with closing(get_page_fetcher().iter_page(url, prefix_ok=True)) as chunks:
+            text = extract_page_text(chunks)
+    except Exception as e:
+        return f"Error scraping {url}: {str(e)}"
+    if evidence:
+        evidence.add_page(url, text)
+    return text
+
+async def ascrape_website_tool(url: str = None, **kwargs) -> str:
+    """Async variant of scrape_website_tool using a pooled, streaming httpx client"""
+    
+    if url is None and kwargs:
+        url = kwargs.get('url') or kwargs.get('__arg1')
+    
+    if not url:
+        return "Error: No URL provided"
+    
+    url = normalize_url(url)
+    
+    evidence = active_evidence.get()
+    local = evidence.page(url) if evidence else None
+    if local is not None:
+        return local
+    
+    from extract import new_extractor
+
+    try:
+        # Each chunk is at most DOWNLOAD_CHUNK bytes, so incremental parsing on the loop stays cheap
+        extractor = new_extractor()
+        async with aclosing(get_page_fetcher().aiter_page(url, prefix_ok=True)) as chunks:
+            async for chunk in chunks:
+                if extractor.feed(chunk):
+                    break
+        text = extractor.close()
     except Exception as e:
         return f"Error scraping {url}: {str(e)}"
+    if evidence:
+        evidence.add_page(url, text)
+    return text
 
 # tool 3: pdf parser
 def extract_text_from_pdf(pdf_path: str) -> str:
-    """Extract text from PDF file"""
+    """Extract text from PDF file (memory-mapped, parallel for large decks, cached by content; see ingest.py)"""
+    from ingest import extract_pdf
+
     try:
-        with open(pdf_path, 'rb') as file:
-            reader = PyPDF2.PdfReader(file)
-            text = ""
-            for page in reader.pages:
-                text += page.extract_text() + "\n"
-            return text
+        return extract_pdf(pdf_path)["text"]
     except Exception as e:
         return f"Error reading PDF: {str(e)}"
 
 # creating langchain tools
 
-tools = [
-    Tool(
-        name="GoogleSearch",
-        func=google_search_tool,
-        description="Search Google for current information about companies, markets, competitors, or news. Input should be a search query string."
-    ),
-    Tool(
-        name="WebScraper",
-        func=scrape_website_tool,
-        description="Scrape and read the content of a website. Input should be a valid URL starting with http:// or https://"
-    )
-]
+@lazy
+def get_tools() -> list:
+    from langchain.tools import Tool
+
+    return [
+        Tool(
+            name="GoogleSearch",
+            func=google_search_tool,
+            coroutine=agoogle_search_tool,
+            description="Search Google for current information about companies, markets, competitors, or news. Input should be a search query string."
+        ),
+        Tool(
+            name="WebScraper",
+            func=scrape_website_tool,
+            coroutine=ascrape_website_tool,
+            description="Scrape and read the content of a website. Input should be a valid URL starting with http:// or https://"
+        )
+    ]
+
+# prompt templates (prompts/*.md), compiled once at startup and reloaded when edited
+
+PROMPTS = PromptRegistry()
+PROMPTS.load_all()
+
 
 # agent state definition
 
 class DealState(TypedDict):
+    deal_id: str  # Set once when the deal enters the graph (see deal_entry_node); keys its evidence and knowledge
     company_name: str
     company_url: str
     raw_input: str  # Original user input (could be pitch deck or minimal info)
@@ -152,144 +412,382 @@ class DealState(TypedDict):
     market_analysis: str
     product_analysis: str
     traction_analysis: str
+    market_data: dict  # The analysts' reports parsed against their schemas (schemas.py); {} if unavailable
+    product_data: dict
+    traction_data: dict
     debate_transcript: str
     final_memo: str
     questions_to_reconsider: str
+    node_timings: Annotated[List[dict], operator.add]  # Appended by every node; parallel-safe
+    node_fingerprints: Annotated[dict, operator.or_]  # Node -> hash of the inputs its output was built from
+    failed_nodes: Annotated[dict, operator.or_]  # Node -> why its last run failed ("" once it succeeds)
+    prompt_budget: Annotated[List[dict], operator.add]  # Token usage of each budgeted prompt
 
-# agent nodes with tools
+# tool-calling round shared by the research and analyst agents
 
-def research_company_node(state: DealState):
+ANALYST_RESULT_FORMAT = "Tool {name} result: {result}"
+ANALYST_FOLLOWUP = "Tool results:\n{results}\n\nNow provide your final analysis as JSON."
+
+
+# Tool calls from one LLM turn run side by side on a bounded pool shared by all nodes
+TOOL_MAX_WORKERS = int(os.getenv("DEALSCOUT_TOOL_WORKERS", "8"))
+TOOL_CALL_TIMEOUT = float(os.getenv("DEALSCOUT_TOOL_TIMEOUT", "20"))
+
+tool_executor = ThreadPoolExecutor(max_workers=TOOL_MAX_WORKERS, thread_name_prefix="dealscout-tool")
+
+# An asyncio.Semaphore belongs to the loop it is first used on, and batch runs and the job
+# runner each start their own loop with asyncio.run, so there is one semaphore per loop
+_tool_semaphores = weakref.WeakKeyDictionary()
+
+
+def tool_semaphore() -> asyncio.Semaphore:
+    """The TOOL_MAX_WORKERS semaphore for the running event loop"""
+    loop = asyncio.get_running_loop()
+    semaphore = _tool_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _tool_semaphores[loop] = asyncio.Semaphore(TOOL_MAX_WORKERS)
+    return semaphore
+
+
+def find_tool(name: str):
+    """Look up a tool by name, or None if the model asked for an unknown tool"""
+    for tool in get_tools():
+        if tool.name == name:
+            return tool
+    return None
+
+
+def run_tool_calls(tool_calls: list) -> list:
     """
-    Agent 0: Research Company - Gathers information when minimal input is provided
-    This agent runs first to build a synthetic pitch deck from web research
+    Run tool calls concurrently on tool_executor and return [(tool_name, result)] in call order.
+    Unknown tools are skipped; a call that exceeds TOOL_CALL_TIMEOUT yields an error string.
     """
-    print("\n[0/7] Researching company information...")
+    submitted = []
+    for tool_call in tool_calls:
+        tool = find_tool(tool_call['name'])
+        if tool:
+            # copy_context keeps the run's resources visible to the tool
+            submitted.append((tool.name, tool_executor.submit(
+                contextvars.copy_context().run, tool.func, **tool_call['args']
+            )))
     
-    # Check if we already have a detailed pitch or just minimal info
-    raw_input = state.get('raw_input', '')
-    company_name = state.get('company_name', '')
-    company_url = state.get('company_url', '')
+    # One deadline for the round: every call gets TOOL_CALL_TIMEOUT from the moment the round starts
+    deadline = time.monotonic() + TOOL_CALL_TIMEOUT
+    results = []
+    for tool_name, future in submitted:
+        try:
+            result = future.result(timeout=max(0.0, deadline - time.monotonic()))
+        except FutureTimeoutError:
+            future.cancel()
+            result = f"Error: {tool_name} timed out after {TOOL_CALL_TIMEOUT:g}s"
+        except Exception as e:
+            result = f"Error: {tool_name} failed: {str(e)}"
+        results.append((tool_name, result))
+    return results
+
+
+async def arun_tool_calls(tool_calls: list) -> list:
+    """Async variant of run_tool_calls, bounded by a semaphore of TOOL_MAX_WORKERS"""
+    semaphore = tool_semaphore()
+    
+    async def run_one(tool, args):
+        async with semaphore:
+            if tool.coroutine:
+                call = tool.coroutine(**args)
+            else:
+                call = asyncio.to_thread(tool.func, **args)
+            try:
+                return tool.name, await asyncio.wait_for(call, timeout=TOOL_CALL_TIMEOUT)
+            except asyncio.TimeoutError:
+                return tool.name, f"Error: {tool.name} timed out after {TOOL_CALL_TIMEOUT:g}s"
+            except Exception as e:
+                return tool.name, f"Error: {tool.name} failed: {str(e)}"
     
-    # If user provided detailed pitch (more than 200 chars), use it directly
+    runs = []
+    for tool_call in tool_calls:
+        tool = find_tool(tool_call['name'])
+        if tool:
+            runs.append(run_one(tool, tool_call['args']))
+    # gather preserves call order
+    return list(await asyncio.gather(*runs))
+
+
+# deal context caching
+
+# Headings of the state fields a cached deal context can hold
+CONTEXT_HEADINGS = {
+    "pitch_text": "STARTUP PITCH",
+    "market_analysis": "MARKET ANALYST REPORT",
+    "product_analysis": "PRODUCT ANALYST REPORT",
+    "traction_analysis": "TRACTION ANALYST REPORT"
+}
+# What the analysts and the downstream nodes (debate, questions, synthesizer) find in their context
+ANALYST_CONTEXT = ["pitch_text"]
+DOWNSTREAM_CONTEXT = ["pitch_text", "market_analysis", "product_analysis", "traction_analysis"]
+
+# Rendered in place of a field that the call's cached context already holds
+IN_CONTEXT = "(provided in the cached deal context above)"
+
+
+def deal_context_text(state: DealState, fields: List[str]) -> str:
+    return "\n\n".join(f"{CONTEXT_HEADINGS[field]}:\n{state.get(field) or ''}" for field in fields)
+
+
+def deal_context(state: DealState, fields: List[str], with_tools: bool = False) -> Optional[str]:
+    """Cached-content handle holding these fields of the deal (and the tools, if asked), or None to send them inline"""
+    context_cache = get_context_cache()
+    if context_cache is None:
+        return None
+    return context_cache.handle_for(deal_context_text(state, fields), get_tools() if with_tools else None)
+
+
+async def adeal_context(state: DealState, fields: List[str], with_tools: bool = False) -> Optional[str]:
+    return await asyncio.to_thread(deal_context, state, fields, with_tools)
+
+
+def analyst_contexts(state: DealState) -> Optional[tuple]:
+    """
+    (tool-calling handle, answer handle) for an analyst, or None to send the pitch inline.
+    Cached requests can't bind tools, so the tool-calling turn needs a context with the tools
+    declared in it, and the answer turn one without them (as the uncached answer turn has no tools).
+    """
+    contexts = (deal_context(state, ANALYST_CONTEXT, with_tools=True), deal_context(state, ANALYST_CONTEXT))
+    return contexts if all(contexts) else None
+
+
+async def aanalyst_contexts(state: DealState) -> Optional[tuple]:
+    return await asyncio.to_thread(analyst_contexts, state)
+
+
+def referencing_context(state: DealState, context, fields: List[str] = DOWNSTREAM_CONTEXT) -> DealState:
+    """state with the fields the cached context holds swapped for a reference to it (unchanged without a context)"""
+    if not context:
+        return state
+    return {**state, **{field: IN_CONTEXT for field in fields}}
+
+
+def invoke_llm(input, context: Optional[str] = None, **kwargs):
+    """llm.invoke, referencing the cached deal context when there is one; kwargs go to the request"""
+    from langchain_core.messages import HumanMessage
+
+    if context is None:
+        return get_llm().invoke(input, **kwargs)
+    messages = [HumanMessage(content=input)] if isinstance(input, str) else input
+    return get_context_cache().invoke(get_llm(), context, messages, **kwargs)
+
+
+async def ainvoke_llm(input, context: Optional[str] = None, **kwargs):
+    from langchain_core.messages import HumanMessage
+
+    if context is None:
+        return await get_llm().ainvoke(input, **kwargs)
+    messages = [HumanMessage(content=input)] if isinstance(input, str) else input
+    return await get_context_cache().ainvoke(get_llm(), context, messages, **kwargs)
+
+
+def tool_agent_messages(system_prompt: str, user_prompt: str, contexts: Optional[tuple]) -> list:
+    from langchain_core.messages import HumanMessage, SystemMessage
+
+    if contexts is None:
+        return [SystemMessage(content=system_prompt), HumanMessage(content=user_prompt)]
+    # A cached request can't carry a system instruction either, so it leads the user turn
+    return [HumanMessage(content=f"{system_prompt}\n\n{user_prompt}")]
+
+
+def format_tool_results(results: list, task: str, result_format: str) -> str:
+    """Deduplicate, rank and budget the tool output against the node's task, then format it"""
+    condensed, stats = condense_tool_results(results, task)
+    if stats["tokens_after"] < stats["tokens_before"]:
+        print(f"   Tool results: {stats['tokens_before']} -> {stats['tokens_after']} tokens "
+              f"({stats['duplicates']} duplicate, {stats['over_budget']} over-budget passages dropped)")
+    return "\n\n".join(result_format.format(name=tool_name, result=result) for tool_name, result in condensed)
+
+
+def run_tool_agent(system_prompt: str, user_prompt: str, max_tool_calls: int,
+                   result_format: str = ANALYST_RESULT_FORMAT,
+                   followup_format: str = ANALYST_FOLLOWUP,
+                   contexts: Optional[tuple] = None,
+                   report: Optional[type] = None) -> str:
+    """
+    Ask the model with tools bound, run up to max_tool_calls of the calls it makes,
+    then ask again with the tool output. Returns the final text.
+    With contexts (from analyst_contexts) both calls reference the cached deal context.
+    With a report schema (see schemas.py) the final answer is Gemini structured output of that
+    shape; Gemini can't combine that with tools, so if the model answers without calling any
+    and its answer doesn't already match the schema, it is asked for once more as structured output.
+    """
+    from langchain_core.messages import HumanMessage
+
+    messages = tool_agent_messages(system_prompt, user_prompt, contexts)
+    if contexts is None:
+        response = get_llm().bind_tools(get_tools()).invoke(messages)
+    else:
+        response = invoke_llm(messages, contexts[0])
+
+    output = structured_output(report) if report else {}
+    if not (hasattr(response, 'tool_calls') and response.tool_calls):
+        if not output:
+            return response.content
+        # An answer that already matches the schema needs no second, structured call
+        if validate_report(report, message_text(response)) is not None:
+            return message_text(response)
+        return message_text(invoke_llm(messages, contexts and contexts[1], **output))
+
+    tool_results = format_tool_results(run_tool_calls(response.tool_calls[:max_tool_calls]), user_prompt, result_format)
+
+    final_response = invoke_llm(messages + [
+        HumanMessage(content=followup_format.format(results=tool_results))
+    ], contexts and contexts[1], **output)
+    return message_text(final_response) if output else final_response.content
+
+
+async def arun_tool_agent(system_prompt: str, user_prompt: str, max_tool_calls: int,
+                          result_format: str = ANALYST_RESULT_FORMAT,
+                          followup_format: str = ANALYST_FOLLOWUP,
+                          contexts: Optional[tuple] = None,
+                          report: Optional[type] = None) -> str:
+    """Async variant of run_tool_agent using ainvoke and the tools' coroutines"""
+    from langchain_core.messages import HumanMessage
+
+    messages = tool_agent_messages(system_prompt, user_prompt, contexts)
+    if contexts is None:
+        response = await get_llm().bind_tools(get_tools()).ainvoke(messages)
+    else:
+        response = await ainvoke_llm(messages, contexts[0])
+
+    output = structured_output(report) if report else {}
+    if not (hasattr(response, 'tool_calls') and response.tool_calls):
+        if not output:
+            return response.content
+        # An answer that already matches the schema needs no second, structured call
+        if validate_report(report, message_text(response)) is not None:
+            return message_text(response)
+        return message_text(await ainvoke_llm(messages, contexts and contexts[1], **output))
+
+    tool_results = format_tool_results(await arun_tool_calls(response.tool_calls[:max_tool_calls]), user_prompt, result_format)
+
+    final_response = await ainvoke_llm(messages + [
+        HumanMessage(content=followup_format.format(results=tool_results))
+    ], contexts and contexts[1], **output)
+    return message_text(final_response) if output else final_response.content
+
+
+def analyst_update(field: str, text: str) -> dict:
+    """State update for an analyst's report: the raw text plus, if it matches its schema, the parsed report"""
+    data_field, report = REPORTS[field]
+    data = validate_report(report, text)
+    if data is None:
+        print(f"   {field}: response doesn't match its schema, keeping the raw text only")
+    return {field: text, data_field: data or {}}
+
+
+# agent nodes with tools
+#
+# Each node is split into a prompt builder plus thin sync and async wrappers,
+# so the sync graph (app) and the async graph (async_app) share the same prompts.
+
+RESEARCH_RESULT_FORMAT = "=== {name} RESULT ===\n{result}"
+RESEARCH_FOLLOWUP = "Research results:\n\n{results}\n\nNow compile all findings into the structured pitch deck format."
+
+
+def provided_pitch_result(state: DealState):
+    """If the user provided a detailed pitch (more than 200 chars), use it directly; otherwise None"""
+    raw_input = state.get('raw_input', '')
     if len(raw_input.strip()) > 200:
         print("   Using provided pitch deck (detailed input detected)")
         return {
             "pitch_text": raw_input,
-            "company_name": company_name or extract_company_name(raw_input)
+            "company_name": state.get('company_name', '') or extract_company_name(raw_input)
         }
-    
-    # Otherwise, we need to research
-    print(f"   Minimal input detected. Researching {company_name or 'company'}...")
-    
-    search_queries = []
-    if company_name:
-        search_queries.append(f"{company_name} startup company funding news")
-        search_queries.append(f"{company_name} product features pricing")
-    if company_url:
-        # Extract domain for search
-        domain = company_url.replace('https://', '').replace('http://', '').split('/')[0]
-        if not company_name:
-            search_queries.append(f"{domain} startup company")
-    
-    system_prompt = """You are a Company Research Specialist. Your job is to gather comprehensive information about a startup from web sources and compile it into a structured pitch deck format.
+    return None
 
-You have access to:
-- GoogleSearch: Search for company information, funding news, competitors
-- WebScraper: Extract detailed information from the company's website
 
-Be thorough and extract as much relevant information as possible."""
+def research_prompts(state: DealState) -> tuple:
+    """Build (system_prompt, user_prompt) for the research agent"""
+    template = PROMPTS.get("research_company")
+    user_prompt = template.render(
+        "user",
+        company_name=state.get('company_name', '') or "Not provided",
+        company_url=state.get('company_url', '') or "Not provided",
+        raw_input=state.get('raw_input', '') or "None"
+    )
+    return template.render("system"), user_prompt
 
-    user_prompt = f"""
-COMPANY NAME: {company_name or "Not provided"}
-COMPANY WEBSITE: {company_url or "Not provided"}
-USER INPUT: {raw_input or "None"}
 
-YOUR TASK:
-1. Scrape the company website if provided to understand what they do
-2. Search for recent news about the company (funding, product launches, etc.)
-3. Search for information about their market and competitors
-4. Compile all findings into a PITCH DECK FORMAT
+def research_result(state: DealState, generated_pitch: str):
+    """Build the research node's state update from a generated pitch"""
+    company_name = state.get('company_name', '')
+
+    # Extract company name if not provided
+    extracted_name = company_name
+    if not extracted_name and "Company:" in generated_pitch:
+        for line in generated_pitch.split('\n'):
+            if line.strip().startswith('Company:'):
+                extracted_name = line.split(':', 1)[1].strip()
+                break
+
+    print(f"   Research complete. Generated pitch for: {extracted_name or 'Unknown Company'}")
+    return {
+        "pitch_text": generated_pitch,
+        "company_name": extracted_name or company_name or "Unknown Company"
+    }
 
-OUTPUT FORMAT - Create a comprehensive pitch deck with these sections:
 
----
-Company: [Name]
-Website: [URL]
+def research_fallback(state: DealState, error: Exception):
+    """Fall back to raw input if research fails (quota/server errors that outlived the retries fail the run instead)"""
+    if is_retryable(error):
+        raise error
+    print(f"   Research error: {error}")
+    raw_input = state.get('raw_input', '')
+    company_name = state.get('company_name', '')
+    company_url = state.get('company_url', '')
+    return {
+        "pitch_text": raw_input or f"Company: {company_name}\nWebsite: {company_url}\n(Auto-research failed, please provide more details)",
+        "company_name": company_name or "Unknown Company"
+    }
 
-Product/Service:
-[Detailed description of what the company does, their core offering, key features]
 
-Target Market:
-[Who are their customers, market size if available]
+def research_company_node(state: DealState):
+    """
+    Agent 0: Research Company - Gathers information when minimal input is provided
+    This agent runs first to build a synthetic pitch deck from web research
+    """
+    print("\n[0/7] Researching company information...")
 
-Traction:
-[Any metrics, user numbers, revenue info, growth rates found]
+    provided = provided_pitch_result(state)
+    if provided:
+        return provided
 
-Funding:
-[Funding rounds, investors, total raised if available]
+    print(f"   Minimal input detected. Researching {state.get('company_name') or 'company'}...")
+    system_prompt, user_prompt = research_prompts(state)
 
-Team:
-[Founder names, backgrounds if available]
+    try:
+        generated_pitch = run_tool_agent(system_prompt, user_prompt, max_tool_calls=5,
+                                         result_format=RESEARCH_RESULT_FORMAT,
+                                         followup_format=RESEARCH_FOLLOWUP)
+        return research_result(state, generated_pitch)
+    except Exception as e:
+        return research_fallback(state, e)
 
-Competitive Advantage:
-[What makes them unique vs competitors]
 
----
+async def aresearch_company_node(state: DealState):
+    """Async variant of research_company_node"""
+    print("\n[0/7] Researching company information...")
 
-If certain information is not available, note it as "Not found in research" but still provide a complete structure.
-"""
+    provided = provided_pitch_result(state)
+    if provided:
+        return provided
+
+    print(f"   Minimal input detected. Researching {state.get('company_name') or 'company'}...")
+    system_prompt, user_prompt = research_prompts(state)
 
-    llm_with_tools = llm.bind_tools(tools)
-    
     try:
-        response = llm_with_tools.invoke([
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt)
-        ])
-        
-        if hasattr(response, 'tool_calls') and response.tool_calls:
-            tool_results = []
-            for tool_call in response.tool_calls[:5]:
-                tool_name = tool_call['name']
-                tool_input = tool_call['args']
-                
-                for tool in tools:
-                    if tool.name == tool_name:
-                        result = tool.func(**tool_input)
-                        tool_results.append(f"=== {tool_name} RESULT ===\n{result}")
-                        break
-            
-            final_response = llm.invoke([
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=user_prompt),
-                HumanMessage(content=f"Research results:\n\n" + "\n\n".join(tool_results) + "\n\nNow compile all findings into the structured pitch deck format.")
-            ])
-            
-            generated_pitch = final_response.content
-        else:
-            generated_pitch = response.content
-        
-        # Extract company name if not provided
-        extracted_name = company_name
-        if not extracted_name and "Company:" in generated_pitch:
-            for line in generated_pitch.split('\n'):
-                if line.strip().startswith('Company:'):
-                    extracted_name = line.split(':', 1)[1].strip()
-                    break
-        
-        print(f"   Research complete. Generated pitch for: {extracted_name or 'Unknown Company'}")
-        return {
-            "pitch_text": generated_pitch,
-            "company_name": extracted_name or company_name or "Unknown Company"
-        }
-            
+        generated_pitch = await arun_tool_agent(system_prompt, user_prompt, max_tool_calls=5,
+                                                result_format=RESEARCH_RESULT_FORMAT,
+                                                followup_format=RESEARCH_FOLLOWUP)
+        return research_result(state, generated_pitch)
     except Exception as e:
-        print(f"   Research error: {e}")
-        # Fall back to raw input if research fails
-        return {
-            "pitch_text": raw_input or f"Company: {company_name}\nWebsite: {company_url}\n(Auto-research failed, please provide more details)",
-            "company_name": company_name or "Unknown Company"
-        }
+        return research_fallback(state, e)
 
 
 def extract_company_name(text: str) -> str:
@@ -301,79 +799,78 @@ def extract_company_name(text: str) -> str:
     return "Unknown Company"
 
 
+# Earlier analyses of similar markets (see knowledge.py); None when DEALSCOUT_KNOWLEDGE=0
+get_knowledge_base = lazy(knowledge_base_from_env)
+
+MARKET_TOOL_CALLS = 3
+# Searches left to the market analyst when the knowledge base already has fresh figures for the market
+KNOWN_MARKET_TOOL_CALLS = 1
+
+
+def market_knowledge(state: DealState) -> tuple:
+    """(prompt section, max tool calls) for the market analyst, from earlier deals in similar markets"""
+    knowledge_base = get_knowledge_base()
+    if knowledge_base is None:
+        return "", MARKET_TOOL_CALLS
+    matches = knowledge_base.lookup(state['pitch_text'], exclude_deal=deal_key(state))
+    if not matches:
+        return "", MARKET_TOOL_CALLS
+    fresh = any(not match["verify"] for match in matches)
+    max_tool_calls = KNOWN_MARKET_TOOL_CALLS if fresh else MARKET_TOOL_CALLS
+    print(f"   Knowledge base: {len(matches)} earlier similar market(s), up to {max_tool_calls} tool call(s)")
+    return format_knowledge(matches), max_tool_calls
+
+
+def record_market_knowledge(state: DealState, market_data: dict):
+    knowledge_base = get_knowledge_base()
+    if knowledge_base is not None and market_data:
+        knowledge_base.record(deal_key(state), state.get('company_name') or "", state['pitch_text'], market_data)
+
+
+def market_analyst_prompts(state: DealState, prior_knowledge: str = "") -> tuple:
+    """Build (system_prompt, user_prompt) for the market analyst"""
+    template = PROMPTS.get("market_analyst")
+    return template.render("system"), template.render("user", pitch_text=state['pitch_text'],
+                                                      prior_knowledge=prior_knowledge)
+
+
 def market_analyst_node(state: DealState):
     """
     Agent 1: Market Analyst with Google Search capability
     """
     print("\n[1/7] Market Analyst researching...")
-    
-    system_prompt = """You are a skeptical Market Analyst for a VC firm.
-
-You have access to these tools:
-- GoogleSearch: Search for current market data, competitors, news
-- WebScraper: Read website content
-
-IMPORTANT: 
-- Don't trust pitch deck numbers - verify them with searches
-- Search for recent news about this market
-- Look for failed companies in this space
-"""
 
-    user_prompt = f"""
-STARTUP PITCH:
-{state['pitch_text']}
+    prior_knowledge, max_tool_calls = market_knowledge(state)
+    contexts = analyst_contexts(state)
+    prompts = market_analyst_prompts(referencing_context(state, contexts, ANALYST_CONTEXT), prior_knowledge)
+    update = analyst_update("market_analysis", run_tool_agent(*prompts, max_tool_calls=max_tool_calls,
+                                                              contexts=contexts, report=MarketReport))
+    record_market_knowledge(state, update["market_data"])
+    return update
 
-YOUR TASKS:
-1. Search for the market size and growth rate
-2. Search for top 3-5 competitors in this space
-3. Assess market timing (why now?)
-4. Calculate realistic TAM/SAM/SOM
 
-Think step by step:
-- What searches do you need to run?
-- Run them and analyze the results
-- Synthesize into final analysis
-
-Output your analysis as JSON with these fields:
-- tam_estimate
-- competitors (array)
-- market_timing_score (1-10)
-- timing_reason
-- red_flags (array)
-"""
+async def amarket_analyst_node(state: DealState):
+    """Async variant of market_analyst_node"""
+    print("\n[1/7] Market Analyst researching...")
 
-    llm_with_tools = llm.bind_tools(tools)
-    
-    try:
-        response = llm_with_tools.invoke([
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt)
-        ])
-        
-        if hasattr(response, 'tool_calls') and response.tool_calls:
-            tool_results = []
-            for tool_call in response.tool_calls[:3]:
-                tool_name = tool_call['name']
-                tool_input = tool_call['args']
-                
-                for tool in tools:
-                    if tool.name == tool_name:
-                        result = tool.func(**tool_input)
-                        tool_results.append(f"Tool {tool_name} result: {result}")
-                        break
-            
-            final_response = llm.invoke([
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=user_prompt),
-                HumanMessage(content=f"Tool results:\n" + "\n\n".join(tool_results) + "\n\nNow provide your final analysis as JSON.")
-            ])
-            
-            return {"market_analysis": final_response.content}
-        else:
-            return {"market_analysis": response.content}
-            
-    except Exception as e:
-        return {"market_analysis": f"Error: {str(e)}"}
+    prior_knowledge, max_tool_calls = await asyncio.to_thread(market_knowledge, state)
+    contexts = await aanalyst_contexts(state)
+    prompts = market_analyst_prompts(referencing_context(state, contexts, ANALYST_CONTEXT), prior_knowledge)
+    update = analyst_update("market_analysis", await arun_tool_agent(*prompts, max_tool_calls=max_tool_calls,
+                                                                     contexts=contexts, report=MarketReport))
+    await asyncio.to_thread(record_market_knowledge, state, update["market_data"])
+    return update
+
+
+def product_analyst_prompts(state: DealState) -> tuple:
+    """Build (system_prompt, user_prompt) for the product analyst"""
+    template = PROMPTS.get("product_analyst")
+    user_prompt = template.render(
+        "user",
+        pitch_text=state['pitch_text'],
+        company_url=state.get('company_url', 'Not provided')
+    )
+    return template.render("system"), user_prompt
 
 
 def product_analyst_node(state: DealState):
@@ -381,70 +878,27 @@ def product_analyst_node(state: DealState):
     Agent 2: Product Analyst with Web Scraping capability
     """
     print("\n[2/7] Product Analyst analyzing website...")
-    
-    system_prompt = """You are a Product Analyst evaluating a startup's product.
 
-You have access to:
-- GoogleSearch: Search for product reviews, tech stack info
-- WebScraper: Visit and analyze their website
-"""
+    contexts = analyst_contexts(state)
+    prompts = product_analyst_prompts(referencing_context(state, contexts, ANALYST_CONTEXT))
+    return analyst_update("product_analysis", run_tool_agent(*prompts, max_tool_calls=3, contexts=contexts,
+                                                             report=ProductReport))
 
-    user_prompt = f"""
-STARTUP PITCH:
-{state['pitch_text']}
 
-COMPANY WEBSITE:
-{state.get('company_url', 'Not provided')}
+async def aproduct_analyst_node(state: DealState):
+    """Async variant of product_analyst_node"""
+    print("\n[2/7] Product Analyst analyzing website...")
 
-YOUR TASKS:
-1. If website is provided, scrape it and analyze the product
-2. Search for reviews or mentions of the product
-3. Assess technical feasibility
-4. Identify unique differentiation vs competitors
-5. Determine: Is this a feature or a platform?
+    contexts = await aanalyst_contexts(state)
+    prompts = product_analyst_prompts(referencing_context(state, contexts, ANALYST_CONTEXT))
+    return analyst_update("product_analysis", await arun_tool_agent(*prompts, max_tool_calls=3, contexts=contexts,
+                                                                    report=ProductReport))
 
-Output as JSON with fields:
-- product_quality_score (1-10)
-- is_live (true/false)
-- tech_stack
-- differentiation
-- is_feature_or_platform
-- technical_risks (array)
-- website_quality_score (1-10)
-"""
 
-    llm_with_tools = llm.bind_tools(tools)
-    
-    try:
-        response = llm_with_tools.invoke([
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt)
-        ])
-        
-        if hasattr(response, 'tool_calls') and response.tool_calls:
-            tool_results = []
-            for tool_call in response.tool_calls[:3]:
-                tool_name = tool_call['name']
-                tool_input = tool_call['args']
-                
-                for tool in tools:
-                    if tool.name == tool_name:
-                        result = tool.func(**tool_input)
-                        tool_results.append(f"Tool {tool_name} result: {result}")
-                        break
-            
-            final_response = llm.invoke([
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=user_prompt),
-                HumanMessage(content=f"Tool results:\n" + "\n\n".join(tool_results) + "\n\nNow provide your final analysis as JSON.")
-            ])
-            
-            return {"product_analysis": final_response.content}
-        else:
-            return {"product_analysis": response.content}
-            
-    except Exception as e:
-        return {"product_analysis": f"Error: {str(e)}"}
+def traction_analyst_prompts(state: DealState) -> tuple:
+    """Build (system_prompt, user_prompt) for the traction analyst"""
+    template = PROMPTS.get("traction_analyst")
+    return template.render("system"), template.render("user", pitch_text=state['pitch_text'])
 
 
 def traction_analyst_node(state: DealState):
@@ -452,62 +906,31 @@ def traction_analyst_node(state: DealState):
     Agent 3: Traction Analyst - verifies metrics and searches for validation
     """
     print("\n[3/7] Traction Analyst fact-checking metrics...")
-    
-    system_prompt = """You are a financial analyst who is EXTREMELY skeptical of startup metrics.
-"""
 
-    user_prompt = f"""
-STARTUP PITCH:
-{state['pitch_text']}
+    contexts = analyst_contexts(state)
+    prompts = traction_analyst_prompts(referencing_context(state, contexts, ANALYST_CONTEXT))
+    return analyst_update("traction_analysis", run_tool_agent(*prompts, max_tool_calls=3, contexts=contexts,
+                                                              report=TractionReport))
 
-YOUR TASKS:
-1. Search for any public information about their traction (Crunchbase, news, etc.)
-2. Verify if claimed metrics are realistic
-3. Calculate unit economics if data is available
-4. Search for red flags (layoffs, pivots, failed raises)
 
-Be brutal. Most startups exaggerate.
+async def atraction_analyst_node(state: DealState):
+    """Async variant of traction_analyst_node"""
+    print("\n[3/7] Traction Analyst fact-checking metrics...")
 
-Output as JSON with fields:
-- metrics_seem_realistic (true/false)
-- red_flags (array)
-- missing_metrics (array)
-- validation_found
-- traction_score (1-10)
-"""
+    contexts = await aanalyst_contexts(state)
+    prompts = traction_analyst_prompts(referencing_context(state, contexts, ANALYST_CONTEXT))
+    return analyst_update("traction_analysis", await arun_tool_agent(*prompts, max_tool_calls=3, contexts=contexts,
+                                                                     report=TractionReport))
 
-    llm_with_tools = llm.bind_tools(tools)
-    
-    try:
-        response = llm_with_tools.invoke([
-            SystemMessage(content=system_prompt),
-            HumanMessage(content=user_prompt)
-        ])
-        
-        if hasattr(response, 'tool_calls') and response.tool_calls:
-            tool_results = []
-            for tool_call in response.tool_calls[:3]:
-                tool_name = tool_call['name']
-                tool_input = tool_call['args']
-                
-                for tool in tools:
-                    if tool.name == tool_name:
-                        result = tool.func(**tool_input)
-                        tool_results.append(f"Tool {tool_name} result: {result}")
-                        break
-            
-            final_response = llm.invoke([
-                SystemMessage(content=system_prompt),
-                HumanMessage(content=user_prompt),
-                HumanMessage(content=f"Tool results:\n" + "\n\n".join(tool_results) + "\n\nNow provide your final analysis as JSON.")
-            ])
-            
-            return {"traction_analysis": final_response.content}
-        else:
-            return {"traction_analysis": response.content}
-            
-    except Exception as e:
-        return {"traction_analysis": f"Error: {str(e)}"}
+
+def debate_prompt(state: DealState) -> str:
+    """Build the debate moderator prompt from the three analyst reports"""
+    return PROMPTS.render(
+        "debate_moderator",
+        market_analysis=state['market_analysis'],
+        product_analysis=state['product_analysis'],
+        traction_analysis=state['traction_analysis']
+    )
 
 
 def debate_node(state: DealState):
@@ -516,35 +939,40 @@ def debate_node(state: DealState):
     """
     print("\n[4/7] Debate starting...")
     
-    prompt = f"""
-Analyze these three reports for contradictions or tensions:
+    context = deal_context(state, DOWNSTREAM_CONTEXT)
+    response = invoke_llm(debate_prompt(referencing_context(state, context)), context)
+    return {"debate_transcript": response.content}
+
 
-MARKET: {state['market_analysis']}
-PRODUCT: {state['product_analysis']}
-TRACTION: {state['traction_analysis']}
+async def adebate_node(state: DealState):
+    """Async variant of debate_node"""
+    print("\n[4/7] Debate starting...")
+    
+    context = await adeal_context(state, DOWNSTREAM_CONTEXT)
+    response = await ainvoke_llm(debate_prompt(referencing_context(state, context)), context)
+    return {"debate_transcript": response.content}
 
-Identify the BIGGEST disagreement or concern. Then simulate a 3-turn debate:
 
-Format:
-TOPIC: [one sentence topic]
+# The sections each downstream prompt needs, in the order they may be shrunk to fit the token budget
+QUESTIONS_COMPRESS_ORDER = ["market_analysis", "product_analysis", "traction_analysis", "pitch_text", "debate_transcript"]
+SYNTHESIZER_COMPRESS_ORDER = ["market_analysis", "product_analysis", "traction_analysis", "pitch_text",
+                              "debate_transcript", "questions_to_reconsider"]
 
-Turn 1:
-Market Agent: [argument]
-Product Agent: [counter]
 
-Turn 2:
-Market Agent: [response]
-Traction Agent: [interjects with data]
+def budgeted_sections(node: str, state: DealState, fields: List[str]) -> tuple:
+    """The state fields a prompt needs, fitted to the token budget, plus a usage record for state['prompt_budget']"""
+    reports = {field: state.get(data_field) for field, (data_field, _) in REPORTS.items() if field in fields}
+    sections, usage = fit_sections({field: state.get(field) or "" for field in fields}, fields, reports=reports)
+    if usage["tokens_saved"]:
+        print(f"   Prompt budget: {usage['tokens_before']} -> {usage['tokens_after']} tokens "
+              f"(compressed {', '.join(usage['compressed'])})")
+    return sections, {"node": node, **usage}
 
-Turn 3:
-Product Agent: [final point]
-Market Agent: [conclusion]
 
-CONSENSUS: [what they agree on, if anything]
-"""
-    
-    response = llm.invoke(prompt)
-    return {"debate_transcript": response.content}
+def questions_to_reconsider_prompt(state: DealState) -> tuple:
+    """Build (prompt, budget usage) for the questions-to-reconsider node from the full analysis"""
+    sections, usage = budgeted_sections("questions_agent", state, QUESTIONS_COMPRESS_ORDER)
+    return PROMPTS.render("questions_to_reconsider", **sections), usage
 
 
 def questions_to_reconsider_node(state: DealState):
@@ -553,143 +981,523 @@ def questions_to_reconsider_node(state: DealState):
     """
     print("\n[5/7] Generating questions to reconsider...")
     
-    prompt = f"""
-You are a seasoned VC Partner with 20+ years of experience. You've seen many investments succeed and fail.
-Based on ALL the analysis below, generate a list of CRITICAL QUESTIONS that an investor should reconsider/think deeply about before making an investment decision.
+    context = deal_context(state, DOWNSTREAM_CONTEXT)
+    prompt, usage = questions_to_reconsider_prompt(referencing_context(state, context))
+    response = invoke_llm(prompt, context)
+    return {"questions_to_reconsider": response.content, "prompt_budget": [usage]}
 
-STARTUP PITCH:
-{state['pitch_text']}
 
-MARKET REPORT:
-{state['market_analysis']}
+async def aquestions_to_reconsider_node(state: DealState):
+    """Async variant of questions_to_reconsider_node"""
+    print("\n[5/7] Generating questions to reconsider...")
+    
+    context = await adeal_context(state, DOWNSTREAM_CONTEXT)
+    prompt, usage = questions_to_reconsider_prompt(referencing_context(state, context))
+    response = await ainvoke_llm(prompt, context)
+    return {"questions_to_reconsider": response.content, "prompt_budget": [usage]}
 
-PRODUCT REPORT:
-{state['product_analysis']}
 
-TRACTION REPORT:
-{state['traction_analysis']}
+def synthesizer_prompt(state: DealState) -> tuple:
+    """Build (prompt, budget usage) for the GP memo from the full analysis"""
+    sections, usage = budgeted_sections("synthesizer_agent", state, SYNTHESIZER_COMPRESS_ORDER)
+    return PROMPTS.render("gp_synthesizer", company_name=state.get('company_name', 'Unknown'), **sections), usage
 
-DEBATE TRANSCRIPT:
-{state['debate_transcript']}
 
-YOUR TASK:
-Generate 8-12 hard-hitting questions across these categories:
+def synthesizer_node(state: DealState):
+    """
+    Agent 6: GP who reads everything and makes final call
+    """
+    print("\n[6/7] GP writing final memo...")
+    
+    context = deal_context(state, DOWNSTREAM_CONTEXT)
+    prompt, usage = synthesizer_prompt(referencing_context(state, context))
+    response = invoke_llm(prompt, context)
+    return {"final_memo": response.content, "prompt_budget": [usage]}
 
-1. MARKET REALITY CHECK (2-3 questions)
-   - Questions about market size validation, timing risks, competitive threats
 
-2. PRODUCT & TECHNOLOGY RISKS (2-3 questions)  
-   - Questions about technical feasibility, defensibility, scalability
+async def asynthesizer_node(state: DealState):
+    """Async variant of synthesizer_node"""
+    print("\n[6/7] GP writing final memo...")
+    
+    context = await adeal_context(state, DOWNSTREAM_CONTEXT)
+    prompt, usage = synthesizer_prompt(referencing_context(state, context))
+    response = await ainvoke_llm(prompt, context)
+    return {"final_memo": response.content, "prompt_budget": [usage]}
 
-3. TRACTION & BUSINESS MODEL (2-3 questions)
-   - Questions about revenue sustainability, unit economics, growth assumptions
 
-4. TEAM & EXECUTION (2-3 questions)
-   - Questions about founder capabilities, past track record, team gaps
+# node wrappers
 
-FORMAT YOUR RESPONSE AS:
+def finish_around(steps, result: Optional[dict] = None, error: Optional[BaseException] = None) -> dict:
+    """Resume an around-generator with the node's result (or raise its error inside it); returns its update"""
+    try:
+        if error is not None:
+            steps.throw(error)
+        else:
+            steps.send(result)
+    except StopIteration as done:
+        return done.value
+    raise RuntimeError(f"{steps.__name__} yielded more than once")
 
-## 🎯 Questions to Reconsider Before Investing
 
-### 📊 Market Reality Check
-1. [Question]
-   *Why this matters: [Brief explanation of the risk]*
+def wrap_node(node_fn, around):
+    """
+    Wrap a node (sync or async) in around(state), a generator that runs before the node, yields
+    the state to call it with (or returns an update to skip it), receives the node's update
+    (or its exception, raised at the yield) and returns the wrapped node's update.
+    """
+    if asyncio.iscoroutinefunction(node_fn):
+        @functools.wraps(node_fn)
+        async def async_wrapper(state: DealState):
+            steps = around(state)
+            try:
+                node_state = next(steps)
+            except StopIteration as done:
+                return done.value
+            try:
+                result = await node_fn(node_state)
+            except BaseException as e:
+                return finish_around(steps, error=e)
+            return finish_around(steps, result)
+        return async_wrapper
+
+    @functools.wraps(node_fn)
+    def wrapper(state: DealState):
+        steps = around(state)
+        try:
+            node_state = next(steps)
+        except StopIteration as done:
+            return done.value
+        try:
+            result = node_fn(node_state)
+        except BaseException as e:
+            return finish_around(steps, error=e)
+        return finish_around(steps, result)
+    return wrapper
+
+
+# node timing
+
+def timed_node(name: str, node_fn):
+    """Wrap a node (sync or async) so it reports its own wall-clock timing into state['node_timings']"""
+    def around(state: DealState):
+        started = time.perf_counter()
+        result = yield state
+        finished = time.perf_counter()
+        timing = {
+            "node": name,
+            "start": started,
+            "end": finished,
+            "seconds": round(finished - started, 3)
+        }
+        return {**(result or {}), "node_timings": [timing]}
 
-2. [Question]
-   *Why this matters: [Brief explanation]*
+    return wrap_node(node_fn, around)
 
-### 🛠️ Product & Technology Risks
-1. [Question]
-   *Why this matters: [Brief explanation]*
 
-...and so on for each category.
+# analyst failures
 
-Make these questions specific to THIS startup, not generic. They should dig into the gaps, contradictions, or blind spots revealed in the analysis.
-"""
-    
-    response = llm.invoke(prompt)
-    return {"questions_to_reconsider": response.content}
+# Stands in for a failed analyst's report, so the debate and memo go ahead on the other two
+FAILED_ANALYSIS = "(The {area} analysis is unavailable for this deal; treat {area} as unverified.)"
 
 
-def synthesizer_node(state: DealState):
+def failed_analyst_update(name: str, error: Exception) -> dict:
+    field = NODE_OUTPUTS[name]
+    area = field.split("_")[0]
+    print(f"   {name} failed, continuing without its report: {error}")
+    return {field: FAILED_ANALYSIS.format(area=area), REPORTS[field][0]: {}, "failed_nodes": {name: str(error)}}
+
+
+def analyst_node(name: str, node_fn):
     """
-    Agent 6: GP who reads everything and makes final call
+    Wrap an analyst (sync or async) so a failure, including quota errors that outlived the
+    retries, leaves a placeholder report and a failed_nodes entry instead of failing the deal;
+    a re-analysis runs the analyst again
     """
-    print("\n[6/7] GP writing final memo...")
-    
-    prompt = f"""
-You are a General Partner making an investment decision.
+    def around(state: DealState):
+        try:
+            result = yield state
+        except Exception as e:
+            return failed_analyst_update(name, e)
+        return {**(result or {}), "failed_nodes": {name: ""}}
+
+    return wrap_node(node_fn, around)
+
+
+# incremental re-analysis
+
+# Node -> the DealState field it fills
+NODE_OUTPUTS = {
+    "research_agent": "pitch_text",
+    "market_agent": "market_analysis",
+    "product_agent": "product_analysis",
+    "traction_agent": "traction_analysis",
+    "debate_agent": "debate_transcript",
+    "questions_agent": "questions_to_reconsider",
+    "synthesizer_agent": "final_memo"
+}
+
+# Node -> the DealState fields its prompts read
+NODE_INPUTS = {
+    "research_agent": ("company_name", "company_url", "raw_input"),
+    "market_agent": ("pitch_text",),
+    "product_agent": ("pitch_text", "company_url"),
+    "traction_agent": ("pitch_text",),
+    "debate_agent": ("market_analysis", "product_analysis", "traction_analysis"),
+    "questions_agent": ("pitch_text", "market_analysis", "product_analysis", "traction_analysis", "debate_transcript"),
+    "synthesizer_agent": ("company_name", "pitch_text", "market_analysis", "product_analysis", "traction_analysis",
+                          "debate_transcript", "questions_to_reconsider")
+}
+
+
+def node_fingerprint(name: str, state: DealState) -> str:
+    return hash_key({
+        "node": name,
+        "model": MODEL_NAME,
+        "inputs": {field: state.get(field) or "" for field in NODE_INPUTS[name]}
+    })
+
+
+def can_reuse(name: str, state: DealState, fingerprint: str) -> bool:
+    """The node's stored output was built from exactly these inputs (and isn't a failed node's placeholder)"""
+    return (
+        (state.get("node_fingerprints") or {}).get(name) == fingerprint
+        and bool(state.get(NODE_OUTPUTS[name]))
+        and not (state.get("failed_nodes") or {}).get(name)
+    )
+
 
-COMPANY: {state.get('company_name', 'Unknown')}
+def with_fingerprint(name: str, state: DealState, update: Optional[dict]) -> dict:
+    """
+    The node's update plus its fingerprint, taken over its inputs as the node leaves them:
+    research fills in company_name, and the state it leaves behind is what a re-analysis starts from
+    """
+    update = update or {}
+    return {**update, "node_fingerprints": {name: node_fingerprint(name, {**state, **update})}}
 
-STARTUP PITCH:
-{state['pitch_text']}
 
-MARKET REPORT:
-{state['market_analysis']}
+def incremental_node(name: str, node_fn):
+    """
+    Wrap a node (sync or async) so it is skipped when its inputs hash the same as when its
+    current output was produced; otherwise it runs and records the new fingerprint.
+    """
+    def around(state: DealState):
+        if can_reuse(name, state, node_fingerprint(name, state)):
+            print(f"   {name}: inputs unchanged, reusing previous output")
+            return {}
+        return with_fingerprint(name, state, (yield state))
 
-PRODUCT REPORT:
-{state['product_analysis']}
+    return wrap_node(node_fn, around)
 
-TRACTION REPORT:
-{state['traction_analysis']}
 
-DEBATE TRANSCRIPT:
-{state['debate_transcript']}
+def reanalysis_state(previous: DealState, edits: dict) -> DealState:
+    """
+    Start state for re-running a finished analysis with some fields edited (e.g. pitch_text).
+    Outputs and fingerprints are carried over, so only nodes downstream of the edit recompute;
+    an edited pitch_text leaves research's inputs alone, so research is skipped and keeps the edit.
+    """
+    return {**previous, **edits, "node_timings": [], "prompt_budget": []}
 
-QUESTIONS TO RECONSIDER:
-{state.get('questions_to_reconsider', '')}
 
-Write a 2-3 paragraph investment memo that:
-1. Synthesizes the key insights
-2. Weighs the debate arguments
-3. Makes a clear recommendation: [PASS] / [MAYBE - DIG DEEPER] / [STRONG YES]
+def reanalyze(previous: DealState, edits: dict, thread_id: str = None, graph=None) -> DealState:
+    return run_deal(reanalysis_state(previous, edits), thread_id, graph)
 
-Include:
-- 3 key strengths
-- 3 key risks
-- Recommended next steps
 
-Be direct and data-driven.
-"""
+def format_timing_report(timings: List[dict]) -> str:
+    """Format per-node timings with total node time vs. actual wall-clock time"""
+    if not timings:
+        return "No node timings recorded"
+    
+    timings = sorted(timings, key=lambda t: t["start"])
+    run_start = timings[0]["start"]
+    wall_clock = max(t["end"] for t in timings) - run_start
+    node_total = sum(t["end"] - t["start"] for t in timings)
     
-    response = llm.invoke(prompt)
-    return {"final_memo": response.content}
+    lines = [f"{'NODE':<20}{'START':>10}{'SECONDS':>10}"]
+    for t in timings:
+        lines.append(f"{t['node']:<20}{t['start'] - run_start:>9.2f}s{t['end'] - t['start']:>9.2f}s")
+    lines.append("-" * 40)
+    lines.append(f"{'Sum of node time':<20}{node_total:>19.2f}s")
+    lines.append(f"{'Wall clock':<20}{wall_clock:>19.2f}s")
+    if wall_clock > 0:
+        lines.append(f"{'Parallel speedup':<20}{node_total / wall_clock:>19.2f}x")
+    return "\n".join(lines)
+
+
+# per-deal evidence index
+
+def deal_key(state: DealState) -> str:
+    """Identifies a deal across its nodes, resumes and re-analyses (see deal_entry_node)"""
+    return state.get("deal_id") or ""
+
+
+def deal_entry_node(node_fn):
+    """
+    Wrap the graph's entry node (sync or async) so a deal that comes in without a deal_id gets one
+    before anything is keyed on it. The id then travels in the state, unlike company_name,
+    which research fills in and so can't identify the deal.
+    """
+    def around(state: DealState):
+        assigned = {} if state.get("deal_id") else {"deal_id": uuid.uuid4().hex}
+        result = yield {**state, **assigned}
+        return {**(result or {}), **assigned}
+
+    return wrap_node(node_fn, around)
+
+
+def evidence_node(node_fn):
+    """Wrap a node (sync or async) so its tool calls share the deal's evidence index (see evidence.py)"""
+    def around(state: DealState):
+        token = active_evidence.set(evidence_for(deal_key(state)))
+        try:
+            return (yield state)
+        finally:
+            active_evidence.reset(token)
+
+    return wrap_node(node_fn, around)
 
 
 # graph construction
 
-workflow = StateGraph(DealState)
+ENTRY_NODE = "research_agent"
+
+# The analysts only read pitch_text and write disjoint keys, so they can run side by side
+ANALYST_NODES = ("market_agent", "product_agent", "traction_agent")
+
+SYNC_NODES = {
+    "research_agent": research_company_node,
+    "market_agent": market_analyst_node,
+    "product_agent": product_analyst_node,
+    "traction_agent": traction_analyst_node,
+    "debate_agent": debate_node,
+    "questions_agent": questions_to_reconsider_node,
+    "synthesizer_agent": synthesizer_node,
+}
+
+ASYNC_NODES = {
+    "research_agent": aresearch_company_node,
+    "market_agent": amarket_analyst_node,
+    "product_agent": aproduct_analyst_node,
+    "traction_agent": atraction_analyst_node,
+    "debate_agent": adebate_node,
+    "questions_agent": aquestions_to_reconsider_node,
+    "synthesizer_agent": asynthesizer_node,
+}
+
+
+def build_workflow(parallel: bool = True, use_async: bool = False) -> "StateGraph":
+    """
+    Build the deal graph.
+    parallel=True fans the three analysts out after research and fans back in at the debate;
+    parallel=False keeps the original sequential chain (useful as a timing baseline).
+    use_async=True wires in the asyncio-native nodes (ainvoke + async HTTP) instead of the blocking ones.
+    """
+    from langgraph.graph import StateGraph, END
+
+    graph = StateGraph(DealState)
+    
+    for name, node_fn in (ASYNC_NODES if use_async else SYNC_NODES).items():
+        if name in ANALYST_NODES:
+            node_fn = analyst_node(name, node_fn)
+        node_fn = evidence_node(incremental_node(name, node_fn))
+        if name == ENTRY_NODE:
+            node_fn = deal_entry_node(node_fn)
+        graph.add_node(name, timed_node(name, node_fn))
+    
+    graph.set_entry_point(ENTRY_NODE)
+    if parallel:
+        for analyst in ANALYST_NODES:
+            graph.add_edge("research_agent", analyst)
+        # debate_agent only runs once all three reports are in
+        graph.add_edge(list(ANALYST_NODES), "debate_agent")
+    else:
+        graph.add_edge("research_agent", "market_agent")
+        graph.add_edge("market_agent", "product_agent")
+        graph.add_edge("product_agent", "traction_agent")
+        graph.add_edge("traction_agent", "debate_agent")
+    graph.add_edge("debate_agent", "questions_agent")
+    graph.add_edge("questions_agent", "synthesizer_agent")
+    graph.add_edge("synthesizer_agent", END)
+    
+    return graph
+
+
+# checkpointing
 
-workflow.add_node("research_agent", research_company_node)
-workflow.add_node("market_agent", market_analyst_node)
-workflow.add_node("product_agent", product_analyst_node)
-workflow.add_node("traction_agent", traction_analyst_node)
-workflow.add_node("debate_agent", debate_node)
-workflow.add_node("questions_agent", questions_to_reconsider_node)
-workflow.add_node("synthesizer_agent", synthesizer_node)
+def open_checkpointer() -> "SqliteSaver":
+    """SQLite checkpointer storing DealState after every node, at DATA_DIR/checkpoints.sqlite"""
+    from langgraph.checkpoint.sqlite import SqliteSaver
 
-workflow.set_entry_point("research_agent")
-workflow.add_edge("research_agent", "market_agent")
-workflow.add_edge("market_agent", "product_agent")
-workflow.add_edge("product_agent", "traction_agent")
-workflow.add_edge("traction_agent", "debate_agent")
-workflow.add_edge("debate_agent", "questions_agent")
-workflow.add_edge("questions_agent", "synthesizer_agent")
-workflow.add_edge("synthesizer_agent", END)
+    path = DATA_DIR / "checkpoints.sqlite"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # SqliteSaver serializes access with its own lock, so one connection serves every worker thread
+    return SqliteSaver(sqlite3.connect(path, check_same_thread=False))
+
+
+get_checkpointer = lazy(open_checkpointer)
+
+
+def new_thread_id() -> str:
+    return uuid.uuid4().hex[:12]
+
+
+def thread_config(thread_id: str) -> dict:
+    return {"configurable": {"thread_id": thread_id}}
+
+
+def graph_input(graph, initial_state: DealState, config: dict):
+    """
+    What to start the graph with on this thread: None (resume from the last completed node)
+    if an earlier run on the thread stopped part way, otherwise the initial state.
+    """
+    if getattr(graph, "checkpointer", None) is None:
+        return initial_state
+    snapshot = graph.get_state(config)
+    if snapshot.next:
+        done = [node for node, field in NODE_OUTPUTS.items() if snapshot.values.get(field)]
+        print(f"Resuming thread {config['configurable']['thread_id']} before {', '.join(snapshot.next)} "
+              f"({len(done)} nodes already done)")
+        return None
+    return initial_state
+
+
+def run_deal(initial_state: DealState, thread_id: str = None, graph=None,
+             resources: Optional[DealResources] = None) -> DealState:
+    """
+    Run the checkpointed graph to completion; pass the thread_id of a failed run to resume it.
+    resources overrides the clients built from the API keys in the environment.
+    """
+    graph = graph or get_app()
+    config = thread_config(thread_id or new_thread_id())
+    with using_resources(resources):
+        return graph.invoke(graph_input(graph, initial_state, config), config)
+
+
+# Every run is checkpointed per node under a thread id (see run_deal / stream_deal)
+@lazy
+def get_app():
+    return build_workflow().compile(checkpointer=get_checkpointer())
+
+
+# asyncio-native graph: use `await get_async_app().ainvoke(state)` or `async for chunk in get_async_app().astream(state)`.
+# It is not checkpointed (SqliteSaver is sync-only); batch runs resume per deal instead.
+@lazy
+def get_async_app():
+    return build_workflow(use_async=True).compile()
+
+
+# The module-level names these getters replaced, still importable (`from agent import app`) and built on access
+LAZY_ATTRIBUTES = {
+    "llm": get_llm,
+    "llm_limiter": get_llm_limiter,
+    "context_cache": get_context_cache,
+    "search": get_search,
+    "search_cache": get_search_cache,
+    "page_fetcher": get_page_fetcher,
+    "tools": get_tools,
+    "checkpointer": get_checkpointer,
+    "app": get_app,
+    "async_app": get_async_app
+}
+
+
+def __getattr__(name: str):
+    if name in LAZY_ATTRIBUTES:
+        return LAZY_ATTRIBUTES[name]()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+# streaming
+
+def message_text(message) -> str:
+    """Text of a (streamed) chat message; Gemini may send content as a list of parts"""
+    content = getattr(message, 'content', '')
+    if isinstance(content, list):
+        return "".join(part.get('text', '') if isinstance(part, dict) else str(part) for part in content)
+    return content or ""
+
+
+STREAM_MODES = ["debug", "messages", "updates", "values"]
+
+
+def _stream_event(mode: str, chunk):
+    """Translate one LangGraph stream chunk into a (kind, node, payload) event, or None"""
+    if mode == "debug" and chunk.get("type") == "task":
+        return ("start", chunk["payload"]["name"], None)
+    if mode == "messages":
+        message, metadata = chunk
+        text = message_text(message)
+        if text:
+            return ("token", metadata.get("langgraph_node"), text)
+    return None
+
+
+def stream_deal(initial_state: DealState, graph=None, thread_id: str = None,
+                resources: Optional[DealResources] = None):
+    """
+    Run the graph and yield events as they happen:
+      ("start", node, None)    - a node began
+      ("token", node, text)    - a piece of LLM output from that node
+      ("done", node, update)   - a node finished with this state update
+      ("result", None, state)  - the final state, always last
+    Reusing the thread_id of a run that failed resumes it after its last completed node.
+    resources overrides the clients built from the API keys in the environment.
+    """
+    graph = graph or get_app()
+    config = thread_config(thread_id or new_thread_id())
+    final_state = None
+    with using_resources(resources):
+        for mode, chunk in graph.stream(graph_input(graph, initial_state, config), config, stream_mode=STREAM_MODES):
+            if mode == "updates":
+                for node, update in chunk.items():
+                    yield ("done", node, update)
+            elif mode == "values":
+                final_state = chunk
+            else:
+                event = _stream_event(mode, chunk)
+                if event:
+                    yield event
+    yield ("result", None, final_state)
+
+
+async def astream_deal(initial_state: DealState, graph=None, resources: Optional[DealResources] = None):
+    """Async variant of stream_deal, driving get_async_app() by default"""
+    final_state = None
+    with using_resources(resources):
+        async for mode, chunk in (graph or get_async_app()).astream(initial_state, stream_mode=STREAM_MODES):
+            if mode == "updates":
+                for node, update in chunk.items():
+                    yield ("done", node, update)
+            elif mode == "values":
+                final_state = chunk
+            else:
+                event = _stream_event(mode, chunk)
+                if event:
+                    yield event
+    yield ("result", None, final_state)
 
-app = workflow.compile()
 
 # main execution
 
 if __name__ == "__main__":
     
+    # Pass --sequential to run the old chained graph as a timing baseline,
+    # --async to run the asyncio-native nodes, and --resume <thread_id> to pick up a failed run
+    sequential = "--sequential" in sys.argv
+    use_async = "--async" in sys.argv
+    thread_id = sys.argv[sys.argv.index("--resume") + 1] if "--resume" in sys.argv else new_thread_id()
+    if sequential:
+        runner = build_workflow(parallel=False, use_async=use_async).compile(
+            checkpointer=None if use_async else get_checkpointer()
+        )
+    else:
+        runner = get_async_app() if use_async else get_app()
+    
     # Test with MINIMAL INPUT - just company name and URL
     print("="*60)
     print("TESTING WITH MINIMAL INPUT (Company Name + URL Only)")
     print("="*60)
     
     initial_state = {
+        "deal_id": "",
         "company_name": "Anthropic",
         "company_url": "https://www.anthropic.com",
         "raw_input": "",  # Empty - simulating minimal input
@@ -697,12 +1505,28 @@ if __name__ == "__main__":
         "market_analysis": "",
         "product_analysis": "",
         "traction_analysis": "",
+        "market_data": {},
+        "product_data": {},
+        "traction_data": {},
         "debate_transcript": "",
         "questions_to_reconsider": "",
-        "final_memo": ""
+        "final_memo": "",
+        "node_timings": [],
+        "node_fingerprints": {},
+        "failed_nodes": {},
+        "prompt_budget": []
     }
     
-    result = app.invoke(initial_state)
+    if use_async:
+        async def run_async():
+            try:
+                return await runner.ainvoke(initial_state)
+            finally:
+                await get_page_fetcher().aclose()
+        result = asyncio.run(run_async())
+    else:
+        print(f"Thread id: {thread_id} (rerun with --resume {thread_id} if this run fails)")
+        result = run_deal(initial_state, thread_id, graph=runner)
     
     print("\n" + "="*60)
     print("FINAL ANALYSIS REPORT")
@@ -742,4 +1566,27 @@ if __name__ == "__main__":
     print("INVESTMENT RECOMMENDATION")
     print("="*60)
     print(result['final_memo'])
+    
+    print("\n" + "="*60)
+    print(f"NODE TIMINGS ({'sequential' if sequential else 'parallel'} graph)")
+    print("="*60)
+    print(format_timing_report(result.get('node_timings', [])))
+    
+    print("\n" + "-"*60)
+    print("PROMPT BUDGET")
+    print("-"*60)
+    print(format_budget_report(result.get('prompt_budget', [])))
+    
+    llm = get_llm()
+    if isinstance(getattr(llm, 'cache', None), DiskCache):
+        print(f"\nLLM cache: {llm.cache.stats()}")
+    print(f"LLM rate limiter: {get_llm_limiter().stats()}")
+    if get_context_cache() is not None:
+        print(f"Deal context cache: {get_context_cache().stats()}")
+    print(f"Search cache: {get_search_cache().stats()} (coalesced: {search_flight.coalesced})")
+    print(f"Page cache: {get_page_fetcher().http_cache.stats()}")
+    if get_knowledge_base() is not None:
+        print(f"Knowledge base: {get_knowledge_base().stats()}")
+    if evidence_for(deal_key(result)) is not None:
+        print(f"Evidence index: {evidence_for(deal_key(result)).stats()}")
     print("\n")
@@ -0,0 +1,181 @@
+"""
+Batch portfolio analysis.
+
+Runs the deal graph over every company in a CSV or JSONL file with bounded concurrency
+and a global LLM rate limit (requests and tokens per minute, shared with any other
+DealScout process on the machine), appending one JSON line per finished deal to the output file.
+Re-running with the same output file skips deals that are already done, so a crash only
+loses the deals that were in flight. The batch graph is not checkpointed (SqliteSaver is
+sync-only), so a deal that was in flight is analysed again from the start, not resumed
+mid-graph; its cached LLM calls and HTTP responses make the rerun cheaper, not free.
+
+Usage:
+    python src/batch.py companies.csv -o results.jsonl --concurrency 8 --llm-rpm 60 --llm-tpm 500000
+
+Input columns / keys: name (or company_name), url (or company_url / website), optional pitch.
+"""
+import os
+import csv
+import json
+import time
+import asyncio
+import hashlib
+import argparse
+
+NAME_KEYS = ("name", "company_name", "company")
+URL_KEYS = ("url", "company_url", "website")
+PITCH_KEYS = ("pitch", "pitch_text", "raw_input")
+
+
+def first_value(row: dict, keys: tuple) -> str:
+    for key in keys:
+        if row.get(key):
+            return str(row[key]).strip()
+    return ""
+
+
+def read_companies(path: str) -> list:
+    """Read [{name, url, pitch}] from a .csv or .jsonl file"""
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.endswith(".csv"):
+            rows = [{k.strip().lower(): v for k, v in row.items() if k} for row in csv.DictReader(f)]
+        else:
+            rows = [json.loads(line) for line in f if line.strip()]
+
+    companies = []
+    for row in rows:
+        company = {
+            "name": first_value(row, NAME_KEYS),
+            "url": first_value(row, URL_KEYS),
+            "pitch": first_value(row, PITCH_KEYS)
+        }
+        if company["name"] or company["url"] or company["pitch"]:
+            companies.append(company)
+    return companies
+
+
+def deal_key(company: dict) -> str:
+    """Name and URL identify a deal; rows with only a pitch are told apart by the pitch's hash"""
+    if company["name"] or company["url"]:
+        return f"{company['name'].lower()}|{company['url'].lower()}"
+    return "pitch:" + hashlib.sha256(company["pitch"].encode("utf-8")).hexdigest()[:16]
+
+
+def completed_keys(output_path: str) -> set:
+    """Deals already written successfully to a previous run's output"""
+    if not os.path.exists(output_path):
+        return set()
+    done = set()
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # a line cut off by a crash
+            if record.get("status") == "ok":
+                done.add(record["key"])
+    return done
+
+
+def initial_state(company: dict) -> dict:
+    return {
+        # A rerun after a crash replaces, rather than duplicates, the deal's knowledge base entry
+        "deal_id": deal_key(company),
+        "company_name": company["name"],
+        "company_url": company["url"],
+        "raw_input": company["pitch"],
+        "pitch_text": "",
+        "market_analysis": "",
+        "product_analysis": "",
+        "traction_analysis": "",
+        "market_data": {},
+        "product_data": {},
+        "traction_data": {},
+        "debate_transcript": "",
+        "questions_to_reconsider": "",
+        "final_memo": "",
+        "node_timings": [],
+        "node_fingerprints": {},
+        "failed_nodes": {},
+        "prompt_budget": []
+    }
+
+
+class ResultWriter:
+    """Appends one JSON line per deal and fsyncs it, so finished deals survive a crash"""
+
+    def __init__(self, path: str):
+        self.file = open(path, "a", encoding="utf-8")
+
+    def write(self, record: dict):
+        self.file.write(json.dumps(record, default=str) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        self.file.close()
+
+
+async def analyze(graph, company: dict, semaphore: asyncio.Semaphore, writer: ResultWriter, counter: dict):
+    async with semaphore:
+        started = time.perf_counter()
+        record = {"key": deal_key(company), "company_name": company["name"], "company_url": company["url"]}
+        try:
+            result = await graph.ainvoke(initial_state(company))
+            failed = {node: error for node, error in (result.get("failed_nodes") or {}).items() if error}
+            # A deal with a failed analyst is written but not counted as done, so the next run retries it
+            if failed:
+                record.update(status="partial", error=f"failed nodes: {failed}", result=result)
+            else:
+                record.update(status="ok", result=result)
+        except Exception as e:
+            record.update(status="error", error=str(e))
+        record["seconds"] = round(time.perf_counter() - started, 2)
+        writer.write(record)
+
+        counter["done"] += 1
+        mark = "ok" if record["status"] == "ok" else f"{record['status'].upper()}: {record['error']}"
+        print(f"[{counter['done']}/{counter['total']}] {company['name'] or company['url']} - {mark} ({record['seconds']}s)")
+
+
+async def run_batch(companies: list, output_path: str, concurrency: int):
+    # The shared llm is built on first use, after main() has put --llm-rpm/--llm-tpm in the environment
+    from agent import get_async_app, get_llm_limiter, get_page_fetcher
+
+    semaphore = asyncio.Semaphore(concurrency)
+    writer = ResultWriter(output_path)
+    counter = {"done": 0, "total": len(companies)}
+    try:
+        await asyncio.gather(*(analyze(get_async_app(), c, semaphore, writer, counter) for c in companies))
+    finally:
+        writer.close()
+        # The scraper's AsyncClient belongs to this loop, which asyncio.run is about to close
+        await get_page_fetcher().aclose()
+        print(f"LLM rate limiter: {get_llm_limiter().stats()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="CSV or JSONL file of companies")
+    parser.add_argument("-o", "--output", default="results.jsonl", help="JSONL file results are appended to")
+    parser.add_argument("--concurrency", type=int, default=4, help="deals analysed at the same time")
+    parser.add_argument("--llm-rpm", type=float, default=None, help="global cap on Gemini requests per minute")
+    parser.add_argument("--llm-tpm", type=float, default=None, help="global cap on Gemini tokens per minute")
+    args = parser.parse_args()
+
+    if args.llm_rpm is not None:
+        os.environ["DEALSCOUT_LLM_RPM"] = str(args.llm_rpm)
+    if args.llm_tpm is not None:
+        os.environ["DEALSCOUT_LLM_TPM"] = str(args.llm_tpm)
+
+    companies = read_companies(args.input)
+    done = completed_keys(args.output)
+    pending = [c for c in companies if deal_key(c) not in done]
+    print(f"{len(companies)} companies, {len(companies) - len(pending)} already done, {len(pending)} to analyse "
+          f"(concurrency {args.concurrency})")
+    if pending:
+        asyncio.run(run_batch(pending, args.output, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Prompt size budgeting for the downstream nodes.
+
+The questions and synthesizer prompts paste the pitch, the three analyst reports and the
+debate into a single request. fit_sections() measures each section and, while the total is
+over budget, shrinks the most expendable ones: analyst reports are swapped for a compact
+form of their structured report (or of the JSON in their text), then free text is clipped
+to its opening, starting with reports that had no JSON to summarize. Summaries are
+memoized by content, so the synthesizer reuses the ones built for the questions node.
+
+Set the budget with DEALSCOUT_PROMPT_TOKEN_BUDGET (0 disables compression).
+"""
+import os
+import json
+import functools
+from typing import List, Optional, Tuple
+
+from ratelimit import estimate_tokens
+from schemas import parse_json_object
+
+PROMPT_TOKEN_BUDGET = int(os.getenv("DEALSCOUT_PROMPT_TOKEN_BUDGET", "6000"))
+
+# Sections holding an analyst's JSON report
+REPORT_SECTIONS = {"market_analysis", "product_analysis", "traction_analysis"}
+
+# Compact report form: long strings are clipped and long lists cut
+SUMMARY_FIELD_CHARS = 300
+SUMMARY_LIST_ITEMS = 5
+
+# Room left for the "[... trimmed N tokens]" note
+TRIM_MARKER_TOKENS = 10
+
+# No section is clipped below this, however far over budget the prompt is
+MIN_SECTION_TOKENS = 150
+
+
+def compact(value):
+    if isinstance(value, dict):
+        return {key: compact(item) for key, item in value.items()}
+    if isinstance(value, list):
+        items = [compact(item) for item in value[:SUMMARY_LIST_ITEMS]]
+        if len(value) > SUMMARY_LIST_ITEMS:
+            items.append(f"... {len(value) - SUMMARY_LIST_ITEMS} more")
+        return items
+    if isinstance(value, str) and len(value) > SUMMARY_FIELD_CHARS:
+        return value[:SUMMARY_FIELD_CHARS].rsplit(" ", 1)[0] + "..."
+    return value
+
+
+def summarize_data(data: dict) -> str:
+    """Compact JSON form of a structured report"""
+    return json.dumps(compact(data), ensure_ascii=False)
+
+
+@functools.lru_cache(maxsize=256)
+def summarize_report(text: str) -> str:
+    """Structured summary of a report: its JSON fields, compacted; unparseable reports are returned as-is"""
+    data = parse_json_object(text)
+    if data is None:
+        return text
+    return summarize_data(data)
+
+
+def clip_text(text: str, max_tokens: int) -> str:
+    """Keep roughly the first max_tokens tokens, cut at a line break where possible"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    head = text[:(max_tokens - TRIM_MARKER_TOKENS) * 4]
+    cut = head.rfind("\n")
+    if cut > len(head) // 2:
+        head = head[:cut]
+    return f"{head}\n[... trimmed {estimate_tokens(text) - estimate_tokens(head)} tokens]"
+
+
+def fit_sections(sections: dict, compress_order: List[str], budget: int = PROMPT_TOKEN_BUDGET,
+                 reports: Optional[dict] = None) -> Tuple[dict, dict]:
+    """
+    Shrink prompt sections (name -> text) until their total fits the token budget.
+    compress_order lists the sections that may be shrunk, most expendable first: reports in it
+    are summarized first, then reports that couldn't be summarized, the text sections and, if
+    need be, the summaries are clipped, in that order.
+    reports maps report sections to their structured reports, summarized without parsing the text.
+    Returns the fitted sections and a usage record for the run's prompt budget report.
+    """
+    fitted = dict(sections)
+    sizes = {name: estimate_tokens(text) for name, text in fitted.items()}
+    before = sum(sizes.values())
+    compressed = []
+
+    def shrink(name: str, text: str):
+        if estimate_tokens(text) < sizes[name]:
+            fitted[name], sizes[name] = text, estimate_tokens(text)
+            if name not in compressed:
+                compressed.append(name)
+
+    if budget > 0:
+        unparsed = []
+        for name in compress_order:
+            if sum(sizes.values()) <= budget:
+                break
+            if name in REPORT_SECTIONS:
+                data = (reports or {}).get(name)
+                summary = summarize_data(data) if data else summarize_report(fitted[name])
+                if summary == fitted[name]:
+                    unparsed.append(name)  # No JSON in it: the least useful free text, so clipped first
+                shrink(name, summary)
+
+        clip_order = unparsed + [n for n in compress_order if n not in REPORT_SECTIONS] + \
+                     [n for n in compress_order if n in REPORT_SECTIONS and n not in unparsed]
+        for name in clip_order:
+            overflow = sum(sizes.values()) - budget
+            if overflow <= 0:
+                break
+            shrink(name, clip_text(fitted[name], max(MIN_SECTION_TOKENS, sizes[name] - overflow)))
+
+    after = sum(sizes.values())
+    return fitted, {
+        "tokens_before": before,
+        "tokens_after": after,
+        "tokens_saved": before - after,
+        "compressed": compressed
+    }
+
+
+def format_budget_report(usages: List[dict]) -> str:
+    """One line per budgeted prompt, plus the run's total savings"""
+    if not usages:
+        return "No prompt budget records"
+    lines = []
+    for usage in usages:
+        shrunk = f" ({', '.join(usage['compressed'])})" if usage["compressed"] else ""
+        lines.append(f"{usage['node']:<20}{usage['tokens_before']:>8} -> {usage['tokens_after']:>6} tokens{shrunk}")
+    lines.append(f"Tokens saved this run: {sum(u['tokens_saved'] for u in usages)}")
+    return "\n".join(lines)
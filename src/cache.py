@@ -0,0 +1,272 @@
+"""
+Local on-disk caches shared by the agent workflows.
+
+DiskCache is a small SQLite-backed key/value store with a TTL, a size cap with LRU
+eviction and hit/miss counters. It is safe to share across threads and processes.
+
+CachedChatModel wraps a LangChain chat model so identical requests (same model,
+temperature, messages and bound tool schema) are answered from a DiskCache.
+
+SingleFlight coalesces concurrent identical calls so only one reaches the upstream API.
+"""
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import hashlib
+import threading
+from concurrent.futures import Future
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Optional
+
+from paths import CACHE_DIR
+
+
+class DiskCache:
+    """SQLite key/value cache with per-entry TTL, a total size cap and LRU eviction"""
+
+    def __init__(self, path, ttl_seconds: float, max_bytes: int):
+        self.path = Path(path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS entries (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created REAL NOT NULL,
+                    accessed REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+
+    @classmethod
+    def named(cls, name: str, ttl_seconds: float, max_bytes: int) -> "DiskCache":
+        """Open (or create) the cache file CACHE_DIR/<name>.sqlite"""
+        return cls(CACHE_DIR / f"{name}.sqlite", ttl_seconds, max_bytes)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def get(self, key: str, ttl_seconds: Optional[float] = None) -> Optional[str]:
+        """Return the cached value, or None on a miss or if the entry is older than its TTL"""
+        ttl = self.ttl_seconds if ttl_seconds is None else ttl_seconds
+        now = time.time()
+        with self._lock, self._connect() as conn:
+            row = conn.execute("SELECT value, created FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            value, created = row
+            if now - created > ttl:
+                conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self.expired += 1
+                self.misses += 1
+                return None
+            conn.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return value
+
+    def put(self, key: str, value: str):
+        """Store a value, then evict least recently used entries until under max_bytes"""
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock, self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now)
+            )
+            self._evict(conn)
+
+    def _evict(self, conn):
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in conn.execute("SELECT key, size FROM entries ORDER BY accessed ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+            self.evictions += 1
+
+    def clear(self):
+        with self._lock, self._connect() as conn:
+            conn.execute("DELETE FROM entries")
+
+    def stats(self) -> dict:
+        """Hit/miss counters for this process plus the current size of the cache file"""
+        with self._lock, self._connect() as conn:
+            entries, total = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM entries").fetchone()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "expired": self.expired,
+            "evictions": self.evictions,
+            "entries": entries,
+            "bytes": total
+        }
+
+
+def hash_key(payload) -> str:
+    """Content address for any JSON-serializable payload"""
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+def encode_message(message) -> str:
+    from langchain_core.messages import message_to_dict
+    return json.dumps(message_to_dict(message))
+
+
+def decode_message(text: str):
+    from langchain_core.messages import messages_from_dict
+    return messages_from_dict([json.loads(text)])[0]
+
+
+def message_key(message) -> dict:
+    """What identifies a message in a request: its text plus, for tool rounds, the calls and results it carries"""
+    key = {"type": message.type, "content": message.content}
+    tool_calls = getattr(message, "tool_calls", None)
+    if tool_calls:
+        key["tool_calls"] = [{"name": call["name"], "args": call["args"], "id": call.get("id")} for call in tool_calls]
+    if getattr(message, "tool_call_id", None):
+        key["tool_call_id"] = message.tool_call_id
+        key["name"] = getattr(message, "name", None)
+    return key
+
+
+class CachedChatModel:
+    """
+    Drop-in wrapper for a chat model: invoke/ainvoke/bind_tools are cached,
+    everything else is passed through to the wrapped model.
+    """
+
+    def __init__(self, llm, cache: DiskCache, bound=None, tool_schema=None):
+        self.llm = llm
+        self.cache = cache
+        self._runnable = bound if bound is not None else llm
+        self._tool_schema = tool_schema or []
+
+    def bind_tools(self, tools, **kwargs) -> "CachedChatModel":
+        from langchain_core.utils.function_calling import convert_to_openai_tool
+
+        schema = [convert_to_openai_tool(tool) for tool in tools]
+        return CachedChatModel(self.llm, self.cache, self.llm.bind_tools(tools, **kwargs), schema)
+
+    def cache_key(self, input, **kwargs) -> str:
+        from langchain_core.messages import HumanMessage
+
+        messages = [HumanMessage(content=input)] if isinstance(input, str) else input
+        return hash_key({
+            "model": getattr(self.llm, "model", None) or getattr(self.llm, "model_name", None),
+            "temperature": getattr(self.llm, "temperature", None),
+            "messages": [message_key(m) for m in messages],
+            "tools": self._tool_schema,
+            # e.g. cached_content: the same messages against another deal's context are a different request
+            "kwargs": {name: kwargs[name] for name in sorted(kwargs)}
+        })
+
+    def invoke(self, input, config=None, **kwargs):
+        key = self.cache_key(input, **kwargs)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return decode_message(cached)
+
+        response = self._runnable.invoke(input, config=config, **kwargs)
+        self.cache.put(key, encode_message(response))
+        return response
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        key = self.cache_key(input, **kwargs)
+        cached = await asyncio.to_thread(self.cache.get, key)
+        if cached is not None:
+            return decode_message(cached)
+
+        response = await self._runnable.ainvoke(input, config=config, **kwargs)
+        await asyncio.to_thread(self.cache.put, key, encode_message(response))
+        return response
+
+    def __getattr__(self, name):
+        return getattr(self._runnable, name)
+
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key: one caller does the work, the rest share its result"""
+
+    def __init__(self):
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._tasks = {}
+
+    def do(self, key: str, fn):
+        """Run fn() unless a call for key is already in flight on another thread, then wait for that one"""
+        with self._lock:
+            future = self._calls.get(key)
+            leader = future is None
+            if leader:
+                future = Future()
+                self._calls[key] = future
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            return future.result()
+
+        try:
+            result = fn()
+            future.set_result(result)
+            return result
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+    async def ado(self, key: str, coro_fn):
+        """Async variant of do(): await coro_fn() unless a call for key is already running on this loop"""
+        task_key = (id(asyncio.get_running_loop()), key)
+        task = self._tasks.get(task_key)
+        if task is None:
+            task = asyncio.ensure_future(coro_fn())
+            self._tasks[task_key] = task
+            task.add_done_callback(lambda _: self._tasks.pop(task_key, None))
+        else:
+            self.coalesced += 1
+        # shield so one cancelled waiter doesn't cancel the shared call
+        return await asyncio.shield(task)
+
+
+def cached_llm(llm):
+    """
+    Wrap llm in a CachedChatModel backed by CACHE_DIR/llm.sqlite.
+    Controlled by DEALSCOUT_LLM_CACHE (set to 0 to disable), DEALSCOUT_LLM_CACHE_TTL (seconds)
+    and DEALSCOUT_LLM_CACHE_MAX_MB.
+    """
+    if os.getenv("DEALSCOUT_LLM_CACHE", "1") == "0":
+        return llm
+    cache = DiskCache.named(
+        "llm",
+        ttl_seconds=float(os.getenv("DEALSCOUT_LLM_CACHE_TTL", 7 * 24 * 3600)),
+        max_bytes=int(float(os.getenv("DEALSCOUT_LLM_CACHE_MAX_MB", "256")) * 1024 * 1024)
+    )
+    return CachedChatModel(llm, cache)
@@ -0,0 +1,150 @@
+"""
+Condensing tool results before they go back to the model.
+
+An analyst's tool calls often overlap: two searches return the same pages, and a scraped
+page repeats what the snippets already said. condense_tool_results() splits every result
+into passages (one per search hit, ~600-character windows of scraped text), drops hits
+whose URL was already seen and passages that are near-duplicates of an earlier one (word
+3-shingle Jaccard similarity), ranks what is left by BM25 relevance to the node's task,
+and keeps the best passages that fit the token budget, in their original order.
+
+Set the budget with DEALSCOUT_TOOL_RESULT_TOKEN_BUDGET (0 disables condensing).
+"""
+import os
+import re
+import math
+from collections import Counter
+from typing import List, Tuple
+
+from ratelimit import estimate_tokens
+
+TOOL_RESULT_TOKEN_BUDGET = int(os.getenv("DEALSCOUT_TOOL_RESULT_TOKEN_BUDGET", "2500"))
+
+# Scraped text is split into windows of about this many characters, at line breaks
+PASSAGE_CHARS = 600
+
+SHINGLE_SIZE = 3
+NEAR_DUPLICATE_JACCARD = 0.7
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SEARCH_HIT = re.compile(r"\d+\. ")
+HIT_BOUNDARY = re.compile(r"\n\s*\n(?=\d+\. )")
+URL = re.compile(r"https?://\S+")
+WORD = re.compile(r"[\w$%]+(?:[.,]\d+)*", re.UNICODE)
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "you your we our their what which who how why".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    """Lower-cased words and numbers in any script (keeping $, % and decimals), without stopwords"""
+    return [word for word in WORD.findall(text.lower()) if word not in STOPWORDS]
+
+
+def bm25_scores(query: List[str], documents: List[List[str]]) -> List[float]:
+    """BM25 score of each tokenized document for the tokenized query"""
+    if not documents:
+        return []
+    average_length = sum(len(doc) for doc in documents) / len(documents) or 1.0
+    frequency = Counter(term for doc in documents for term in set(doc))
+    idf = {term: math.log(1 + (len(documents) - n + 0.5) / (n + 0.5)) for term, n in frequency.items()}
+    terms = set(query)
+    scores = []
+    for doc in documents:
+        counts = Counter(doc)
+        norm = BM25_K1 * (1 - BM25_B + BM25_B * len(doc) / average_length)
+        scores.append(sum(
+            idf[term] * counts[term] * (BM25_K1 + 1) / (counts[term] + norm)
+            for term in terms if term in counts
+        ))
+    return scores
+
+
+def shingles(words: List[str]) -> set:
+    """Word SHINGLE_SIZE-grams; empty for a passage without words"""
+    if len(words) < SHINGLE_SIZE:
+        return {tuple(words)} if words else set()
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)}
+
+
+def jaccard(a: set, b: set) -> float:
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+def split_windows(text: str, size: int = PASSAGE_CHARS) -> List[str]:
+    """Pack lines into windows of about size characters; longer lines are cut at spaces"""
+    windows, current = [], ""
+    for line in text.splitlines():
+        line = line.strip()
+        while len(line) > size:
+            cut = line.rfind(" ", 0, size)
+            cut = cut if cut > size // 2 else size
+            windows.append(line[:cut])
+            line = line[cut:].strip()
+        if current and len(current) + len(line) + 1 > size:
+            windows.append(current)
+            current = ""
+        if line:
+            current = f"{current}\n{line}" if current else line
+    if current:
+        windows.append(current)
+    return windows
+
+
+def split_passages(result: str) -> List[str]:
+    """Search results -> one passage per hit; anything else -> line-aligned windows"""
+    if SEARCH_HIT.match(result):
+        return [hit.strip() for hit in HIT_BOUNDARY.split(result) if hit.strip()]
+    return split_windows(result)
+
+
+def condense_tool_results(results: List[Tuple[str, str]], task: str,
+                          budget: int = TOOL_RESULT_TOKEN_BUDGET) -> Tuple[List[Tuple[str, str]], dict]:
+    """
+    Deduplicate, rank and budget [(tool_name, result)] for a node whose task is `task`.
+    Returns the condensed [(tool_name, result)] (results left empty are dropped) and a stats record.
+    """
+    tokens_before = sum(estimate_tokens(result) for _, result in results)
+    stats = {"tokens_before": tokens_before, "tokens_after": tokens_before, "duplicates": 0, "over_budget": 0}
+    if budget <= 0 or not results:
+        return results, stats
+
+    # (result index, text, words)
+    passages, seen_urls, seen_shingles = [], set(), []
+    for r, (_, result) in enumerate(results):
+        for text in split_passages(result):
+            urls = {url.rstrip("/.,)").lower() for url in URL.findall(text)}
+            words = tokenize(text)
+            signature = shingles(words)
+            # A passage without words (e.g. only punctuation) has no signature to compare, so it is never a duplicate
+            near_duplicate = signature and any(jaccard(signature, s) >= NEAR_DUPLICATE_JACCARD for s in seen_shingles)
+            if (urls and urls <= seen_urls) or near_duplicate:
+                stats["duplicates"] += 1
+                continue
+            seen_urls |= urls
+            if signature:
+                seen_shingles.append(signature)
+            passages.append((r, text, words))
+
+    scores = bm25_scores(tokenize(task), [words for _, _, words in passages])
+    ranked = sorted(range(len(passages)), key=lambda i: -scores[i])
+    kept, used = set(), 0
+    for i in ranked:
+        cost = estimate_tokens(passages[i][1])
+        if used + cost > budget:
+            stats["over_budget"] += 1
+            continue
+        kept.add(i)
+        used += cost
+
+    condensed = []
+    for r, (tool_name, _) in enumerate(results):
+        texts = [text for i, (source, text, _) in enumerate(passages) if source == r and i in kept]
+        if texts:
+            condensed.append((tool_name, "\n\n".join(texts)))
+    stats["tokens_after"] = sum(estimate_tokens(result) for _, result in condensed)
+    return condensed, stats
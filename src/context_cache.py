@@ -0,0 +1,202 @@
+"""
+Gemini context caching for the per-deal pitch.
+
+All three analysts (two calls each) and the questions and synthesizer nodes resend the same
+pitch. With DEALSCOUT_CONTEXT_CACHE=gemini the pitch is uploaded once per deal as Gemini
+cached content and those calls reference it by handle, so it isn't re-billed at the full
+input rate or re-processed on every call. DEALSCOUT_CONTEXT_CACHE=fake runs the same flow
+against a local in-memory backend that re-inlines the context, so it can be exercised offline.
+
+Gemini rejects cached requests that also set a system instruction or tools, so a context
+used by tool-calling nodes carries the tool declarations itself, and callers fold their
+system prompt into the user turn. Contexts below Gemini's minimum cacheable size are sent inline.
+"""
+import os
+import time
+import asyncio
+import datetime
+import threading
+from typing import Optional
+
+from cache import SingleFlight, hash_key
+from ratelimit import estimate_tokens
+
+CONTEXT_CACHE_BACKEND = os.getenv("DEALSCOUT_CONTEXT_CACHE", "off").lower()
+CONTEXT_CACHE_TTL = float(os.getenv("DEALSCOUT_CONTEXT_CACHE_TTL", "900"))
+
+# A handle is not reused this close to its expiry, so a call never references a vanished cache
+EXPIRY_MARGIN = 60
+
+# Gemini only accepts explicit cached content of at least this many tokens (2.5 Flash)
+GEMINI_MIN_CACHE_TOKENS = 1024
+
+
+def gemini_schema(schema: dict) -> dict:
+    """JSON schema (as LangChain emits it) -> the OpenAPI subset Gemini function declarations accept"""
+    converted = {}
+    if "type" in schema:
+        converted["type"] = schema["type"].upper()
+    if schema.get("description"):
+        converted["description"] = schema["description"]
+    if "properties" in schema:
+        converted["properties"] = {name: gemini_schema(prop) for name, prop in schema["properties"].items()}
+    if "items" in schema:
+        converted["items"] = gemini_schema(schema["items"])
+    if schema.get("required"):
+        converted["required"] = list(schema["required"])
+    return converted
+
+
+def function_declarations(tools: list) -> list:
+    from langchain_core.utils.function_calling import convert_to_openai_tool
+
+    declarations = []
+    for tool in tools:
+        function = convert_to_openai_tool(tool)["function"]
+        declarations.append({
+            "name": function["name"],
+            "description": function.get("description", ""),
+            "parameters": gemini_schema(function.get("parameters") or {"type": "object", "properties": {}})
+        })
+    return declarations
+
+
+class GeminiContextBackend:
+    """Stores contexts as Gemini cached content (google-generativeai caching API)"""
+
+    name = "gemini"
+
+    def __init__(self, model: str, api_key: Optional[str] = None):
+        import google.generativeai as genai
+        from google.generativeai import caching
+
+        genai.configure(api_key=api_key or os.getenv("GOOGLE_API_KEY"))
+        self.caching = caching
+        self.model = model
+
+    def create(self, text: str, tools: Optional[list], ttl: float) -> str:
+        cached = self.caching.CachedContent.create(
+            model=f"models/{self.model}",
+            display_name="dealscout-deal-context",
+            contents=[{"role": "user", "parts": [{"text": text}]}],
+            tools=[{"function_declarations": function_declarations(tools)}] if tools else None,
+            ttl=datetime.timedelta(seconds=ttl)
+        )
+        return cached.name
+
+    def request(self, llm, handle: str, messages: list) -> tuple:
+        """(runnable, messages, invoke kwargs) for a call that references the cached context"""
+        return llm, messages, {"cached_content": handle}
+
+
+class FakeContextBackend:
+    """Offline stand-in: keeps contexts in memory and puts them back in front of each request"""
+
+    name = "fake"
+
+    def __init__(self):
+        self.contexts = {}
+
+    def create(self, text: str, tools: Optional[list], ttl: float) -> str:
+        handle = f"cachedContents/fake-{hash_key({'text': text, 'tools': [t.name for t in tools or []]})[:16]}"
+        self.contexts[handle] = (text, tools)
+        return handle
+
+    def request(self, llm, handle: str, messages: list) -> tuple:
+        from langchain_core.messages import HumanMessage
+
+        text, tools = self.contexts[handle]
+        runnable = llm.bind_tools(tools) if tools else llm
+        return runnable, [HumanMessage(content=text), *messages], {}
+
+
+class ContextCache:
+    """
+    Per-deal context handles: the first caller uploads, concurrent callers (the parallel
+    analysts) wait for that upload, and later callers reuse the handle until it nears expiry.
+    """
+
+    def __init__(self, backend, ttl_seconds: float = CONTEXT_CACHE_TTL, min_tokens: int = GEMINI_MIN_CACHE_TOKENS):
+        self.backend = backend
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+        self.created = 0
+        self.reused = 0
+        self.inline = 0
+        self.failed = 0
+        self.tokens_referenced = 0
+        self._handles = {}
+        self._sizes = {}
+        self._lock = threading.Lock()
+        self._flight = SingleFlight()
+
+    def handle_for(self, text: str, tools: Optional[list] = None) -> Optional[str]:
+        """A cached-content handle for this context, or None if it should be sent inline"""
+        if estimate_tokens(text) < self.min_tokens:
+            with self._lock:
+                self.inline += 1
+            return None
+        key = hash_key({"text": text, "tools": sorted(t.name for t in tools or [])})
+        with self._lock:
+            handle, expires = self._handles.get(key, (None, 0.0))
+            if handle and time.time() < expires:
+                self.reused += 1
+                return handle
+        return self._flight.do(key, lambda: self._create(key, text, tools))
+
+    async def ahandle_for(self, text: str, tools: Optional[list] = None) -> Optional[str]:
+        return await asyncio.to_thread(self.handle_for, text, tools)
+
+    def _create(self, key: str, text: str, tools: Optional[list]) -> Optional[str]:
+        try:
+            handle = self.backend.create(text, tools, self.ttl_seconds)
+        except Exception as e:
+            # Caching is an optimization; the call still works with the context inline
+            print(f"   Context cache upload failed, sending context inline: {e}")
+            with self._lock:
+                self.failed += 1
+            return None
+        with self._lock:
+            self.created += 1
+            self._handles[key] = (handle, time.time() + self.ttl_seconds - EXPIRY_MARGIN)
+            self._sizes[handle] = estimate_tokens(text)
+        return handle
+
+    def _request(self, llm, handle: str, messages: list) -> tuple:
+        with self._lock:
+            # Tokens this call takes from the cache instead of sending them again
+            self.tokens_referenced += self._sizes.get(handle, 0)
+        return self.backend.request(llm, handle, messages)
+
+    def invoke(self, llm, handle: str, messages: list, **kwargs):
+        runnable, messages, cache_kwargs = self._request(llm, handle, messages)
+        return runnable.invoke(messages, **kwargs, **cache_kwargs)
+
+    async def ainvoke(self, llm, handle: str, messages: list, **kwargs):
+        runnable, messages, cache_kwargs = self._request(llm, handle, messages)
+        return await runnable.ainvoke(messages, **kwargs, **cache_kwargs)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "backend": self.backend.name,
+                "created": self.created,
+                "reused": self.reused,
+                "inline": self.inline,
+                "failed": self.failed,
+                "tokens_referenced": self.tokens_referenced
+            }
+
+
+def context_cache_from_env(model: str, api_key: Optional[str] = None) -> Optional[ContextCache]:
+    """ContextCache for DEALSCOUT_CONTEXT_CACHE=gemini|fake, or None when it is off (the default)"""
+    if CONTEXT_CACHE_BACKEND in ("", "0", "off"):
+        return None
+    if CONTEXT_CACHE_BACKEND == "gemini":
+        backend, default_min = GeminiContextBackend(model, api_key), GEMINI_MIN_CACHE_TOKENS
+    elif CONTEXT_CACHE_BACKEND == "fake":
+        backend, default_min = FakeContextBackend(), 0
+    else:
+        raise ValueError(f"Unknown DEALSCOUT_CONTEXT_CACHE '{CONTEXT_CACHE_BACKEND}'. Use gemini, fake or off.")
+    min_tokens = int(os.getenv("DEALSCOUT_CONTEXT_CACHE_MIN_TOKENS", default_min))
+    return ContextCache(backend, min_tokens=min_tokens)
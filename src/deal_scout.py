@@ -7,6 +7,9 @@ from langchain_core.messages import HumanMessage
 
 from langgraph.graph import StateGraph, END
 
+from cache import cached_llm
+from prompt_registry import PROMPTS_DIR, PromptRegistry
+
 load_dotenv()
 
 # llm setup - Google Gemini 2.5 Flash
@@ -23,6 +26,13 @@ llm = ChatGoogleGenerativeAI(
     google_api_key=os.getenv("GOOGLE_API_KEY")
 )
 
+# Identical requests are answered from the on-disk cache (DEALSCOUT_LLM_CACHE=0 disables it)
+llm = cached_llm(llm)
+
+# prompt templates for this tool-less pipeline (prompts/basic/*.md)
+PROMPTS = PromptRegistry(PROMPTS_DIR / "basic")
+PROMPTS.load_all()
+
 # agent state definitions
 
 class DealState(TypedDict):
@@ -60,24 +70,12 @@ def research_company_node(state: DealState):
     # Otherwise generate synthetic pitch
     print(f"   Researching {company_name or 'company'} from web...")
     
-    prompt = f"""
-You are a research assistant. Given minimal information about a company, create a structured pitch deck.
-
-COMPANY NAME: {company_name or "Not provided"}
-COMPANY WEBSITE: {company_url or "Not provided"}
-ADDITIONAL INFO: {raw_input or "None"}
-
-Create a pitch deck with these sections:
-- Company name and website
-- Product/Service (what they do)
-- Target Market
-- Traction (users, revenue, growth if known)
-- Funding status
-- Team (founders if known)
-- Competitive Advantage
-
-If information is missing, note it as "Research needed" but create a complete structure.
-"""
+    prompt = PROMPTS.render(
+        "research_company",
+        company_name=company_name or "Not provided",
+        company_url=company_url or "Not provided",
+        raw_input=raw_input or "None"
+    )
     
     response = llm.invoke(prompt)
     
@@ -93,20 +91,7 @@ def market_analyst_node(state: DealState):
     """
     print("--- [1/6] market analyst working ---")
 
-    prompt = f"""
-You are a cynical Market Analyst for a VC firm. 
-Analyze this startup pitch strictly on market dynamics:
-
-PITCH DATA:
-{state['pitch_text']}
-
-TASKS:
-1. Estimate TAM/SAM/SOM (guess if not provided).
-2. List 3 potential incumbent competitors.
-3. Give a "Market Timing Score" (1-10) with 1 sentence reasoning.
-
-Output valid JSON only.
-"""
+    prompt = PROMPTS.render("market_analyst", pitch_text=state['pitch_text'])
 
     response = llm.invoke(prompt)
     return {"market_analysis": response.content}
@@ -118,22 +103,11 @@ def product_analyst_node(state: DealState):
     """
     print("--- [2/6] product analyst working ---")
 
-    prompt = f"""
-You are a Product Analyst. Evaluate the feasibility of this startup:
-
-PITCH DATA:
-{state['pitch_text']}
-
-COMPANY WEBSITE:
-{state.get('company_url', 'Not provided')}
-
-TASKS:
-1. Identify the core technical risk.
-2. Assess "Product-Market Fit" potential (Low/Medium/High).
-3. Is this a feature or a platform?
-
-Output valid JSON only.
-"""
+    prompt = PROMPTS.render(
+        "product_analyst",
+        pitch_text=state['pitch_text'],
+        company_url=state.get('company_url', 'Not provided')
+    )
 
     response = llm.invoke(prompt)
     return {"product_analysis": response.content}
@@ -145,25 +119,7 @@ def traction_analyst_node(state: DealState):
     """
     print("--- [3/6] traction analyst working ---")
 
-    prompt = f"""
-You are a financial analyst who is EXTREMELY skeptical of startup metrics.
-
-PITCH DATA:
-{state['pitch_text']}
-
-TASKS:
-1. Assess if claimed metrics are realistic
-2. Identify missing metrics
-3. Give a traction assessment (1-10)
-
-Be brutal. Most startups exaggerate.
-
-Output valid JSON with fields:
-- metrics_seem_realistic (true/false)
-- red_flags (array)
-- missing_metrics (array)
-- traction_score (1-10)
-"""
+    prompt = PROMPTS.render("traction_analyst", pitch_text=state['pitch_text'])
 
     response = llm.invoke(prompt)
     return {"traction_analysis": response.content}
@@ -175,30 +131,12 @@ def debate_node(state: DealState):
     """
     print("--- [4/6] cross validation debate starting ---")
 
-    prompt = f"""
-You are a Debate Moderator.
-
-MARKET ANALYST REPORT:
-{state['market_analysis']}
-
-PRODUCT ANALYST REPORT:
-{state['product_analysis']}
-
-TRACTION ANALYST REPORT:
-{state['traction_analysis']}
-
-TASK:
-Identify the biggest disagreement or tension between these reports.
-Simulate a dialogue where the analysts argue their points.
-
-Format:
-Market Agent: [Argument]
-Product Agent: [Rebuttal]
-Traction Agent: [Data point]
-...
-
-If they agree, have them reinforce each other's skepticism.
-"""
+    prompt = PROMPTS.render(
+        "debate_moderator",
+        market_analysis=state['market_analysis'],
+        product_analysis=state['product_analysis'],
+        traction_analysis=state['traction_analysis']
+    )
 
     response = llm.invoke(prompt)
     return {"debate_transcript": response.content}
@@ -210,46 +148,14 @@ def questions_to_reconsider_node(state: DealState):
     """
     print("--- [5/6] generating questions to reconsider ---")
 
-    prompt = f"""
-You are a seasoned VC Partner with 20+ years of experience.
-Based on ALL the analysis below, generate CRITICAL QUESTIONS to reconsider before investing.
-
-STARTUP PITCH:
-{state['pitch_text']}
-
-MARKET REPORT:
-{state['market_analysis']}
-
-PRODUCT REPORT:
-{state['product_analysis']}
-
-TRACTION REPORT:
-{state['traction_analysis']}
-
-DEBATE TRANSCRIPT:
-{state['debate_transcript']}
-
-YOUR TASK:
-Generate 8-12 hard-hitting questions across these categories:
-
-1. MARKET REALITY CHECK
-2. PRODUCT & TECHNOLOGY RISKS
-3. TRACTION & BUSINESS MODEL
-4. TEAM & EXECUTION
-
-Make these questions specific to THIS startup, not generic.
-
-FORMAT:
-## Questions to Reconsider Before Investing
-
-### Market Reality Check
-1. [Question] - *Why this matters: [Explanation]*
-
-### Product & Technology Risks
-1. [Question] - *Why this matters: [Explanation]*
-
-... and so on
-"""
+    prompt = PROMPTS.render(
+        "questions_to_reconsider",
+        pitch_text=state['pitch_text'],
+        market_analysis=state['market_analysis'],
+        product_analysis=state['product_analysis'],
+        traction_analysis=state['traction_analysis'],
+        debate_transcript=state['debate_transcript']
+    )
 
     response = llm.invoke(prompt)
     return {"questions_to_reconsider": response.content}
@@ -261,40 +167,16 @@ def synthesizer_node(state: DealState):
     """
     print("--- [6/6] synthesizer working ---")
 
-    prompt = f"""
-You are a General Partner. Review the diligence reports and the team debate.
-
-COMPANY: {state.get('company_name', 'Unknown')}
-
-STARTUP PITCH:
-{state['pitch_text']}
-
-MARKET REPORT:
-{state['market_analysis']}
-
-PRODUCT REPORT:
-{state['product_analysis']}
-
-TRACTION REPORT:
-{state['traction_analysis']}
-
-DEBATE TRANSCRIPT:
-{state['debate_transcript']}
-
-QUESTIONS TO RECONSIDER:
-{state.get('questions_to_reconsider', '')}
-
-TASK:
-Write a 1-2 paragraph investment memo.
-1. Weigh the arguments from the debate.
-2. Consider the critical questions raised.
-3. Final Recommendation: [PASS] / [INVEST] / [DIG DEEPER].
-
-Include:
-- 3 key strengths
-- 3 key risks
-- Recommended next steps
-"""
+    prompt = PROMPTS.render(
+        "gp_synthesizer",
+        company_name=state.get('company_name', 'Unknown'),
+        pitch_text=state['pitch_text'],
+        market_analysis=state['market_analysis'],
+        product_analysis=state['product_analysis'],
+        traction_analysis=state['traction_analysis'],
+        debate_transcript=state['debate_transcript'],
+        questions_to_reconsider=state.get('questions_to_reconsider', '')
+    )
 
     response = llm.invoke(prompt)
     return {"final_memo": response.content}
@@ -0,0 +1,160 @@
+"""
+Per-deal evidence index.
+
+Within one deal the research agent searches the news and scrapes the company site, then the
+market, product and traction analysts search and scrape again, often for the same material.
+Every search result and scraped page a deal's tools fetch is split into passages (as in
+condense.py) and added to the deal's EvidenceIndex, an in-memory BM25 inverted index.
+The tools consult it before the network: a page already scraped for the deal is served from
+it, and a search whose terms are already well covered by DEALSCOUT_EVIDENCE_MIN_HITS (default 3)
+indexed passages is answered with those passages instead of a Serper request.
+
+Indexes are keyed by the deal_id the graph assigns when a deal enters it and are kept in
+memory for the DEALSCOUT_EVIDENCE_DEALS most recent deals (default 32). Only a resume or
+re-analysis in the same process starts from what the deal already fetched; a new process
+(a CLI resume, a batch rerun, another Streamlit worker) starts with an empty index and
+relies on the on-disk search and page caches instead. DEALSCOUT_EVIDENCE_INDEX=0
+turns the index off.
+"""
+import os
+import math
+import threading
+from collections import Counter, OrderedDict
+from typing import List, Optional
+
+from condense import BM25_B, BM25_K1, SEARCH_HIT, split_passages, tokenize
+
+EVIDENCE_INDEX = os.getenv("DEALSCOUT_EVIDENCE_INDEX", "1").lower() not in ("0", "off", "false")
+EVIDENCE_MIN_HITS = int(os.getenv("DEALSCOUT_EVIDENCE_MIN_HITS", "3"))
+EVIDENCE_DEALS = int(os.getenv("DEALSCOUT_EVIDENCE_DEALS", "32"))
+
+# A passage counts towards answering a search when it contains this share of the query's terms
+MIN_TERM_COVERAGE = 0.75
+
+
+def strip_hit_number(passage: str) -> str:
+    """A search hit's passage without its "N. " rank (re-numbered in answers); page passages are left as they are"""
+    match = SEARCH_HIT.match(passage)
+    return passage[match.end():] if match else passage
+
+
+def page_key(url: str) -> str:
+    return url.strip().rstrip("/").lower()
+
+
+class EvidenceIndex:
+    """Passages of one deal's search results and pages, with BM25 retrieval"""
+
+    def __init__(self, min_hits: int = EVIDENCE_MIN_HITS):
+        self.min_hits = min_hits
+        self.passages = []  # {"source", "text", "terms"}
+        self.postings = {}  # term -> {passage id: term frequency}
+        self.total_terms = 0
+        self.pages = {}  # page_key(url) -> full page text
+        self.searches = {}  # normalized query -> formatted results
+        self.local_answers = 0
+        self.network_calls = 0
+        self._seen = set()
+        self._lock = threading.Lock()
+
+    def _add_passages(self, source: str, text: str):
+        for passage in split_passages(text):
+            if passage in self._seen:
+                continue
+            self._seen.add(passage)
+            terms = tokenize(passage)
+            passage_id = len(self.passages)
+            self.passages.append({"source": source, "text": passage, "terms": len(terms)})
+            self.total_terms += len(terms)
+            for term, count in Counter(terms).items():
+                self.postings.setdefault(term, {})[passage_id] = count
+
+    def add_search(self, query: str, results: str):
+        """Index a search's formatted results (query should already be normalized)"""
+        with self._lock:
+            self.network_calls += 1
+            self.searches[query] = results
+            self._add_passages(f"search: {query}", results)
+
+    def add_page(self, url: str, text: str):
+        with self._lock:
+            self.network_calls += 1
+            self.pages[page_key(url)] = text
+            self._add_passages(url, text)
+
+    def page(self, url: str) -> Optional[str]:
+        """A page already scraped for this deal"""
+        with self._lock:
+            text = self.pages.get(page_key(url))
+            if text is not None:
+                self.local_answers += 1
+            return text
+
+    def search(self, query: str, k: int = 5) -> List[dict]:
+        """The k best passages for query, as {"source", "text", "score", "coverage"}"""
+        terms = set(tokenize(query))
+        with self._lock:
+            if not terms or not self.passages:
+                return []
+            count = len(self.passages)
+            average_length = self.total_terms / count or 1.0
+            scores, matched = Counter(), Counter()
+            for term in terms:
+                postings = self.postings.get(term, {})
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for passage_id, frequency in postings.items():
+                    length = self.passages[passage_id]["terms"]
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / average_length)
+                    scores[passage_id] += idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+                    matched[passage_id] += 1
+            return [
+                {**self.passages[passage_id], "score": score, "coverage": matched[passage_id] / len(terms)}
+                for passage_id, score in scores.most_common(k)
+            ]
+
+    def answer(self, query: str) -> Optional[str]:
+        """
+        Search results for query from this deal's evidence: the same query's stored results,
+        or, if at least min_hits passages cover the query's terms, those passages. None otherwise.
+        """
+        with self._lock:
+            stored = self.searches.get(query)
+        if stored is None:
+            hits = [hit for hit in self.search(query) if hit["coverage"] >= MIN_TERM_COVERAGE]
+            if self.min_hits <= 0 or len(hits) < self.min_hits:
+                return None
+            stored = "\n\n".join(
+                f"{i}. Already gathered for this deal ({hit['source']})\n   {strip_hit_number(hit['text'])}"
+                for i, hit in enumerate(hits, 1)
+            )
+        with self._lock:
+            self.local_answers += 1
+        return stored
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "passages": len(self.passages),
+                "pages": len(self.pages),
+                "searches": len(self.searches),
+                "network_calls": self.network_calls,
+                "local_answers": self.local_answers
+            }
+
+
+_indexes = OrderedDict()
+_indexes_lock = threading.Lock()
+
+
+def evidence_for(deal_key: str) -> Optional[EvidenceIndex]:
+    """The evidence index of a deal, created on first use; None when the index is turned off"""
+    if not EVIDENCE_INDEX:
+        return None
+    with _indexes_lock:
+        index = _indexes.get(deal_key)
+        if index is None:
+            index = _indexes[deal_key] = EvidenceIndex()
+            while len(_indexes) > max(1, EVIDENCE_DEALS):
+                _indexes.popitem(last=False)
+        _indexes.move_to_end(deal_key)
+        return index
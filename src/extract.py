@@ -0,0 +1,274 @@
+"""
+HTML -> text extraction backends for the web scraper.
+
+Every backend returns the same "Title / Description / Content" text that the scraper
+has always produced. The streaming backends (lxml, and a stdlib html.parser fallback)
+pull title, meta description and body text in a single pass and stop parsing as soon
+as the content budget is filled, instead of building and walking a full soup tree.
+
+Pick a backend with DEALSCOUT_EXTRACTOR=lxml|stream|bs4 (default: lxml if installed).
+"""
+import os
+import re
+import codecs
+from html.parser import HTMLParser
+from typing import Iterable, Union
+
+from bs4 import BeautifulSoup
+
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional; the stdlib streaming backend is used instead
+    etree = None
+
+CONTENT_BUDGET = 5000
+SHORT_CONTENT_BUDGET = 3000
+SKIP_TAGS = {"script", "style", "nav", "footer"}
+CHUNK_SIZE = 16 * 1024
+
+
+def format_page(title_text: str, meta_desc: str, text: str) -> str:
+    """Combine title, meta description, and content"""
+    result = ""
+    if title_text:
+        result += f"Title: {title_text}\n\n"
+    if meta_desc:
+        result += f"Description: {meta_desc}\n\n"
+    result += f"Content:\n{text[:CONTENT_BUDGET]}"
+
+    return result if len(result) > 100 else f"Title: {title_text}\n\nContent:\n{text[:SHORT_CONTENT_BUDGET]}"
+
+
+def as_chunks(content: Union[bytes, Iterable[bytes]]) -> Iterable[bytes]:
+    if isinstance(content, (bytes, bytearray)):
+        return (content[i:i + CHUNK_SIZE] for i in range(0, len(content), CHUNK_SIZE))
+    return content
+
+
+# backend 1: BeautifulSoup (the original full-tree implementation)
+
+def extract_with_bs4(content: bytes) -> str:
+    soup = BeautifulSoup(content, 'html.parser')
+
+    # Remove script and style elements
+    for script in soup(list(SKIP_TAGS)):
+        script.decompose()
+
+    # Try to get meta description
+    meta_desc = ""
+    meta = soup.find("meta", attrs={"name": "description"}) or soup.find("meta", attrs={"property": "og:description"})
+    if meta:
+        meta_desc = meta.get("content", "")
+
+    # Get title
+    title = soup.find("title")
+    title_text = title.get_text().strip() if title else ""
+
+    # Get main content
+    text = soup.get_text()
+
+    # Clean up text
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = '\n'.join(chunk for chunk in chunks if chunk)
+
+    return format_page(title_text, meta_desc, text)
+
+
+# backends 2 and 3: single-pass streaming
+
+class TextCollector:
+    """
+    Parser target (lxml's target interface, also driven by the stdlib parser below).
+    Collects title, meta description and cleaned visible text until the budget is full.
+    """
+
+    def __init__(self, budget: int = CONTENT_BUDGET):
+        self.budget = budget
+        self.skip_depth = 0
+        self.in_title = False
+        self.title = []
+        self.meta_name = ""
+        self.meta_og = ""
+        self.pending = ""
+        self.space = ""
+        self.node_has_text = False
+        self.chunks = []
+        self.length = 0
+        self.done = False
+
+    def start(self, tag, attrib):
+        self._end_node()
+        tag = tag.lower()
+        if tag in SKIP_TAGS:
+            self.skip_depth += 1
+        elif tag == "title":
+            self.in_title = True
+        elif tag == "meta":
+            attrib = {k.lower(): v for k, v in attrib.items()}
+            if attrib.get("name", "").lower() == "description" and not self.meta_name:
+                self.meta_name = attrib.get("content") or ""
+            elif attrib.get("property", "").lower() == "og:description" and not self.meta_og:
+                self.meta_og = attrib.get("content") or ""
+
+    def end(self, tag):
+        self._end_node()
+        tag = tag.lower()
+        if tag in SKIP_TAGS and self.skip_depth:
+            self.skip_depth -= 1
+        elif tag == "title":
+            self.in_title = False
+
+    def data(self, text):
+        if self.skip_depth or self.done:
+            return
+        # Whitespace is held back until the text node ends: BeautifulSoup collapses
+        # whitespace-only nodes to one space or newline, so "</p>  <p>" is not a phrase break
+        if not text.strip():
+            self.space += text
+            return
+        text, self.space = self.space + text, ""
+        self.node_has_text = True
+        self._add_text(text)
+
+    def _end_node(self):
+        space, self.space = self.space, ""
+        if space and not self.node_has_text:
+            space = "\n" if "\n" in space else " "
+        self.node_has_text = False
+        if space and not self.skip_depth and not self.done:
+            self._add_text(space)
+
+    def _add_text(self, text):
+        if self.in_title:
+            self.title.append(text)
+        # Text is cleaned line by line, exactly like get_text() + splitlines() would
+        self.pending += text
+        if "\n" in self.pending:
+            *lines, self.pending = self.pending.split("\n")
+            self._add_lines(lines)
+        elif len(self.pending) > 4 * self.budget:
+            # Minified pages can be one huge line; flush up to the last phrase break
+            cut = self.pending.rfind("  ")
+            cut = cut if cut > 0 else len(self.pending)
+            self._add_lines([self.pending[:cut]])
+            self.pending = self.pending[cut:]
+
+    def _add_lines(self, lines):
+        for line in lines:
+            for phrase in line.strip().split("  "):
+                phrase = phrase.strip()
+                if phrase:
+                    self.chunks.append(phrase)
+                    self.length += len(phrase) + 1
+                    if self.length >= self.budget:
+                        self.done = True
+                        return
+
+    def comment(self, text):
+        pass
+
+    def close(self):
+        self._end_node()
+        if self.pending and not self.done:
+            self._add_lines([self.pending])
+        self.pending = ""
+        return format_page("".join(self.title).strip(), self.meta_name or self.meta_og, "\n".join(self.chunks))
+
+
+class _StdlibFeeder(HTMLParser):
+    def __init__(self, collector: TextCollector):
+        super().__init__(convert_charrefs=True)
+        self.collector = collector
+
+    def handle_starttag(self, tag, attrs):
+        self.collector.start(tag, {k: v or "" for k, v in attrs})
+
+    def handle_endtag(self, tag):
+        self.collector.end(tag)
+
+    def handle_data(self, data):
+        self.collector.data(data)
+
+
+def sniff_encoding(head: bytes) -> str:
+    match = re.search(rb"""charset=["']?([\w-]+)""", head[:2048], re.IGNORECASE)
+    if match:
+        try:
+            return codecs.lookup(match.group(1).decode("ascii")).name
+        except LookupError:
+            pass
+    return "utf-8"
+
+
+class StreamingExtractor:
+    """
+    Incremental extraction: feed() bytes as they arrive from the network; it returns True
+    once the content budget is full, so the caller can stop downloading. close() returns the text.
+    """
+
+    def __init__(self, use_lxml: bool = True):
+        self.collector = TextCollector()
+        self.decoder = None
+        if use_lxml:
+            self.parser = etree.HTMLParser(target=self.collector, remove_comments=True)
+        else:
+            self.parser = _StdlibFeeder(self.collector)
+
+    def feed(self, chunk: bytes) -> bool:
+        if self.collector.done:
+            return True
+        if self.decoder is None:
+            self.decoder = codecs.getincrementaldecoder(sniff_encoding(chunk))(errors="replace")
+        self.parser.feed(self.decoder.decode(chunk))
+        return self.collector.done
+
+    def close(self) -> str:
+        if not self.collector.done:
+            if self.decoder is not None:
+                self.parser.feed(self.decoder.decode(b"", final=True))
+            # lxml hands the target's close() result back; the stdlib parser just flushes
+            self.parser.close()
+        return self.collector.close()
+
+
+class BufferedExtractor:
+    """Same interface as StreamingExtractor for the full-tree BeautifulSoup backend"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def feed(self, chunk: bytes) -> bool:
+        self.chunks.append(chunk)
+        return False
+
+    def close(self) -> str:
+        return extract_with_bs4(b"".join(self.chunks))
+
+
+EXTRACTORS = {
+    "bs4": BufferedExtractor,
+    "stream": lambda: StreamingExtractor(use_lxml=False),
+}
+if etree is not None:
+    EXTRACTORS["lxml"] = lambda: StreamingExtractor(use_lxml=True)
+
+
+def new_extractor(name: str = None):
+    """Create an extractor by backend name (default: DEALSCOUT_EXTRACTOR, else lxml, else stream)"""
+    name = name or os.getenv("DEALSCOUT_EXTRACTOR") or ("lxml" if etree is not None else "stream")
+    if name not in EXTRACTORS:
+        raise ValueError(f"Unknown extractor '{name}'. Available: {', '.join(sorted(EXTRACTORS))}")
+    return EXTRACTORS[name]()
+
+
+def extract_page_text(content: Union[bytes, Iterable[bytes]], backend: str = None) -> str:
+    """
+    Extract title, meta description and visible text from an HTML document (bytes or an
+    iterable of byte chunks), stopping early once the content budget is filled.
+    """
+    extractor = new_extractor(backend)
+    for chunk in as_chunks(content):
+        if extractor.feed(chunk):
+            break
+    return extractor.close()
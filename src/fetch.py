@@ -0,0 +1,278 @@
+"""
+HTTP fetching for the web scraper.
+
+All scrapes share one pooled requests.Session (keep-alive, bounded connections per host)
+and an on-disk HTTP cache that honors Cache-Control, ETag and Last-Modified:
+a fresh page is served locally, a stale one is revalidated with a conditional GET.
+Bodies are streamed with a byte cap, and non-HTML responses are rejected before download.
+
+A download the caller stopped early (the extractor had all the text it needed) is cached
+as a partial entry. Partial entries are only served to callers that ask for a page prefix
+(iter_page(url, prefix_ok=True), as the scraper does); anyone wanting the whole body
+downloads it again, unconditionally.
+"""
+import os
+import re
+import json
+import time
+import base64
+import asyncio
+import weakref
+from typing import Optional
+
+import httpx
+import requests
+from requests.adapters import HTTPAdapter
+
+from cache import DiskCache
+
+SCRAPE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+SCRAPE_TIMEOUT = 15
+
+# Connections kept open per host, and hosts kept in the pool
+POOL_PER_HOST = int(os.getenv("DEALSCOUT_HTTP_POOL_PER_HOST", "4"))
+POOL_HOSTS = 32
+
+# Bodies are streamed in chunks and capped; the extractor only needs the first few KB of text
+MAX_PAGE_BYTES = int(os.getenv("DEALSCOUT_MAX_PAGE_BYTES", 2 * 1024 * 1024))
+DOWNLOAD_CHUNK = 16 * 1024
+
+# Pages without an explicit max-age are served locally for this long before being revalidated
+DEFAULT_FRESHNESS = float(os.getenv("DEALSCOUT_HTTP_FRESHNESS", "300"))
+
+
+def build_session(pool_per_host: int = POOL_PER_HOST) -> requests.Session:
+    """A keep-alive session that blocks rather than opening more than pool_per_host connections to one host"""
+    session = requests.Session()
+    session.headers.update(SCRAPE_HEADERS)
+    adapter = HTTPAdapter(pool_connections=POOL_HOSTS, pool_maxsize=pool_per_host, pool_block=True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+def freshness_seconds(cache_control: str) -> Optional[float]:
+    """How long a response may be served without revalidation; None means don't store it"""
+    directives = cache_control.lower()
+    if "no-store" in directives:
+        return None
+    if "no-cache" in directives:
+        return 0.0
+    match = re.search(r"max-age=(\d+)", directives)
+    return float(match.group(1)) if match else DEFAULT_FRESHNESS
+
+
+class HTTPCache:
+    """Stores page bodies with their validators so repeat fetches can skip or shrink the download"""
+
+    def __init__(self, cache: DiskCache):
+        self.cache = cache
+        self.fresh_hits = 0
+        self.revalidated = 0
+        self.downloads = 0
+
+    def lookup(self, url: str, prefix_ok: bool = False) -> Optional[dict]:
+        """The cached entry for url; partial entries (see store) only if prefix_ok"""
+        cached = self.cache.get(url)
+        if cached is None:
+            return None
+        entry = json.loads(cached)
+        if not entry.get("complete", True) and not prefix_ok:
+            return None
+        return entry
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() < entry["fresh_until"]
+
+    def revalidation_headers(self, entry: dict) -> dict:
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url: str, headers, content: bytes, previous: Optional[dict] = None, complete: bool = True):
+        """
+        Remember a 200 (or refresh a 304, reusing the previous body).
+        complete=False marks a body the caller stopped reading early: only a prefix of the page.
+        """
+        freshness = freshness_seconds(headers.get("Cache-Control", ""))
+        if freshness is None:
+            return
+        if previous is not None and content is None:
+            content = base64.b64decode(previous["content"])
+            complete = previous.get("complete", True)
+        entry = {
+            "etag": headers.get("ETag") or (previous or {}).get("etag"),
+            "last_modified": headers.get("Last-Modified") or (previous or {}).get("last_modified"),
+            "fresh_until": time.time() + freshness,
+            "content_type": headers.get("Content-Type") or (previous or {}).get("content_type", ""),
+            "content": base64.b64encode(content).decode("ascii"),
+            "complete": complete
+        }
+        self.cache.put(url, json.dumps(entry))
+
+    def stats(self) -> dict:
+        return {
+            "fresh_hits": self.fresh_hits,
+            "revalidated": self.revalidated,
+            "downloads": self.downloads
+        }
+
+
+class UnsupportedContent(ValueError):
+    """Raised before downloading a body that isn't an HTML/text page"""
+
+
+def check_content_type(content_type: str):
+    """Reject non-HTML responses up front (PDFs, images, archives, octet-stream downloads)"""
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type and not ("html" in content_type or "xml" in content_type or content_type.startswith("text/")):
+        raise UnsupportedContent(f"Unsupported content type: {content_type}")
+
+
+def check_not_binary(first_chunk: bytes):
+    """Catch binaries mislabelled as text/html: real HTML never has NUL bytes up front"""
+    if b"\x00" in first_chunk[:1024]:
+        raise UnsupportedContent("Response looks like a binary file, not HTML")
+
+
+class PageFetcher:
+    """
+    GET pages through a pooled session and an HTTPCache.
+    Bodies are streamed in DOWNLOAD_CHUNK pieces and never read past max_bytes, so callers can
+    parse as data arrives and stop early; a huge or hostile page can't balloon memory.
+    A body cut at max_bytes counts as complete: this fetcher never reads further.
+    """
+
+    def __init__(self, session: requests.Session, http_cache: HTTPCache, timeout: float = SCRAPE_TIMEOUT,
+                 max_bytes: int = MAX_PAGE_BYTES):
+        self.session = session
+        self.http_cache = http_cache
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.truncated = 0
+        self._async_clients = weakref.WeakKeyDictionary()
+
+    def _bounded(self, chunk: bytes, received: int) -> bytes:
+        """Trim the chunk that crosses max_bytes"""
+        if received + len(chunk) > self.max_bytes:
+            self.truncated += 1
+            return chunk[:self.max_bytes - received]
+        return chunk
+
+    def iter_page(self, url: str, prefix_ok: bool = False):
+        """
+        Yield the page body in chunks, raising requests.HTTPError for error statuses and
+        UnsupportedContent for non-HTML. If the caller stops early, the prefix it consumed is
+        cached as a partial entry; prefix_ok=True lets a cached partial entry answer this call.
+        """
+        entry = self.http_cache.lookup(url, prefix_ok)
+        if entry and self.http_cache.is_fresh(entry):
+            self.http_cache.fresh_hits += 1
+            yield base64.b64decode(entry["content"])
+            return
+
+        headers = self.http_cache.revalidation_headers(entry) if entry else {}
+        with self.session.get(url, headers=headers, timeout=self.timeout, stream=True) as response:
+            if response.status_code == 304 and entry:
+                self.http_cache.revalidated += 1
+                self.http_cache.store(url, response.headers, None, previous=entry)
+                yield base64.b64decode(entry["content"])
+                return
+
+            response.raise_for_status()
+            check_content_type(response.headers.get("Content-Type"))
+            self.http_cache.downloads += 1
+
+            received = []
+            size = 0
+            try:
+                for chunk in response.iter_content(DOWNLOAD_CHUNK):
+                    if not received:
+                        check_not_binary(chunk)
+                    chunk = self._bounded(chunk, size)
+                    received.append(chunk)
+                    size += len(chunk)
+                    yield chunk
+                    if size >= self.max_bytes:
+                        break
+            except GeneratorExit:
+                # The caller had enough (e.g. the extractor filled its budget)
+                self.http_cache.store(url, response.headers, b"".join(received), complete=False)
+                raise
+            self.http_cache.store(url, response.headers, b"".join(received))
+
+    def get(self, url: str) -> bytes:
+        """Return the (size-capped) page body"""
+        return b"".join(self.iter_page(url))
+
+    def async_client(self) -> httpx.AsyncClient:
+        """One pooled AsyncClient per event loop (clients can't be shared across loops)"""
+        loop = asyncio.get_running_loop()
+        client = self._async_clients.get(loop)
+        if client is None:
+            client = httpx.AsyncClient(
+                headers=SCRAPE_HEADERS,
+                timeout=self.timeout,
+                follow_redirects=True,
+                limits=httpx.Limits(max_connections=POOL_HOSTS * POOL_PER_HOST, max_keepalive_connections=POOL_HOSTS)
+            )
+            self._async_clients[loop] = client
+        return client
+
+    async def aclose(self):
+        """Close the running loop's AsyncClient; call before the loop ends (e.g. at the end of asyncio.run)"""
+        client = self._async_clients.pop(asyncio.get_running_loop(), None)
+        if client is not None:
+            await client.aclose()
+
+    def close(self):
+        self.session.close()
+
+    async def aiter_page(self, url: str, prefix_ok: bool = False):
+        """Async variant of iter_page(); consume it under contextlib.aclosing so an early stop closes the stream"""
+        entry = await asyncio.to_thread(self.http_cache.lookup, url, prefix_ok)
+        if entry and self.http_cache.is_fresh(entry):
+            self.http_cache.fresh_hits += 1
+            yield base64.b64decode(entry["content"])
+            return
+
+        headers = self.http_cache.revalidation_headers(entry) if entry else {}
+        async with self.async_client().stream("GET", url, headers=headers) as response:
+            if response.status_code == 304 and entry:
+                self.http_cache.revalidated += 1
+                await asyncio.to_thread(self.http_cache.store, url, response.headers, None, entry)
+                yield base64.b64decode(entry["content"])
+                return
+
+            response.raise_for_status()
+            check_content_type(response.headers.get("Content-Type"))
+            self.http_cache.downloads += 1
+
+            received = []
+            size = 0
+            try:
+                async for chunk in response.aiter_bytes(DOWNLOAD_CHUNK):
+                    if not received:
+                        check_not_binary(chunk)
+                    chunk = self._bounded(chunk, size)
+                    received.append(chunk)
+                    size += len(chunk)
+                    yield chunk
+                    if size >= self.max_bytes:
+                        break
+            except GeneratorExit:
+                # aclosing() closes us from a task, so the SQLite write can still go to a thread
+                await asyncio.to_thread(self.http_cache.store, url, response.headers, b"".join(received), None, False)
+                raise
+            await asyncio.to_thread(self.http_cache.store, url, response.headers, b"".join(received))
+
+
+def default_fetcher() -> PageFetcher:
+    """Fetcher backed by CACHE_DIR/http.sqlite; pages are kept a week for revalidation"""
+    http_cache = HTTPCache(DiskCache.named("http", ttl_seconds=7 * 24 * 3600, max_bytes=128 * 1024 * 1024))
+    return PageFetcher(build_session(), http_cache)
@@ -0,0 +1,176 @@
+"""
+PDF pitch-deck ingestion.
+
+Decks are read through a memory map rather than buffered whole, and their page text is
+extracted by a pool of worker processes, each taking a range of pages, so a large deck
+uses every core instead of one. Extracted text is cached by the SHA-256 of the file's
+bytes, so re-uploading or re-running the same deck is a cache lookup.
+
+DEALSCOUT_PDF_WORKERS sets the pool size (default: CPU count; 1 disables the pool), and
+decks under DEALSCOUT_PDF_PARALLEL_PAGES pages (default 16) are extracted in-process,
+where starting the pool would cost more than it saves.
+"""
+import os
+import json
+import mmap
+import time
+import hashlib
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import List, Optional
+
+from cache import DiskCache, hash_key
+
+PDF_WORKERS = int(os.getenv("DEALSCOUT_PDF_WORKERS", os.cpu_count() or 1))
+PARALLEL_MIN_PAGES = int(os.getenv("DEALSCOUT_PDF_PARALLEL_PAGES", "16"))
+
+# Each worker gets about this many page ranges, so one slow range doesn't leave the others idle
+RANGES_PER_WORKER = 2
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+_text_cache: Optional[DiskCache] = None
+
+
+def text_cache() -> DiskCache:
+    global _text_cache
+    if _text_cache is None:
+        _text_cache = DiskCache.named(
+            "pdf_text",
+            ttl_seconds=float(os.getenv("DEALSCOUT_PDF_CACHE_TTL", 30 * 24 * 3600)),
+            max_bytes=64 * 1024 * 1024
+        )
+    return _text_cache
+
+
+def process_pool() -> ProcessPoolExecutor:
+    """The shared extraction pool, started on first use"""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn, not fork: the UI and the job runner have threads running
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _open_pdf(path: str):
+    """(file, mmap, PdfReader) for a deck; the caller closes the mmap and file"""
+    import PyPDF2
+
+    file = open(path, "rb")
+    try:
+        mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+    except Exception:
+        file.close()
+        raise
+    return file, mapped, PyPDF2.PdfReader(mapped)
+
+
+def extract_page_range(path: str, start: int, stop: int) -> List[str]:
+    """Text of pages [start, stop) of the deck at path (runs in a pool worker)"""
+    file, mapped, reader = _open_pdf(path)
+    try:
+        return [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+    finally:
+        mapped.close()
+        file.close()
+
+
+def page_ranges(page_count: int, workers: int) -> List[tuple]:
+    size = max(1, -(-page_count // (workers * RANGES_PER_WORKER)))
+    return [(start, min(start + size, page_count)) for start in range(0, page_count, size)]
+
+
+def extractor_version() -> str:
+    import PyPDF2
+    return f"PyPDF2-{getattr(PyPDF2, '__version__', 'unknown')}"
+
+
+def file_digest(path: str) -> str:
+    """SHA-256 of a file, hashed straight from its memory map"""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return hashlib.sha256(b"").hexdigest()
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return hashlib.sha256(mapped).hexdigest()
+
+
+def extract_pages(path: str) -> List[str]:
+    """Page texts of the deck at path, fanned out over the process pool for large decks"""
+    file, mapped, reader = _open_pdf(path)
+    try:
+        page_count = len(reader.pages)
+        if PDF_WORKERS <= 1 or page_count < PARALLEL_MIN_PAGES:
+            return [reader.pages[i].extract_text() or "" for i in range(page_count)]
+    finally:
+        mapped.close()
+        file.close()
+
+    ranges = page_ranges(page_count, PDF_WORKERS)
+    try:
+        futures = [process_pool().submit(extract_page_range, path, start, stop) for start, stop in ranges]
+        return [text for future in futures for text in future.result()]
+    except BrokenProcessPool:
+        # A worker died (e.g. killed for memory); rebuild the pool next time and finish in-process
+        print("   PDF worker pool broke, extracting in-process")
+        _reset_pool()
+        return extract_page_range(path, 0, page_count)
+
+
+def cache_key(digest: str) -> str:
+    # Keyed by extractor version too, so upgrading PyPDF2 re-extracts
+    return hash_key({"sha256": digest, "extractor": extractor_version()})
+
+
+def cached_text(digest: str) -> Optional[dict]:
+    cached = text_cache().get(cache_key(digest))
+    return json.loads(cached) if cached is not None else None
+
+
+def extract_uncached(path: str, digest: str) -> dict:
+    pages = extract_pages(path)
+    # One join at the end; the text is each page followed by a newline, as it always was
+    entry = {"text": "".join(f"{page}\n" for page in pages), "pages": len(pages)}
+    text_cache().put(cache_key(digest), json.dumps(entry))
+    return entry
+
+
+def extract_pdf(path: str) -> dict:
+    """Extract a deck's text through the content-hash cache: {"text", "pages", "hash", "cached", "seconds"}"""
+    started = time.perf_counter()
+    digest = file_digest(path)
+    entry = cached_text(digest)
+    cached = entry is not None
+    if not cached:
+        entry = extract_uncached(path, digest)
+    return {**entry, "hash": digest, "cached": cached, "seconds": time.perf_counter() - started}
+
+
+def extract_pdf_bytes(data) -> dict:
+    """
+    extract_pdf for an in-memory deck (e.g. an upload; pass a memoryview to avoid a copy).
+    A cache hit never touches disk; a miss is spooled to a temp file so the workers can map it.
+    """
+    started = time.perf_counter()
+    digest = hashlib.sha256(data).hexdigest()
+    entry = cached_text(digest)
+    cached = entry is not None
+    if not cached:
+        with tempfile.NamedTemporaryFile(suffix=".pdf", delete=False) as spool:
+            spool.write(data)
+        try:
+            entry = extract_uncached(spool.name, digest)
+        finally:
+            os.unlink(spool.name)
+    return {**entry, "hash": digest, "cached": cached, "seconds": time.perf_counter() - started}
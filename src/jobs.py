@@ -0,0 +1,246 @@
+"""
+Background job execution for deal analyses.
+
+Submissions go into a local SQLite queue and are picked up by a bounded pool of worker
+threads in this process, so a Streamlit script run only has to submit and then poll.
+Progress (per-node status plus the tail of the LLM text being streamed) and the final
+state are written back to the queue, where any session can read them by job id.
+The job id doubles as the graph's checkpoint thread id, so a failed job that is retried
+(or one orphaned by a crashed process) resumes after its last completed node.
+"""
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Optional
+
+from paths import DATA_DIR
+
+JOB_WORKERS = int(os.getenv("DEALSCOUT_JOB_WORKERS", "2"))
+
+# Streamed tokens are flushed to the queue at most this often, and only the tail is kept
+PROGRESS_FLUSH_SECONDS = 0.5
+LIVE_TEXT_CHARS = 3000
+
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """SQLite table of jobs: queued -> running -> done | failed"""
+
+    def __init__(self, path=None):
+        self.path = Path(path or DATA_DIR / "jobs.sqlite")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    input TEXT NOT NULL,
+                    progress TEXT NOT NULL DEFAULT '{}',
+                    result TEXT,
+                    error TEXT,
+                    owner INTEGER,
+                    created REAL NOT NULL,
+                    started REAL,
+                    finished REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created)")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def enqueue(self, initial_state: dict) -> str:
+        job_id = uuid.uuid4().hex[:12]
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, input, created) VALUES (?, 'queued', ?, ?)",
+                (job_id, json.dumps(initial_state), time.time())
+            )
+        return job_id
+
+    def claim(self) -> Optional[dict]:
+        """Atomically take the oldest queued job for this process"""
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            row = conn.execute(
+                "SELECT id, input, progress FROM jobs WHERE status = 'queued' ORDER BY created LIMIT 1"
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE jobs SET status = 'running', owner = ?, started = ? WHERE id = ?",
+                (os.getpid(), time.time(), row["id"])
+            )
+        return {"id": row["id"], "input": json.loads(row["input"]), "progress": json.loads(row["progress"] or "{}")}
+
+    def update_progress(self, job_id: str, progress: dict):
+        with self._connect() as conn:
+            conn.execute("UPDATE jobs SET progress = ? WHERE id = ?", (json.dumps(progress), job_id))
+
+    def finish(self, job_id: str, result: dict, progress: dict):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'done', result = ?, progress = ?, finished = ? WHERE id = ?",
+                (json.dumps(result), json.dumps(progress), time.time(), job_id)
+            )
+
+    def fail(self, job_id: str, error: str, progress: dict):
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE jobs SET status = 'failed', error = ?, progress = ?, finished = ? WHERE id = ?",
+                (error, json.dumps(progress), time.time(), job_id)
+            )
+
+    def retry(self, job_id: str) -> bool:
+        """Queue a failed job again; it keeps its id, and so its checkpoints"""
+        with self._connect() as conn:
+            cursor = conn.execute(
+                "UPDATE jobs SET status = 'queued', error = NULL, owner = NULL, started = NULL, finished = NULL, "
+                "created = ? WHERE id = ? AND status = 'failed'",
+                (time.time(), job_id)
+            )
+        return cursor.rowcount > 0
+
+    def requeue_orphans(self) -> int:
+        """Put back 'running' jobs whose worker process has died"""
+        with self._connect() as conn:
+            rows = conn.execute("SELECT id, owner FROM jobs WHERE status = 'running'").fetchall()
+            orphans = [row["id"] for row in rows if row["owner"] is None or not _pid_alive(row["owner"])]
+            for job_id in orphans:
+                conn.execute("UPDATE jobs SET status = 'queued', owner = NULL, started = NULL WHERE id = ?", (job_id,))
+        return len(orphans)
+
+    def get(self, job_id: str) -> Optional[dict]:
+        with self._connect() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["input"] = json.loads(job["input"])
+        job["progress"] = json.loads(job["progress"] or "{}")
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        job["position"] = self.position(job_id) if job["status"] == "queued" else 0
+        return job
+
+    def position(self, job_id: str) -> int:
+        """1-based place in the queue for a queued job"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued' AND created <= (SELECT created FROM jobs WHERE id = ?)",
+                (job_id,)
+            ).fetchone()
+        return row[0]
+
+
+class JobRunner:
+    """
+    Bounded pool of worker threads draining a JobQueue.
+    stream_fn(initial_state, thread_id=job_id, **run_options) must yield (kind, node, payload) events
+    like agent.stream_deal. run_options (e.g. the client resources a UI session is configured with)
+    are live objects, so they are kept in memory rather than in the queue: a job picked up after a
+    restart runs with stream_fn's defaults.
+    """
+
+    def __init__(self, stream_fn, queue: JobQueue = None, workers: int = JOB_WORKERS):
+        self.stream_fn = stream_fn
+        self.queue = queue or JobQueue()
+        self._wakeup = threading.Condition()
+        self._stopping = False
+        self._run_options = {}
+        self.queue.requeue_orphans()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"dealscout-job-{i}", daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def submit(self, initial_state: dict, **run_options) -> str:
+        """Queue an analysis and return its job id; run_options are passed on to stream_fn"""
+        # Enqueue under the lock, so a worker that claims the job at once still sees its options
+        with self._wakeup:
+            job_id = self.queue.enqueue(initial_state)
+            self._run_options[job_id] = run_options
+            self._wakeup.notify()
+        return job_id
+
+    def retry(self, job_id: str) -> bool:
+        """Resume a failed job from its last checkpoint"""
+        if not self.queue.retry(job_id):
+            return False
+        with self._wakeup:
+            self._wakeup.notify()
+        return True
+
+    def get(self, job_id: str) -> Optional[dict]:
+        return self.queue.get(job_id)
+
+    def stop(self):
+        self._stopping = True
+        with self._wakeup:
+            self._wakeup.notify_all()
+
+    def _work(self):
+        while not self._stopping:
+            job = self.queue.claim()
+            if job is None:
+                with self._wakeup:
+                    self._wakeup.wait(timeout=2.0)
+                continue
+            self._run(job)
+
+    def _run(self, job: dict):
+        # A resumed job keeps the nodes that finished before; only unfinished ones are rerun
+        finished = {node: status for node, status in job["progress"].get("nodes", {}).items() if status["state"] == "done"}
+        progress = {"nodes": finished, "live_node": None, "live_text": ""}
+        last_flush = 0.0
+        try:
+            result = None
+            with self._wakeup:
+                options = self._run_options.get(job["id"], {})
+            for kind, node, payload in self.stream_fn(job["input"], thread_id=job["id"], **options):
+                if kind == "start":
+                    progress["nodes"][node] = {"state": "running"}
+                elif kind == "token":
+                    if progress["live_node"] != node:
+                        progress["live_node"], progress["live_text"] = node, ""
+                    progress["live_text"] = (progress["live_text"] + payload)[-LIVE_TEXT_CHARS:]
+                    if time.monotonic() - last_flush < PROGRESS_FLUSH_SECONDS:
+                        continue
+                elif kind == "done":
+                    timings = (payload or {}).get("node_timings") or [{}]
+                    progress["nodes"][node] = {"state": "done", "seconds": timings[-1].get("seconds")}
+                elif kind == "result":
+                    result = payload
+                    continue
+                self.queue.update_progress(job["id"], progress)
+                last_flush = time.monotonic()
+            progress["live_node"], progress["live_text"] = None, ""
+            self.queue.finish(job["id"], result, progress)
+            # A failed job keeps its options, for retry()
+            with self._wakeup:
+                self._run_options.pop(job["id"], None)
+        except Exception as e:
+            self.queue.fail(job["id"], str(e), progress)
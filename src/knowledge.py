@@ -0,0 +1,204 @@
+"""
+Cross-deal market knowledge base.
+
+Every finished market report is recorded in a local SQLite database: the market it was
+for (an excerpt of the pitch), its TAM estimate and timing, the competitors it named and
+the sources it cited, with an FTS5 full-text index over all of it. Before the market analyst
+searches, it looks up earlier analyses of similar markets, so a repeat market starts from
+the figures and competitor list already found rather than searching for them again.
+
+Freshness rules: analyses older than DEALSCOUT_KNOWLEDGE_MAX_AGE_DAYS (default 90) are never
+used, those past half that age are passed on marked for verification, and a deal never
+sees its own earlier analysis. DEALSCOUT_KNOWLEDGE=0 turns the knowledge base off.
+"""
+import os
+import time
+import sqlite3
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+from typing import List, Optional
+
+from condense import tokenize
+from paths import DATA_DIR
+
+KNOWLEDGE_ENABLED = os.getenv("DEALSCOUT_KNOWLEDGE", "1").lower() not in ("0", "off", "false")
+KNOWLEDGE_MAX_AGE_DAYS = float(os.getenv("DEALSCOUT_KNOWLEDGE_MAX_AGE_DAYS", "90"))
+
+# How much of the pitch describes the market, and how many of its terms a lookup uses
+MARKET_EXCERPT_CHARS = 1500
+QUERY_TERMS = 32
+
+# An earlier analysis is only relevant if its entry shares this many terms with the new pitch
+MIN_SHARED_TERMS = 6
+MAX_MATCHES = 3
+
+DAY = 24 * 3600
+
+
+class KnowledgeBase:
+    """SQLite tables of markets, competitors and sources, with an FTS5 index over the markets"""
+
+    def __init__(self, path=None, max_age_days: float = KNOWLEDGE_MAX_AGE_DAYS):
+        self.path = Path(path or DATA_DIR / "knowledge.sqlite")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.max_age = max_age_days * DAY
+        self.lookups = 0
+        self.matches = 0
+        self.recorded = 0
+        self._lock = threading.Lock()
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS markets (
+                    id INTEGER PRIMARY KEY,
+                    deal TEXT NOT NULL,
+                    company TEXT NOT NULL,
+                    market TEXT NOT NULL,
+                    tam_estimate TEXT,
+                    timing_score REAL,
+                    timing_reason TEXT,
+                    created REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS markets_deal ON markets (deal)")
+            conn.execute("CREATE INDEX IF NOT EXISTS markets_created ON markets (created)")
+            conn.execute("CREATE TABLE IF NOT EXISTS competitors (market_id INTEGER NOT NULL, name TEXT NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS competitors_market ON competitors (market_id)")
+            conn.execute("CREATE INDEX IF NOT EXISTS competitors_name ON competitors (name COLLATE NOCASE)")
+            conn.execute("CREATE TABLE IF NOT EXISTS sources (market_id INTEGER NOT NULL, url TEXT NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS sources_market ON sources (market_id)")
+            # rowid = markets.id
+            conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS markets_fts
+                USING fts5(company, market, competitors, tam_estimate, timing_reason)
+            """)
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        conn.row_factory = sqlite3.Row
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def record(self, deal: str, company: str, pitch_text: str, report: dict):
+        """Store a deal's market report (schemas.MarketReport), replacing its earlier one"""
+        competitors = [name for name in report["competitors"] if name.strip()]
+        sources = [url for url in report["sources"] if url.startswith(("http://", "https://"))]
+        row = {
+            "company": company or "",
+            "market": (pitch_text or "")[:MARKET_EXCERPT_CHARS],
+            "tam_estimate": report["tam_estimate"],
+            "timing_reason": report["timing_reason"]
+        }
+        now = time.time()
+        with self._connect() as conn:
+            self._forget(conn, "deal = ?", (deal,))
+            # Analyses too old to ever be used again
+            self._forget(conn, "created < ?", (now - 2 * self.max_age,))
+            market_id = conn.execute(
+                "INSERT INTO markets (deal, company, market, tam_estimate, timing_score, timing_reason, created) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (deal, row["company"], row["market"], row["tam_estimate"], report["market_timing_score"], row["timing_reason"], now)
+            ).lastrowid
+            conn.executemany("INSERT INTO competitors (market_id, name) VALUES (?, ?)",
+                             [(market_id, name) for name in competitors])
+            conn.executemany("INSERT INTO sources (market_id, url) VALUES (?, ?)",
+                             [(market_id, url) for url in sources])
+            conn.execute(
+                "INSERT INTO markets_fts (rowid, company, market, competitors, tam_estimate, timing_reason) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (market_id, row["company"], row["market"], ", ".join(competitors), row["tam_estimate"], row["timing_reason"])
+            )
+        with self._lock:
+            self.recorded += 1
+
+    def _forget(self, conn, where: str, params: tuple):
+        ids = [(row["id"],) for row in conn.execute(f"SELECT id FROM markets WHERE {where}", params)]
+        for table, column in (("competitors", "market_id"), ("sources", "market_id"),
+                              ("markets_fts", "rowid"), ("markets", "id")):
+            conn.executemany(f"DELETE FROM {table} WHERE {column} = ?", ids)
+
+    def lookup(self, pitch_text: str, exclude_deal: Optional[str] = None) -> List[dict]:
+        """Fresh earlier analyses of markets like this pitch's, best match first"""
+        terms = [term for term, _ in Counter(tokenize((pitch_text or "")[:MARKET_EXCERPT_CHARS])).most_common(QUERY_TERMS)]
+        with self._lock:
+            self.lookups += 1
+        if not terms:
+            return []
+        query = " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+        now = time.time()
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT m.*, markets_fts.competitors AS competitor_list FROM markets_fts "
+                "JOIN markets m ON m.id = markets_fts.rowid "
+                "WHERE markets_fts MATCH ? AND m.created >= ? AND m.deal != ? "
+                "ORDER BY bm25(markets_fts) LIMIT ?",
+                (query, now - self.max_age, exclude_deal or "", MAX_MATCHES * 4)
+            ).fetchall()
+            matches = []
+            for row in rows:
+                shared = set(terms) & set(tokenize(f"{row['market']} {row['competitor_list']} {row['timing_reason']}"))
+                if len(shared) < MIN_SHARED_TERMS:
+                    continue
+                age = now - row["created"]
+                matches.append({
+                    "company": row["company"],
+                    "tam_estimate": row["tam_estimate"],
+                    "timing_score": row["timing_score"],
+                    "timing_reason": row["timing_reason"],
+                    "competitors": [r["name"] for r in conn.execute(
+                        "SELECT name FROM competitors WHERE market_id = ?", (row["id"],))],
+                    "sources": [r["url"] for r in conn.execute(
+                        "SELECT url FROM sources WHERE market_id = ?", (row["id"],))],
+                    "age_days": age / DAY,
+                    "verify": age > self.max_age / 2
+                })
+                if len(matches) == MAX_MATCHES:
+                    break
+        with self._lock:
+            self.matches += bool(matches)
+        return matches
+
+    def stats(self) -> dict:
+        with self._connect() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM markets").fetchone()[0]
+        with self._lock:
+            return {"entries": entries, "lookups": self.lookups, "matched": self.matches, "recorded": self.recorded}
+
+
+def format_knowledge(matches: List[dict]) -> str:
+    """Prompt section listing the matched earlier analyses ("" when there are none)"""
+    if not matches:
+        return ""
+    lines = ["PRIOR KNOWLEDGE FROM EARLIER DEALS IN SIMILAR MARKETS:"]
+    for match in matches:
+        flag = " [verify: older figures]" if match["verify"] else ""
+        lines.append(f"- {match['company']} (analysed {match['age_days']:.0f} days ago){flag}")
+        if match["tam_estimate"]:
+            lines.append(f"  TAM: {match['tam_estimate']}")
+        if match["competitors"]:
+            lines.append(f"  Competitors: {', '.join(match['competitors'])}")
+        if match["timing_reason"]:
+            score = f"{match['timing_score']:g}/10, " if match["timing_score"] is not None else ""
+            lines.append(f"  Timing: {score}{match['timing_reason']}")
+        if match["sources"]:
+            lines.append(f"  Sources: {', '.join(match['sources'])}")
+    lines.append("Reuse these figures and competitors where they apply to this startup; only search for what "
+                 "they don't cover, what differs for this startup, or what is marked for verification.")
+    return "\n".join(lines) + "\n\n"
+
+
+def knowledge_base_from_env() -> Optional[KnowledgeBase]:
+    """The knowledge base in DEALSCOUT_DATA_DIR, or None when it is off or SQLite lacks FTS5"""
+    if not KNOWLEDGE_ENABLED:
+        return None
+    try:
+        return KnowledgeBase()
+    except sqlite3.OperationalError as e:
+        print(f"   Knowledge base unavailable: {e}")
+        return None
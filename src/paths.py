@@ -0,0 +1,14 @@
+"""
+Where DealScout keeps its files.
+
+CACHE_DIR holds disposable caches (LLM responses, search results, pages, PDF text, rate-limit
+buckets); DATA_DIR holds state worth keeping (the job queue, graph checkpoints, the market
+knowledge base). Override them with DEALSCOUT_CACHE_DIR and DEALSCOUT_DATA_DIR.
+"""
+import os
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+CACHE_DIR = Path(os.getenv("DEALSCOUT_CACHE_DIR", ROOT / ".dealscout_cache"))
+DATA_DIR = Path(os.getenv("DEALSCOUT_DATA_DIR", ROOT / ".dealscout_data"))
@@ -0,0 +1,96 @@
+"""
+Prompt templates loaded from the prompts/ directory.
+
+Each prompts/<name>.md holds one agent's prompt. Text above the first part marker is
+documentation; `<!-- system -->` and `<!-- user -->` lines start the parts sent to the model,
+and `{{field}}` placeholders are filled at render time. Templates are parsed and compiled
+once, and recompiled only when a file's mtime changes, so prompts can be edited while the
+app is running.
+
+Templates keep their instructions ahead of the first placeholder, so each prompt opens with
+text that is identical for every deal and Gemini 2.5 can cache it implicitly.
+"""
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Dict, List
+
+PROMPTS_DIR = Path(os.getenv("DEALSCOUT_PROMPTS_DIR", Path(__file__).parent.parent / "prompts"))
+
+PART_MARKER = re.compile(r"^<!--\s*(\w+)\s*-->[ \t]*$", re.MULTILINE)
+PLACEHOLDER = re.compile(r"\{\{\s*(\w+)\s*\}\}")
+
+
+class CompiledPart:
+    """One part of a template, pre-split into literal text and placeholder names"""
+
+    def __init__(self, text: str):
+        self.text = text
+        pieces = PLACEHOLDER.split(text)
+        self.literals = pieces[0::2]
+        self.fields = pieces[1::2]
+
+    def render(self, values: dict) -> str:
+        missing = set(self.fields) - set(values)
+        if missing:
+            raise KeyError(f"Missing prompt fields: {', '.join(sorted(missing))}")
+        rendered = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            rendered.append(str(values[field]))
+            rendered.append(literal)
+        return "".join(rendered)
+
+
+class PromptTemplate:
+    def __init__(self, name: str, path: Path, mtime: float, parts: Dict[str, CompiledPart]):
+        self.name = name
+        self.path = path
+        self.mtime = mtime
+        self.parts = parts
+
+    def render(self, part: str = "user", **values) -> str:
+        if part not in self.parts:
+            raise KeyError(f"Prompt '{self.name}' has no '{part}' part")
+        return self.parts[part].render(values)
+
+
+def load_template(path: Path) -> PromptTemplate:
+    text = path.read_text(encoding="utf-8")
+    markers = list(PART_MARKER.finditer(text))
+    if not markers:
+        raise ValueError(f"{path} has no <!-- system --> / <!-- user --> part markers")
+    parts = {}
+    for marker, following in zip(markers, markers[1:] + [None]):
+        end = following.start() if following else len(text)
+        parts[marker.group(1)] = CompiledPart(text[marker.end():end].strip("\n"))
+    return PromptTemplate(path.stem, path, path.stat().st_mtime, parts)
+
+
+class PromptRegistry:
+    """Compiled templates for one prompts directory, hot-reloaded when a file changes"""
+
+    def __init__(self, directory=PROMPTS_DIR):
+        self.directory = Path(directory)
+        self.reloads = 0
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._lock = threading.Lock()
+
+    def load_all(self) -> List[str]:
+        """Compile every template up front (at startup), so a broken file fails fast"""
+        return [self.get(path.stem).name for path in sorted(self.directory.glob("*.md"))]
+
+    def get(self, name: str) -> PromptTemplate:
+        path = self.directory / f"{name}.md"
+        mtime = path.stat().st_mtime
+        with self._lock:
+            template = self._templates.get(name)
+            if template is None or template.mtime != mtime:
+                if template is not None:
+                    self.reloads += 1
+                    print(f"   Reloaded prompt template {path.name}")
+                template = self._templates[name] = load_template(path)
+            return template
+
+    def render(self, name: str, part: str = "user", **values) -> str:
+        return self.get(name).render(part, **values)
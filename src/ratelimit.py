@@ -0,0 +1,292 @@
+"""
+Rate limiting and retries for Gemini calls.
+
+All threads and processes share one requests-per-minute and one tokens-per-minute token
+bucket, kept in a small SQLite file, so concurrent UI jobs and batch runs together stay
+at the API quota instead of tripping it. A call that still gets a 429 or 5xx is retried
+with jittered exponential backoff (or after the delay the server asks for), so a quota
+blip costs seconds rather than a failed deal.
+"""
+import os
+import re
+import time
+import random
+import sqlite3
+import asyncio
+import threading
+from pathlib import Path
+from contextlib import contextmanager
+from typing import Optional
+
+from cache import CACHE_DIR
+
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+# Fallback for client errors that don't carry a status code: google.api_core's quota and server error types
+RETRYABLE_ERRORS = {"ResourceExhausted", "ServiceUnavailable", "DeadlineExceeded"}
+SERVER_RETRY_DELAY = re.compile(r"retry (?:in|after) ([\d.]+)\s*s", re.IGNORECASE)
+
+MAX_RETRIES = 6
+BACKOFF_BASE = 2.0
+BACKOFF_CAP = 60.0
+
+# Reserved for the response until the call reports its real usage
+OUTPUT_TOKEN_RESERVE = 1000
+
+
+def estimate_tokens(input) -> int:
+    """Rough prompt size (~4 characters per token) for a string or a list of messages"""
+    if isinstance(input, str):
+        return len(input) // 4 + 1
+    return sum(len(str(getattr(m, "content", m))) for m in input) // 4 + 1
+
+
+def used_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage_metadata", None) or {}
+    return usage.get("total_tokens")
+
+
+def status_code(error: Exception) -> Optional[int]:
+    for value in (getattr(error, "status_code", None), getattr(error, "code", None),
+                  getattr(getattr(error, "response", None), "status_code", None)):
+        if isinstance(value, int):
+            return value
+    return None
+
+
+def is_retryable(error: Exception) -> bool:
+    """Quota (429) and server-side (5xx) errors are worth retrying; bad requests are not"""
+    # langchain wraps the client's exception, so look down the chain of causes too
+    while error is not None:
+        code = status_code(error)
+        if code is not None:
+            return code in RETRYABLE_STATUS
+        if any(cls.__name__ in RETRYABLE_ERRORS for cls in type(error).__mro__):
+            return True
+        error = error.__cause__
+    return False
+
+
+def backoff_delay(error: Exception, attempt: int) -> float:
+    """The server's requested delay if it gave one, otherwise full-jitter exponential backoff"""
+    match = SERVER_RETRY_DELAY.search(str(error))
+    if match:
+        return min(BACKOFF_CAP, float(match.group(1))) + random.uniform(0, 1)
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+
+class TokenBucketLimiter:
+    """
+    Requests-per-minute and tokens-per-minute buckets stored in SQLite.
+    Each bucket holds at most one minute of quota and refills continuously; acquire() blocks
+    until both have room. A limit of 0 disables that bucket.
+    """
+
+    def __init__(self, path, rpm: float, tpm: float, scope: str = "default"):
+        self.path = Path(path)
+        self.limits = {f"{scope}:requests": rpm, f"{scope}:tokens": tpm}
+        self.requests_bucket, self.tokens_bucket = self.limits
+        self.calls = 0
+        self.throttled = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        self.retries = 0
+        self.retry_wait_seconds = 0.0
+        self.gave_up = 0
+        self._lock = threading.Lock()
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS buckets (
+                    name TEXT PRIMARY KEY,
+                    level REAL NOT NULL,
+                    updated REAL NOT NULL
+                )
+            """)
+
+    @property
+    def enabled(self) -> bool:
+        return any(limit > 0 for limit in self.limits.values())
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def _level(self, conn, name: str, now: float) -> float:
+        limit = self.limits[name]
+        row = conn.execute("SELECT level, updated FROM buckets WHERE name = ?", (name,)).fetchone()
+        if row is None:
+            return limit
+        return min(limit, row[0] + (now - row[1]) * limit / 60)
+
+    def _try_take(self, tokens: int) -> float:
+        """Take one request and `tokens` tokens if both buckets have room; else return seconds until they will"""
+        costs = {self.requests_bucket: 1, self.tokens_bucket: tokens}
+        # A request bigger than a whole bucket would wait forever; let it through on a full bucket
+        costs = {name: min(cost, self.limits[name]) for name, cost in costs.items() if self.limits[name] > 0}
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            levels = {name: self._level(conn, name, now) for name in costs}
+            wait = max((costs[name] - levels[name]) * 60 / self.limits[name] for name in costs)
+            if wait > 0:
+                return wait
+            for name, cost in costs.items():
+                conn.execute(
+                    "INSERT OR REPLACE INTO buckets (name, level, updated) VALUES (?, ?, ?)",
+                    (name, levels[name] - cost, now)
+                )
+        return 0.0
+
+    def _record(self, waited: float):
+        with self._lock:
+            self.calls += 1
+            if waited > 0:
+                self.throttled += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def acquire(self, tokens: int) -> float:
+        """Block until the call fits in both buckets; returns the seconds spent waiting"""
+        waited = 0.0
+        while self.enabled:
+            wait = self._try_take(tokens)
+            if wait <= 0:
+                break
+            # Jitter keeps waiting threads/processes from retrying in lockstep
+            wait += random.uniform(0, 0.05)
+            time.sleep(wait)
+            waited += wait
+        self._record(waited)
+        return waited
+
+    async def aacquire(self, tokens: int) -> float:
+        waited = 0.0
+        while self.enabled:
+            wait = await asyncio.to_thread(self._try_take, tokens)
+            if wait <= 0:
+                break
+            wait += random.uniform(0, 0.05)
+            await asyncio.sleep(wait)
+            waited += wait
+        self._record(waited)
+        return waited
+
+    def settle(self, estimated: int, actual: Optional[int]):
+        """Correct the tokens bucket once the real usage of a call is known"""
+        limit = self.limits[self.tokens_bucket]
+        if actual is None or limit <= 0:
+            return
+        with self._connect() as conn:
+            conn.execute(
+                "UPDATE buckets SET level = MIN(?, level + ?) WHERE name = ?",
+                (limit, min(estimated, limit) - actual, self.tokens_bucket)
+            )
+
+    def note_retry(self, delay: float):
+        with self._lock:
+            self.retries += 1
+            self.retry_wait_seconds += delay
+
+    def note_gave_up(self):
+        with self._lock:
+            self.gave_up += 1
+
+    def stats(self) -> dict:
+        """Throttling counters for this process"""
+        with self._lock:
+            return {
+                "calls": self.calls,
+                "throttled": self.throttled,
+                "wait_seconds": round(self.wait_seconds, 2),
+                "avg_wait_seconds": round(self.wait_seconds / self.throttled, 2) if self.throttled else 0.0,
+                "max_wait_seconds": round(self.max_wait_seconds, 2),
+                "retries": self.retries,
+                "retry_wait_seconds": round(self.retry_wait_seconds, 2),
+                "gave_up": self.gave_up
+            }
+
+
+class RateLimitedChatModel:
+    """
+    Drop-in wrapper for a chat model: every invoke/ainvoke takes quota from the shared
+    limiter first, and retryable errors are retried with backoff. Everything else is passed through.
+    """
+
+    def __init__(self, llm, limiter: TokenBucketLimiter, max_retries: int = MAX_RETRIES, bound=None):
+        self.llm = llm
+        self.limiter = limiter
+        self.max_retries = max_retries
+        self._runnable = bound if bound is not None else llm
+
+    def bind_tools(self, tools, **kwargs) -> "RateLimitedChatModel":
+        return RateLimitedChatModel(self.llm, self.limiter, self.max_retries, self.llm.bind_tools(tools, **kwargs))
+
+    def _should_retry(self, error: Exception, attempt: int) -> bool:
+        if not is_retryable(error):
+            return False
+        if attempt == self.max_retries:
+            self.limiter.note_gave_up()
+            return False
+        return True
+
+    def invoke(self, input, config=None, **kwargs):
+        estimate = estimate_tokens(input) + OUTPUT_TOKEN_RESERVE
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(estimate)
+            try:
+                response = self._runnable.invoke(input, config=config, **kwargs)
+            except Exception as e:
+                # A rejected call used no tokens; give the reservation back
+                self.limiter.settle(estimate, 0)
+                if not self._should_retry(e, attempt):
+                    raise
+                delay = backoff_delay(e, attempt)
+                self.limiter.note_retry(delay)
+                print(f"   Gemini call failed ({e.__class__.__name__}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+                continue
+            self.limiter.settle(estimate, used_tokens(response))
+            return response
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        estimate = estimate_tokens(input) + OUTPUT_TOKEN_RESERVE
+        for attempt in range(self.max_retries + 1):
+            await self.limiter.aacquire(estimate)
+            try:
+                response = await self._runnable.ainvoke(input, config=config, **kwargs)
+            except Exception as e:
+                await asyncio.to_thread(self.limiter.settle, estimate, 0)
+                if not self._should_retry(e, attempt):
+                    raise
+                delay = backoff_delay(e, attempt)
+                self.limiter.note_retry(delay)
+                print(f"   Gemini call failed ({e.__class__.__name__}), retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+                continue
+            await asyncio.to_thread(self.limiter.settle, estimate, used_tokens(response))
+            return response
+
+    def __getattr__(self, name):
+        return getattr(self._runnable, name)
+
+
+def rate_limited(llm, scope: str = "default") -> RateLimitedChatModel:
+    """
+    Wrap llm with the shared limiter at CACHE_DIR/ratelimit.sqlite.
+    Limits come from DEALSCOUT_LLM_RPM and DEALSCOUT_LLM_TPM (0 or unset = no limit);
+    retries are always on (DEALSCOUT_LLM_MAX_RETRIES, default 6).
+    """
+    limiter = TokenBucketLimiter(
+        CACHE_DIR / "ratelimit.sqlite",
+        rpm=float(os.getenv("DEALSCOUT_LLM_RPM", "0")),
+        tpm=float(os.getenv("DEALSCOUT_LLM_TPM", "0")),
+        scope=scope
+    )
+    return RateLimitedChatModel(llm, limiter, max_retries=int(os.getenv("DEALSCOUT_LLM_MAX_RETRIES", MAX_RETRIES)))
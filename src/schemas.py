@@ -0,0 +1,133 @@
+"""
+Typed report schemas for the market, product and traction analysts.
+
+Each report is a TypedDict; its Gemini response schema is derived from the annotations, so
+the analysts' final call asks Gemini for JSON of exactly that shape (response_mime_type
+application/json + response_schema) instead of JSON-looking free text. validate_report()
+checks a response against the same annotations, and the validated dict is what goes into
+DealState (market_data, product_data, traction_data) next to the raw text.
+"""
+import re
+import json
+from typing import List, Optional, TypedDict, get_args, get_origin, get_type_hints
+
+
+class MarketReport(TypedDict):
+    tam_estimate: str
+    competitors: List[str]
+    market_timing_score: int
+    timing_reason: str
+    red_flags: List[str]
+    sources: List[str]
+
+
+class ProductReport(TypedDict):
+    product_quality_score: int
+    is_live: bool
+    tech_stack: str
+    differentiation: str
+    is_feature_or_platform: str
+    technical_risks: List[str]
+    website_quality_score: int
+
+
+class TractionReport(TypedDict):
+    metrics_seem_realistic: bool
+    red_flags: List[str]
+    missing_metrics: List[str]
+    validation_found: str
+    traction_score: int
+
+
+# Guidance Gemini sees in the response schema, on top of the prompt's field list
+FIELD_DESCRIPTIONS = {
+    "tam_estimate": "Total addressable market with the figure and its basis",
+    "competitors": "Names of the top 3-5 competitors",
+    "market_timing_score": "1-10",
+    "sources": "URLs behind the market size and competitor figures",
+    "product_quality_score": "1-10",
+    "is_feature_or_platform": "'feature' or 'platform', with a short reason",
+    "website_quality_score": "1-10",
+    "traction_score": "1-10"
+}
+
+# DealState report field -> (structured field, schema)
+REPORTS = {
+    "market_analysis": ("market_data", MarketReport),
+    "product_analysis": ("product_data", ProductReport),
+    "traction_analysis": ("traction_data", TractionReport)
+}
+
+GEMINI_TYPES = {str: "STRING", int: "INTEGER", float: "NUMBER", bool: "BOOLEAN"}
+
+# A free-text answer (one given without structured output) may wrap its JSON in a code fence
+CODE_FENCE = re.compile(r"```(?:json)?")
+TRAILING_COMMA = re.compile(r",\s*([}\]])")
+
+
+def field_schema(annotation, description: Optional[str] = None) -> dict:
+    if get_origin(annotation) in (list, List):
+        schema = {"type": "ARRAY", "items": field_schema(get_args(annotation)[0])}
+    else:
+        schema = {"type": GEMINI_TYPES[annotation]}
+    if description:
+        schema["description"] = description
+    return schema
+
+
+def response_schema(report: type) -> dict:
+    """Gemini (OpenAPI subset) response schema for a report TypedDict; every field is required"""
+    hints = get_type_hints(report)
+    return {
+        "type": "OBJECT",
+        "properties": {name: field_schema(hint, FIELD_DESCRIPTIONS.get(name)) for name, hint in hints.items()},
+        "required": list(hints)
+    }
+
+
+def structured_output(report: type) -> dict:
+    """Invoke kwargs that make Gemini answer with JSON matching the report schema"""
+    return {"response_mime_type": "application/json", "response_schema": response_schema(report)}
+
+
+def matches(annotation, value) -> bool:
+    if get_origin(annotation) in (list, List):
+        return isinstance(value, list) and all(matches(get_args(annotation)[0], item) for item in value)
+    if annotation is float:
+        return isinstance(value, (int, float)) and not isinstance(value, bool)
+    if annotation is int:
+        return isinstance(value, int) and not isinstance(value, bool)
+    return isinstance(value, annotation)
+
+
+def json_object_text(text: str) -> str:
+    """The outermost JSON object in a response: code fences dropped, then first "{" to last "}" (a linear scan)"""
+    text = CODE_FENCE.sub("", text).strip()
+    start, end = text.find("{"), text.rfind("}")
+    return text[start:end + 1] if start != -1 and end > start else text
+
+
+def parse_json_object(text: str) -> Optional[dict]:
+    """The JSON object in a response (fenced, bare or surrounded by prose), or None; tolerates trailing commas"""
+    if not isinstance(text, str):
+        return None
+    json_str = json_object_text(text)
+    try:
+        data = json.loads(json_str)
+    except ValueError:
+        try:
+            data = json.loads(TRAILING_COMMA.sub(r"\1", json_str))
+        except ValueError:
+            return None
+    return data if isinstance(data, dict) else None
+
+
+def validate_report(report: type, text: str) -> Optional[dict]:
+    """The report parsed from a response, or None if it holds no JSON object of the schema's shape"""
+    data = parse_json_object(text)
+    if data is None:
+        return None
+    hints = get_type_hints(report)
+    if any(name not in data or not matches(hint, data[name]) for name, hint in hints.items()):
+        return None
+    return {name: data[name] for name in hints}
@@ -0,0 +1,13 @@
+"""Shared fixtures: the tests import the flat modules in src/, with caches and data in a temp dir."""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+SRC = Path(__file__).parent.parent / "src"
+sys.path.insert(0, str(SRC))
+
+# Module-level paths are read at import time, so point them away from the repo first
+_scratch = tempfile.mkdtemp(prefix="dealscout-tests-")
+os.environ.setdefault("DEALSCOUT_CACHE_DIR", os.path.join(_scratch, "cache"))
+os.environ.setdefault("DEALSCOUT_DATA_DIR", os.path.join(_scratch, "data"))
@@ -0,0 +1,27 @@
+"""Reading a batch input file and matching its rows to finished deals."""
+import json
+
+from batch import completed_keys, deal_key, read_companies
+
+
+def test_pitch_only_rows_get_distinct_keys(tmp_path):
+    path = tmp_path / "companies.jsonl"
+    path.write_text("\n".join(json.dumps(row) for row in [
+        {"pitch": "We sell shovels to miners."},
+        {"pitch": "We sell maps to miners."},
+        {"name": "Acme", "url": "https://acme.example"}
+    ]))
+    keys = [deal_key(company) for company in read_companies(str(path))]
+
+    assert len(set(keys)) == 3
+    assert keys[2] == "acme|https://acme.example"
+
+
+def test_completed_keys_skips_failed_and_torn_lines(tmp_path):
+    output = tmp_path / "results.jsonl"
+    output.write_text(
+        json.dumps({"key": "a|", "status": "ok"}) + "\n"
+        + json.dumps({"key": "b|", "status": "error"}) + "\n"
+        + '{"key": "c|", "sta'
+    )
+    assert completed_keys(str(output)) == {"a|"}
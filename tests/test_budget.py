@@ -0,0 +1,44 @@
+"""Fitting the downstream prompts' sections to the token budget."""
+import json
+
+from budget import estimate_tokens, fit_sections
+
+ORDER = ["market_analysis", "product_analysis", "traction_analysis", "pitch_text"]
+
+
+def sections(**overrides) -> dict:
+    report = json.dumps({"score": 7, "notes": "fine"})
+    return {"market_analysis": report, "product_analysis": report, "traction_analysis": report,
+            "pitch_text": "Acme builds robots.\n" * 50, **overrides}
+
+
+def test_under_budget_is_left_alone():
+    fitted, usage = fit_sections(sections(), ORDER, budget=100_000)
+    assert fitted == sections()
+    assert usage["tokens_saved"] == 0 and usage["compressed"] == []
+
+
+def test_structured_reports_are_summarized_first():
+    data = {"competitors": [f"Competitor {i}" for i in range(40)], "tam_estimate": "x " * 400}
+    fitted, usage = fit_sections(sections(market_analysis="long prose " * 500), ORDER,
+                                 budget=1000, reports={"market_analysis": data})
+    summary = json.loads(fitted["market_analysis"])
+    assert summary["competitors"][-1] == "... 35 more"
+    assert fitted["pitch_text"] == sections()["pitch_text"]
+    assert usage["compressed"] == ["market_analysis"]
+
+
+def test_unparseable_report_is_clipped_before_the_pitch():
+    huge = "The market looks crowded and growing. " * 2000
+    pitch = "Acme builds warehouse robots.\n" * 150
+    fitted, usage = fit_sections(sections(market_analysis=huge, pitch_text=pitch), ORDER, budget=2000)
+
+    assert fitted["pitch_text"] == pitch
+    assert "[... trimmed" in fitted["market_analysis"]
+    assert usage["tokens_after"] <= 2000
+
+
+def test_sections_are_never_clipped_below_the_floor():
+    fitted, usage = fit_sections(sections(pitch_text="word " * 5000), ["pitch_text"], budget=10)
+    assert estimate_tokens(fitted["pitch_text"]) >= 150 - 20
+    assert usage["compressed"] == ["pitch_text"]
@@ -0,0 +1,69 @@
+"""DiskCache expiry and eviction, and the LLM response cache."""
+from types import SimpleNamespace
+
+import pytest
+
+import cache
+from cache import CachedChatModel, DiskCache, hash_key
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000.0]
+    monkeypatch.setattr(cache, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+def test_entries_expire_after_their_ttl(tmp_path, clock):
+    disk = DiskCache(tmp_path / "c.sqlite", ttl_seconds=60, max_bytes=10_000)
+    disk.put("k", "v")
+
+    clock[0] += 60
+    assert disk.get("k") == "v"
+    # A shorter TTL for this lookup
+    assert disk.get("k", ttl_seconds=30) is None
+    assert disk.get("k") is None
+    assert disk.stats()["expired"] == 1 and disk.stats()["entries"] == 0
+
+
+def test_least_recently_used_entries_are_evicted(tmp_path, clock):
+    disk = DiskCache(tmp_path / "c.sqlite", ttl_seconds=3600, max_bytes=25)
+    for key in ("a", "b"):
+        disk.put(key, "x" * 10)
+        clock[0] += 1
+    disk.get("a")  # a is now more recently used than b
+    clock[0] += 1
+    disk.put("c", "x" * 10)
+
+    assert disk.get("b") is None
+    assert disk.get("a") and disk.get("c")
+    assert disk.stats()["evictions"] == 1
+
+
+def test_entries_are_shared_between_instances(tmp_path):
+    DiskCache(tmp_path / "c.sqlite", 60, 10_000).put("k", "v")
+    assert DiskCache(tmp_path / "c.sqlite", 60, 10_000).get("k") == "v"
+
+
+def test_hash_key_ignores_dict_order():
+    assert hash_key({"a": 1, "b": [2]}) == hash_key({"b": [2], "a": 1})
+    assert hash_key({"a": 1}) != hash_key({"a": 2})
+
+
+def test_tool_rounds_with_the_same_text_get_different_keys(tmp_path):
+    pytest.importorskip("langchain_core")
+    from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+    model = CachedChatModel(SimpleNamespace(model="m", temperature=0), DiskCache(tmp_path / "c.sqlite", 60, 10_000))
+
+    def round_for(query, call_id):
+        return [
+            HumanMessage(content="Research Acme"),
+            AIMessage(content="", tool_calls=[{"name": "google_search", "args": {"query": query}, "id": call_id}]),
+            ToolMessage(content="No results", tool_call_id=call_id, name="google_search")
+        ]
+
+    assert model.cache_key(round_for("acme funding", "1")) != model.cache_key(round_for("acme founders", "1"))
+    assert model.cache_key(round_for("acme funding", "1")) != model.cache_key(round_for("acme funding", "2"))
+    assert model.cache_key(round_for("acme funding", "1")) == model.cache_key(round_for("acme funding", "1"))
+
@@ -0,0 +1,61 @@
+"""Checkpointed runs: a run that stopped part way resumes on its thread without redoing finished nodes."""
+import pytest
+
+pytest.importorskip("langgraph.checkpoint.sqlite")
+
+import agent
+from test_incremental import PITCH, initial_state
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    """Recording stand-ins for every node after research, and a debate node that crashes on its first call"""
+    calls = []
+    crashes = [RuntimeError("debate crashed")]
+
+    def recorder(name, field):
+        def node(state):
+            calls.append(name)
+            if name == "debate_agent" and crashes:
+                raise crashes.pop()
+            return {field: f"{name} done"}
+        return node
+
+    nodes = dict(agent.SYNC_NODES)
+    for name, field in agent.NODE_OUTPUTS.items():
+        if name != "research_agent":
+            nodes[name] = recorder(name, field)
+    research = nodes["research_agent"]
+    nodes["research_agent"] = lambda state: calls.append("research_agent") or research(state)
+    monkeypatch.setattr(agent, "SYNC_NODES", nodes)
+    return agent.build_workflow().compile(checkpointer=agent.open_checkpointer()), calls
+
+
+def test_interrupted_run_resumes_after_the_finished_nodes(graph):
+    app, calls = graph
+    thread_id = agent.new_thread_id()
+    with pytest.raises(RuntimeError, match="debate crashed"):
+        agent.run_deal(initial_state(raw_input=PITCH), thread_id, graph=app)
+    assert set(agent.ANALYST_NODES) <= set(calls)
+    assert app.get_state(agent.thread_config(thread_id)).next == ("debate_agent",)
+
+    calls.clear()
+    result = agent.run_deal(initial_state(raw_input=PITCH), thread_id, graph=app)
+
+    assert calls == ["debate_agent", "questions_agent", "synthesizer_agent"]
+    assert result["market_analysis"] == "market_agent done"
+    assert result["final_memo"] == "synthesizer_agent done"
+
+
+def test_finished_thread_starts_a_fresh_run(graph):
+    app, calls = graph
+    thread_id = agent.new_thread_id()
+    with pytest.raises(RuntimeError):
+        agent.run_deal(initial_state(raw_input=PITCH), thread_id, graph=app)
+    agent.run_deal(initial_state(raw_input=PITCH), thread_id, graph=app)
+    assert not app.get_state(agent.thread_config(thread_id)).next
+
+    calls.clear()
+    agent.run_deal(initial_state(raw_input=PITCH), thread_id, graph=app)
+    assert calls[0] == "research_agent"
+    assert set(agent.ANALYST_NODES) <= set(calls) and calls[-1] == "synthesizer_agent"
@@ -0,0 +1,41 @@
+"""Deduplicating, ranking and budgeting tool results."""
+from condense import condense_tool_results, shingles, tokenize
+
+
+def test_tokenize_keeps_non_ascii_words():
+    assert tokenize("Die Größe des Marktes: 4,5 Mrd. €") == ["die", "größe", "des", "marktes", "4,5", "mrd"]
+    assert tokenize("市场 规模") == ["市场", "规模"]
+
+
+def test_non_ascii_passages_are_not_duplicates():
+    results = [
+        ("google_search", "Der deutsche Markt für Lagerroboter wächst jährlich um zwölf Prozent."),
+        ("google_search", "Los robots de almacén reducen los costes logísticos en España."),
+        ("scrape_website", "Складские роботы снижают затраты на логистику в России.")
+    ]
+    condensed, stats = condense_tool_results(results, "Lagerroboter Markt", budget=10_000)
+    assert stats["duplicates"] == 0
+    assert len(condensed) == 3
+
+
+def test_wordless_passages_are_never_duplicates():
+    assert shingles([]) == set()
+    condensed, stats = condense_tool_results([("a", "---"), ("b", "***")], "task", budget=10_000)
+    assert stats["duplicates"] == 0
+
+
+def test_near_duplicates_and_repeated_urls_are_dropped():
+    hit = "1. Acme raises $20M\n   Acme Robotics raised a $20M series A led by Example Ventures.\n   https://news.example/acme"
+    results = [("google_search", hit), ("google_search", hit.replace("series A", "Series A round"))]
+    condensed, stats = condense_tool_results(results, "Acme funding", budget=10_000)
+    assert stats["duplicates"] == 1
+    assert condensed == [("google_search", hit)]
+
+
+def test_budget_keeps_the_most_relevant_passages():
+    relevant = "1. Warehouse robots market size\n   The warehouse robots market is worth $9B."
+    filler = "2. Unrelated\n   " + "Cooking recipes for pasta and bread. " * 20
+    condensed, stats = condense_tool_results([("google_search", f"{relevant}\n\n{filler}")],
+                                             "warehouse robots market size", budget=40)
+    assert condensed == [("google_search", relevant)]
+    assert stats["over_budget"] == 1
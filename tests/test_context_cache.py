@@ -0,0 +1,97 @@
+"""ContextCache against the offline FakeContextBackend."""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+
+import context_cache
+from context_cache import EXPIRY_MARGIN, ContextCache, FakeContextBackend
+
+PITCH = "Acme builds warehouse robots. " * 200  # well over MIN_TOKENS
+MIN_TOKENS = 100
+
+
+class CountingBackend(FakeContextBackend):
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        super().__init__()
+        self.delay = delay
+        self.fail = fail
+        self.creates = 0
+        self._lock = threading.Lock()
+
+    def create(self, text, tools, ttl):
+        with self._lock:
+            self.creates += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError("upload rejected")
+        return super().create(text, tools, ttl)
+
+
+def test_concurrent_callers_share_one_upload():
+    backend = CountingBackend(delay=0.1)
+    contexts = ContextCache(backend, ttl_seconds=900, min_tokens=MIN_TOKENS)
+
+    with ThreadPoolExecutor(max_workers=6) as pool:
+        handles = list(pool.map(lambda _: contexts.handle_for(PITCH), range(6)))
+
+    assert len(set(handles)) == 1 and handles[0].startswith("cachedContents/fake-")
+    assert backend.creates == 1
+    assert contexts.stats()["created"] == 1
+
+
+def test_handle_is_reused_until_the_expiry_margin(monkeypatch):
+    now = [1_000.0]
+    monkeypatch.setattr(context_cache, "time", SimpleNamespace(time=lambda: now[0]))
+    backend = CountingBackend()
+    contexts = ContextCache(backend, ttl_seconds=900, min_tokens=MIN_TOKENS)
+
+    handle = contexts.handle_for(PITCH)
+    now[0] += 900 - EXPIRY_MARGIN - 1
+    assert contexts.handle_for(PITCH) == handle
+    assert backend.creates == 1 and contexts.stats()["reused"] == 1
+
+    now[0] += 2
+    contexts.handle_for(PITCH)
+    assert backend.creates == 2
+
+
+def test_small_contexts_go_inline():
+    backend = CountingBackend()
+    contexts = ContextCache(backend, min_tokens=MIN_TOKENS)
+
+    assert contexts.handle_for("A short pitch.") is None
+    assert backend.creates == 0
+    assert contexts.stats()["inline"] == 1
+
+
+def test_failed_upload_falls_back_to_inline_and_is_retried():
+    backend = CountingBackend(fail=True)
+    contexts = ContextCache(backend, min_tokens=MIN_TOKENS)
+
+    assert contexts.handle_for(PITCH) is None
+    assert contexts.stats()["failed"] == 1
+
+    backend.fail = False
+    assert contexts.handle_for(PITCH) is not None
+    assert backend.creates == 2
+
+
+def test_fake_backend_puts_the_context_back_in_front():
+    pytest.importorskip("langchain_core")
+    from langchain_core.messages import HumanMessage
+
+    class EchoLLM:
+        def invoke(self, messages, **kwargs):
+            return messages, kwargs
+
+    contexts = ContextCache(FakeContextBackend(), min_tokens=MIN_TOKENS)
+    handle = contexts.handle_for(PITCH)
+    messages, kwargs = contexts.invoke(EchoLLM(), handle, [HumanMessage(content="Analyse the market.")],
+                                       response_mime_type="application/json")
+
+    assert [m.content for m in messages] == [PITCH, "Analyse the market."]
+    assert kwargs == {"response_mime_type": "application/json"}
+    assert contexts.stats()["tokens_referenced"] > 0
@@ -0,0 +1,25 @@
+"""The per-deal evidence index."""
+from evidence import EvidenceIndex, strip_hit_number
+
+SEARCH = ("1. Acme raises $20M\n   Acme Robotics raised a Series A for warehouse robots.\n   https://a.example\n\n"
+          "2. Acme hires\n   Acme Robotics hires warehouse robots engineers.\n   https://b.example\n\n"
+          "3. Acme expands\n   Acme Robotics expands warehouse robots to Europe.\n   https://c.example")
+
+
+def test_search_hits_lose_their_rank_but_page_text_keeps_numbers():
+    assert strip_hit_number("2. Acme hires") == "Acme hires"
+    assert strip_hit_number("Revenue grew 3. Then it fell 4. ") == "Revenue grew 3. Then it fell 4. "
+
+
+def test_covered_query_is_answered_locally():
+    index = EvidenceIndex(min_hits=3)
+    index.add_search("acme news", SEARCH)
+    index.add_page("https://acme.example/", "Revenue grew 3. Then Acme Robotics sold warehouse robots.")
+
+    answer = index.answer("acme robotics warehouse robots")
+    assert answer is not None
+    assert answer.startswith("1. Already gathered for this deal")
+    assert "Revenue grew 3. Then Acme" in answer
+    assert "\n   Acme raises $20M" in answer and "1. Acme raises" not in answer
+    assert index.page("https://ACME.example") == "Revenue grew 3. Then Acme Robotics sold warehouse robots."
+    assert index.answer("biotech clinical trials") is None
@@ -0,0 +1,76 @@
+"""HTML extractors: every backend gives the same text as the original BeautifulSoup one."""
+import pytest
+
+import extract
+from extract import extract_page_text
+
+BACKENDS = sorted(extract.EXTRACTORS)
+
+PAGES = {
+    "entities": (
+        b"<html><head><title>Acme &amp; Sons &mdash; Robots</title>"
+        b"<meta name='description' content='Pick &amp; pack &lt;fast&gt;'></head>"
+        b"<body><p>Price: &euro;10 &nbsp;per&#160;unit &#x2014; caf&eacute;</p>"
+        b"<script>var x = '<p>no</p>';</script><nav>Menu</nav><p>Second line</p></body></html>"
+    ),
+    "declared charset": (
+        '<html><head><meta charset="iso-8859-1"><title>Café Müller</title></head>'
+        '<body><p>Größe: 5 m² - naïve</p></body></html>'
+    ).encode("iso-8859-1"),
+    "inline markup": (
+        b"<html><head><title>Inline</title><meta property='og:description' content='Robots for warehouses'></head>"
+        b"<body><p>Acme <b>builds</b> <a href='/x'>robots</a> for <em>warehouses</em>.</p>\n"
+        b"<div>One<br>Two</div>\n<p>Phrase one  phrase two</p>\n<footer>Legal</footer></body></html>"
+    ),
+    "whitespace between tags": (
+        b"<html><head><title>Spaces</title></head><body>  <p>First</p>   <p>Second</p> \t <span>Third</span>"
+        b"<p>Fourth   <b>bold</b>  </p>  \n  <p>Fifth</p></body></html>"
+    ),
+}
+
+
+@pytest.mark.parametrize("page", sorted(PAGES))
+def test_backends_agree(page):
+    texts = {backend: extract_page_text(PAGES[page], backend=backend) for backend in BACKENDS}
+    assert len(set(texts.values())) == 1, texts
+    assert "Menu" not in texts["bs4"] and "Legal" not in texts["bs4"] and "no</p>" not in texts["bs4"]
+
+
+def test_declared_charset_and_entities_are_decoded():
+    assert "Größe: 5 m² - naïve" in extract_page_text(PAGES["declared charset"], backend="bs4")
+    text = extract_page_text(PAGES["entities"], backend="bs4")
+    assert "Description: Pick & pack <fast>" in text and "— café" in text
+
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_multibyte_characters_split_across_chunks(backend):
+    page = "<html><head><title>Ünïcødé</title></head><body><p>Zürich — 東京</p></body></html>".encode("utf-8")
+    one_byte_chunks = [page[i:i + 1] for i in range(len(page))]
+    assert extract_page_text(one_byte_chunks, backend=backend) == extract_page_text(page, backend="bs4")
+
+
+def paragraphs(count: int):
+    yield b"<html><head><title>Long page</title></head><body>\n"
+    for n in range(count):
+        yield b"<p>Paragraph %d about warehouse robots and the orders they pick.</p>\n" % n
+    yield b"</body></html>"
+
+
+@pytest.mark.parametrize("backend", ["lxml", "stream"])
+@pytest.mark.parametrize("separator", [b"\n", b""], ids=["lines", "minified"])
+def test_streaming_stops_once_the_budget_is_full(backend, separator):
+    if backend not in extract.EXTRACTORS:
+        pytest.skip("lxml not installed")
+    pulled = []
+
+    def chunks():
+        for chunk in paragraphs(5000):
+            pulled.append(chunk)
+            yield chunk.replace(b"\n", separator)
+
+    text = extract_page_text(chunks(), backend=backend)
+
+    # A minified page is one line, flushed once it holds four budgets of text
+    assert len(pulled) < 5000 * 0.2
+    assert text == extract_page_text(b"".join(paragraphs(5000)).replace(b"\n", separator), backend="bs4")
+    assert len(text.split("Content:\n", 1)[1]) == extract.CONTENT_BUDGET
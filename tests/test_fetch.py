@@ -0,0 +1,158 @@
+"""PageFetcher against a local stub HTTP server."""
+import asyncio
+import threading
+from contextlib import aclosing, closing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("httpx")
+
+from cache import DiskCache
+from fetch import HTTPCache, PageFetcher, UnsupportedContent, build_session
+
+PAGE = b"<html><body>" + b"<p>hello world</p>" * 20 + b"</body></html>"
+BIG = b"<html><body>" + b"x" * 200_000 + b"</body></html>"
+ETAG = '"v1"'
+LAST_MODIFIED = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+
+    def log_message(self, *args):
+        pass
+
+    def send_body(self, body: bytes, content_type: str = "text/html", headers: dict = None):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        try:
+            self.wfile.write(body)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def do_GET(self):
+        StubHandler.requests_seen.append((self.path, dict(self.headers)))
+        if self.path == "/etag":
+            # no-cache: always revalidate, so the second fetch is a conditional GET
+            if self.headers.get("If-None-Match") == ETAG:
+                self.send_response(304)
+                self.send_header("ETag", ETAG)
+                self.end_headers()
+                return
+            self.send_body(PAGE, headers={"ETag": ETAG, "Cache-Control": "no-cache"})
+        elif self.path == "/last-modified":
+            if self.headers.get("If-Modified-Since") == LAST_MODIFIED:
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_body(PAGE, headers={"Last-Modified": LAST_MODIFIED, "Cache-Control": "max-age=0"})
+        elif self.path == "/big":
+            if self.headers.get("If-None-Match") == '"big"':
+                self.send_response(304)
+                self.end_headers()
+                return
+            self.send_body(BIG, headers={"ETag": '"big"', "Cache-Control": "no-cache"})
+        elif self.path == "/pdf":
+            self.send_body(b"%PDF-1.4 binary", content_type="application/pdf")
+        else:
+            self.send_response(404)
+            self.end_headers()
+
+
+@pytest.fixture(scope="module")
+def server():
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}"
+    httpd.shutdown()
+    httpd.server_close()
+
+
+@pytest.fixture
+def fetcher(tmp_path):
+    StubHandler.requests_seen.clear()
+    cache = HTTPCache(DiskCache(tmp_path / "http.sqlite", ttl_seconds=3600, max_bytes=16 * 1024 * 1024))
+    page_fetcher = PageFetcher(build_session(), cache, timeout=5, max_bytes=10_000)
+    yield page_fetcher
+    page_fetcher.close()
+
+
+def test_etag_revalidation_is_served_from_cache(server, fetcher):
+    assert fetcher.get(f"{server}/etag") == PAGE
+    assert fetcher.get(f"{server}/etag") == PAGE
+
+    (_, first), (_, second) = StubHandler.requests_seen
+    assert "If-None-Match" not in first
+    assert second["If-None-Match"] == ETAG
+    assert fetcher.http_cache.stats() == {"fresh_hits": 0, "revalidated": 1, "downloads": 1}
+
+
+def test_last_modified_revalidation_is_served_from_cache(server, fetcher):
+    assert fetcher.get(f"{server}/last-modified") == PAGE
+    assert fetcher.get(f"{server}/last-modified") == PAGE
+
+    assert StubHandler.requests_seen[1][1]["If-Modified-Since"] == LAST_MODIFIED
+    assert fetcher.http_cache.revalidated == 1
+
+
+def test_byte_cap_stops_the_stream(server, fetcher):
+    body = fetcher.get(f"{server}/big")
+
+    assert len(body) == fetcher.max_bytes
+    assert fetcher.truncated == 1
+    # The capped body is all this fetcher will ever read, so it is cached as the whole page
+    assert fetcher.http_cache.lookup(f"{server}/big")["complete"] is True
+
+
+def test_non_html_is_rejected(server, fetcher):
+    with pytest.raises(UnsupportedContent):
+        fetcher.get(f"{server}/pdf")
+    assert fetcher.http_cache.lookup(f"{server}/pdf") is None
+
+
+def test_early_stop_is_cached_as_partial(server, fetcher):
+    url = f"{server}/big"
+    with closing(fetcher.iter_page(url)) as chunks:
+        prefix = next(chunks)
+
+    assert fetcher.http_cache.lookup(url) is None
+    assert fetcher.http_cache.lookup(url, prefix_ok=True)["complete"] is False
+
+    # A caller that only needs a prefix revalidates the partial entry...
+    assert b"".join(fetcher.iter_page(url, prefix_ok=True)) == prefix
+    assert StubHandler.requests_seen[-1][1]["If-None-Match"] == '"big"'
+    # ...but one that wants the page downloads it again, unconditionally
+    assert len(fetcher.get(url)) == fetcher.max_bytes
+    assert "If-None-Match" not in StubHandler.requests_seen[-1][1]
+
+
+def test_async_fetch_revalidates_and_closes_its_client(server, fetcher):
+    async def fetch_twice():
+        bodies = []
+        for _ in range(2):
+            async with aclosing(fetcher.aiter_page(f"{server}/etag")) as chunks:
+                bodies.append(b"".join([chunk async for chunk in chunks]))
+        await fetcher.aclose()
+        return bodies
+
+    assert asyncio.run(fetch_twice()) == [PAGE, PAGE]
+    assert fetcher.http_cache.revalidated == 1
+    assert not fetcher._async_clients
+
+    async def reject():
+        try:
+            async with aclosing(fetcher.aiter_page(f"{server}/pdf")) as chunks:
+                async for _ in chunks:
+                    pass
+        finally:
+            await fetcher.aclose()
+
+    with pytest.raises(UnsupportedContent):
+        asyncio.run(reject())
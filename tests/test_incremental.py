@@ -0,0 +1,97 @@
+"""Incremental re-analysis: only the nodes downstream of an edit run again."""
+import pytest
+
+pytest.importorskip("langgraph")
+
+import agent
+
+PITCH = "Company: Acme Robotics\n" + "Acme builds warehouse robots that pick and pack orders. " * 6
+
+
+@pytest.fixture
+def graph(monkeypatch):
+    """The real research node (a provided pitch needs no LLM) with recording stand-ins downstream"""
+    calls = []
+
+    def recorder(name, field):
+        def node(state):
+            calls.append((name, state["pitch_text"]))
+            return {field: f"{name} on {len(state['pitch_text'])} chars"}
+        return node
+
+    nodes = dict(agent.SYNC_NODES)
+    for name, field in agent.NODE_OUTPUTS.items():
+        if name != "research_agent":
+            nodes[name] = recorder(name, field)
+    research = nodes["research_agent"]
+    nodes["research_agent"] = lambda state: calls.append(("research_agent", state["raw_input"])) or research(state)
+    monkeypatch.setattr(agent, "SYNC_NODES", nodes)
+    return agent.build_workflow().compile(), calls
+
+
+def initial_state(**fields) -> dict:
+    state = {field: "" for field in ("deal_id", "company_name", "company_url", "raw_input", "pitch_text", "market_analysis",
+                                     "product_analysis", "traction_analysis", "debate_transcript",
+                                     "questions_to_reconsider", "final_memo")}
+    state.update(market_data={}, product_data={}, traction_data={}, node_timings=[], node_fingerprints={},
+                 failed_nodes={}, prompt_budget=[])
+    return {**state, **fields}
+
+
+def test_edited_pitch_reaches_the_analysts(graph):
+    app, calls = graph
+    # No company name given: research fills it in from the pitch
+    result = app.invoke(initial_state(raw_input=PITCH))
+    assert result["company_name"] == "Acme Robotics"
+    assert result["pitch_text"] == PITCH
+
+    calls.clear()
+    edited = PITCH + "\nTraction: 40 paying warehouses."
+    rerun = app.invoke(agent.reanalysis_state(result, {"pitch_text": edited}))
+
+    assert rerun["pitch_text"] == edited
+    assert "research_agent" not in [name for name, _ in calls]
+    for analyst in agent.ANALYST_NODES:
+        assert (analyst, edited) in calls
+
+
+def test_unchanged_rerun_reuses_every_node(graph):
+    app, calls = graph
+    result = app.invoke(initial_state(raw_input=PITCH))
+
+    calls.clear()
+    app.invoke(agent.reanalysis_state(result, {}))
+    assert calls == []
+
+
+def test_deal_id_is_assigned_once_and_survives_research(graph):
+    app, _ = graph
+    result = app.invoke(initial_state(raw_input=PITCH))
+    assert result["deal_id"]
+
+    rerun = app.invoke(agent.reanalysis_state(result, {"pitch_text": PITCH + "\nNew."}))
+    assert rerun["deal_id"] == result["deal_id"]
+    assert agent.deal_key(rerun) == result["deal_id"]
+
+
+def test_failed_analyst_degrades_and_reruns_on_reanalysis(graph, monkeypatch):
+    app, calls = graph
+    product = agent.SYNC_NODES["product_agent"]
+
+    def failing(state):
+        raise RuntimeError("scraper blew up")
+
+    monkeypatch.setitem(agent.SYNC_NODES, "product_agent", failing)
+    result = agent.build_workflow().compile().invoke(initial_state(raw_input=PITCH))
+
+    assert result["failed_nodes"]["product_agent"] == "scraper blew up"
+    assert result["product_analysis"] == agent.FAILED_ANALYSIS.format(area="product")
+    assert "Error" not in result["product_analysis"]
+    assert result["final_memo"]
+
+    monkeypatch.setitem(agent.SYNC_NODES, "product_agent", product)
+    calls.clear()
+    rerun = agent.build_workflow().compile().invoke(agent.reanalysis_state(result, {}))
+
+    assert [name for name, _ in calls] == ["product_agent", "debate_agent", "questions_agent", "synthesizer_agent"]
+    assert rerun["failed_nodes"]["product_agent"] == ""
@@ -0,0 +1,90 @@
+"""PDF ingestion: text extraction, the content-hash cache, and page ranges over the worker pool."""
+import pytest
+
+pytest.importorskip("PyPDF2")
+
+import ingest
+
+
+def make_pdf(pages) -> bytes:
+    """A minimal PDF with one line of Helvetica text per page"""
+    count = len(pages)
+    kids = " ".join(f"{3 + 2 * i} 0 R" for i in range(count))
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{kids}] /Count {count} >>".encode(),
+    ]
+    font = 3 + 2 * count
+    for i, text in enumerate(pages):
+        content = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode()
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Contents {4 + 2 * i} 0 R "
+                       f"/Resources << /Font << /F1 {font} 0 R >> >> >>".encode())
+        objects.append(b"<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content))
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n%s\nendobj\n" % (number, body)
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    out += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(out)
+
+
+@pytest.fixture
+def text_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(ingest, "_text_cache", ingest.DiskCache(tmp_path / "pdf_text.sqlite", 3600, 1024 * 1024))
+
+
+def test_extract_pdf_bytes_reads_every_page(text_cache):
+    deck = make_pdf(["Acme Robotics", "Warehouse picking robots", "ARR 1.2M"])
+    result = ingest.extract_pdf_bytes(memoryview(deck))
+
+    assert result["pages"] == 3 and not result["cached"]
+    assert [line.strip() for line in result["text"].splitlines()] == ["Acme Robotics", "Warehouse picking robots", "ARR 1.2M"]
+
+
+def test_same_bytes_hit_the_cache_from_memory_and_disk(text_cache, tmp_path):
+    deck = make_pdf(["Acme Robotics", "Seed round"])
+    first = ingest.extract_pdf_bytes(deck)
+    again = ingest.extract_pdf_bytes(deck)
+    path = tmp_path / "deck.pdf"
+    path.write_bytes(deck)
+    from_file = ingest.extract_pdf(str(path))
+
+    assert again["cached"] and from_file["cached"]
+    assert again["hash"] == from_file["hash"] == first["hash"]
+    assert again["text"] == from_file["text"] == first["text"]
+    # Different bytes, different entry
+    assert not ingest.extract_pdf_bytes(make_pdf(["Other deck"]))["cached"]
+
+
+def test_page_ranges_cover_every_page_once():
+    for page_count in (1, 5, 16, 33):
+        ranges = ingest.page_ranges(page_count, workers=3)
+        assert [page for start, stop in ranges for page in range(start, stop)] == list(range(page_count))
+
+
+def test_pool_extraction_matches_in_process(tmp_path, monkeypatch):
+    path = tmp_path / "deck.pdf"
+    path.write_bytes(make_pdf([f"Slide {n} of the Acme deck" for n in range(9)]))
+
+    monkeypatch.setattr(ingest, "PDF_WORKERS", 1)
+    in_process = ingest.extract_pages(str(path))
+
+    monkeypatch.setattr(ingest, "PDF_WORKERS", 2)
+    monkeypatch.setattr(ingest, "PARALLEL_MIN_PAGES", 1)
+    monkeypatch.setattr(ingest, "_pool", None)
+    try:
+        pooled = ingest.extract_pages(str(path))
+        # Still the pool that ran it, not the in-process fallback
+        assert ingest._pool is not None
+    finally:
+        ingest._reset_pool()
+
+    assert len(ingest.page_ranges(9, 2)) > 1
+    assert pooled == in_process
+    assert in_process[4].strip() == "Slide 4 of the Acme deck"
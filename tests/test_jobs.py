@@ -0,0 +1,111 @@
+"""JobQueue state transitions, orphan recovery, and JobRunner draining the queue."""
+import subprocess
+import sys
+import time
+
+import jobs
+from jobs import JobQueue, JobRunner
+
+
+def dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+def test_claim_takes_the_oldest_queued_job(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite")
+    first = queue.enqueue({"company_name": "A"})
+    second = queue.enqueue({"company_name": "B"})
+    assert queue.get(second)["position"] == 2
+
+    job = queue.claim()
+    assert job["id"] == first and job["input"] == {"company_name": "A"}
+    stored = queue.get(first)
+    assert stored["status"] == "running" and stored["owner"] == jobs.os.getpid()
+    assert queue.get(second)["position"] == 1
+
+    assert queue.claim()["id"] == second
+    assert queue.claim() is None
+
+
+def test_finish_and_fail_record_the_outcome(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite")
+    done_id, failed_id = queue.enqueue({}), queue.enqueue({})
+    queue.claim(), queue.claim()
+
+    queue.finish(done_id, {"memo": "ok"}, {"nodes": {"memo_agent": {"state": "done"}}})
+    queue.fail(failed_id, "boom", {"nodes": {}})
+
+    done = queue.get(done_id)
+    assert done["status"] == "done" and done["result"] == {"memo": "ok"}
+    assert done["progress"]["nodes"]["memo_agent"]["state"] == "done" and done["finished"]
+    failed = queue.get(failed_id)
+    assert failed["status"] == "failed" and failed["error"] == "boom" and failed["result"] is None
+
+
+def test_retry_only_requeues_failed_jobs(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite")
+    job_id = queue.enqueue({})
+    queue.claim()
+    assert not queue.retry(job_id)
+
+    queue.fail(job_id, "boom", {})
+    assert queue.retry(job_id)
+    job = queue.get(job_id)
+    assert job["status"] == "queued" and job["error"] is None and job["owner"] is None
+
+
+def test_requeue_orphans_only_takes_jobs_of_dead_workers(tmp_path):
+    queue = JobQueue(tmp_path / "jobs.sqlite")
+    alive, dead, unowned = queue.enqueue({}), queue.enqueue({}), queue.enqueue({})
+    for _ in range(3):
+        queue.claim()
+    with queue._connect() as conn:
+        conn.execute("UPDATE jobs SET owner = ? WHERE id = ?", (dead_pid(), dead))
+        conn.execute("UPDATE jobs SET owner = NULL WHERE id = ?", (unowned,))
+
+    assert queue.requeue_orphans() == 2
+    assert queue.get(alive)["status"] == "running"
+    assert queue.get(dead)["status"] == "queued" and queue.get(unowned)["status"] == "queued"
+
+
+def wait_for(queue, job_id, status, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = queue.get(job_id)
+        if job["status"] == status:
+            return job
+        time.sleep(0.02)
+    raise AssertionError(f"job {job_id} is {queue.get(job_id)['status']}, not {status}")
+
+
+def test_runner_passes_run_options_and_stores_the_result(tmp_path):
+    calls = []
+
+    def stream_fn(initial_state, thread_id, **options):
+        calls.append(options)
+        if options.get("fail"):
+            raise RuntimeError("analyst crashed")
+        yield "start", "research_agent", None
+        yield "done", "research_agent", {"node_timings": [{"seconds": 0.1}]}
+        yield "result", None, {"company_name": initial_state["company_name"]}
+
+    queue = JobQueue(tmp_path / "jobs.sqlite")
+    runner = JobRunner(stream_fn, queue=queue, workers=2)
+    try:
+        ok = runner.submit({"company_name": "Acme"}, resources="mine")
+        bad = runner.submit({"company_name": "Bust"}, fail=True)
+        done = wait_for(queue, ok, "done")
+        failed = wait_for(queue, bad, "failed")
+    finally:
+        runner.stop()
+        for thread in runner._threads:
+            thread.join(timeout=5)
+
+    assert {"resources": "mine"} in calls and {"fail": True} in calls
+    assert done["result"] == {"company_name": "Acme"}
+    assert done["progress"]["nodes"]["research_agent"] == {"state": "done", "seconds": 0.1}
+    assert failed["error"] == "analyst crashed"
+    # A failed job keeps its options for retry(); a finished one drops them
+    assert ok not in runner._run_options and bad in runner._run_options
@@ -0,0 +1,90 @@
+"""Cross-deal knowledge base: FTS5 lookup, freshness rules and excluding the current deal."""
+import sqlite3
+from types import SimpleNamespace
+
+import pytest
+
+import knowledge
+from knowledge import DAY, KnowledgeBase, format_knowledge
+
+
+def has_fts5() -> bool:
+    conn = sqlite3.connect(":memory:")
+    try:
+        conn.execute("CREATE VIRTUAL TABLE t USING fts5(x)")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+
+pytestmark = pytest.mark.skipif(not has_fts5(), reason="SQLite built without FTS5")
+
+ROBOTS = ("Acme builds autonomous warehouse robots that pick, pack and sort ecommerce orders "
+          "for third-party logistics providers and fulfillment centers.")
+SIMILAR = ("Botline makes autonomous warehouse robots for picking and packing ecommerce orders "
+           "in fulfillment centers run by logistics providers.")
+UNRELATED = "Doughly runs a subscription bakery delivering sourdough bread to homes in Lisbon every morning."
+
+REPORT = {
+    "tam_estimate": "$18B warehouse automation market by 2027",
+    "market_timing_score": 8,
+    "timing_reason": "Labour shortages push fulfillment centers to automate picking",
+    "competitors": ["Locus Robotics", "Berkshire Grey", " "],
+    "sources": ["https://example.com/warehouse-automation", "not a url"]
+}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1_000_000_000.0]
+    monkeypatch.setattr(knowledge, "time", SimpleNamespace(time=lambda: now[0]))
+    return now
+
+
+@pytest.fixture
+def kb(tmp_path, clock):
+    return KnowledgeBase(tmp_path / "knowledge.sqlite", max_age_days=90)
+
+
+def test_similar_market_finds_the_earlier_analysis(kb):
+    kb.record("deal-acme", "Acme", ROBOTS, REPORT)
+
+    [match] = kb.lookup(SIMILAR)
+    assert match["company"] == "Acme"
+    assert match["tam_estimate"] == REPORT["tam_estimate"] and match["timing_score"] == 8
+    # Blank names and non-URLs are dropped on record
+    assert match["competitors"] == ["Locus Robotics", "Berkshire Grey"]
+    assert match["sources"] == ["https://example.com/warehouse-automation"]
+    assert not match["verify"]
+    assert "Locus Robotics" in format_knowledge([match])
+
+    assert kb.lookup(UNRELATED) == []
+    assert kb.stats() == {"entries": 1, "lookups": 2, "matched": 1, "recorded": 1}
+
+
+def test_a_deal_never_sees_its_own_analysis(kb):
+    kb.record("deal-acme", "Acme", ROBOTS, REPORT)
+    assert kb.lookup(ROBOTS, exclude_deal="deal-acme") == []
+    assert kb.lookup(ROBOTS, exclude_deal="deal-botline")
+
+
+def test_recording_a_deal_again_replaces_its_entry(kb):
+    kb.record("deal-acme", "Acme", ROBOTS, REPORT)
+    kb.record("deal-acme", "Acme", ROBOTS, {**REPORT, "tam_estimate": "$20B"})
+
+    assert kb.stats()["entries"] == 1
+    assert [match["tam_estimate"] for match in kb.lookup(SIMILAR)] == ["$20B"]
+
+
+def test_older_analyses_are_flagged_then_dropped(kb, clock):
+    kb.record("deal-acme", "Acme", ROBOTS, REPORT)
+
+    clock[0] += 46 * DAY
+    [match] = kb.lookup(SIMILAR)
+    assert match["verify"] and round(match["age_days"]) == 46
+    assert "[verify: older figures]" in format_knowledge([match])
+
+    clock[0] += 45 * DAY
+    assert kb.lookup(SIMILAR) == []
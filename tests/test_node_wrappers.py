@@ -0,0 +1,69 @@
+"""The sync and async node wrappers built by agent.wrap_node."""
+import asyncio
+
+import pytest
+
+agent = pytest.importorskip("agent")
+
+
+def sync_and_async(update=None, error=None):
+    seen = []
+
+    def node(state):
+        seen.append(state)
+        if error:
+            raise error
+        return dict(update or {})
+
+    async def anode(state):
+        return node(state)
+
+    return seen, node, anode
+
+
+def run(wrapped, state):
+    if asyncio.iscoroutinefunction(wrapped):
+        return asyncio.run(wrapped(state))
+    return wrapped(state)
+
+
+@pytest.mark.parametrize("variant", [1, 2])
+def test_wrappers_compose_around_sync_and_async_nodes(variant):
+    seen, *nodes = sync_and_async({"market_analysis": "report"})
+    node_fn = nodes[variant - 1]
+    wrapped = agent.timed_node("market_agent", agent.evidence_node(agent.deal_entry_node(
+        agent.analyst_node("market_agent", node_fn))))
+    assert asyncio.iscoroutinefunction(wrapped) == (variant == 2)
+
+    update = run(wrapped, {"deal_id": ""})
+
+    assert update["market_analysis"] == "report"
+    assert update["deal_id"] and seen[0]["deal_id"] == update["deal_id"]
+    assert update["failed_nodes"] == {"market_agent": ""}
+    assert update["node_timings"][0]["node"] == "market_agent"
+
+
+@pytest.mark.parametrize("variant", [1, 2])
+def test_analyst_failure_becomes_an_update(variant):
+    _, *nodes = sync_and_async(error=RuntimeError("boom"))
+    update = run(agent.analyst_node("traction_agent", nodes[variant - 1]), {})
+    assert update["failed_nodes"] == {"traction_agent": "boom"}
+    assert update["traction_data"] == {}
+
+
+@pytest.mark.parametrize("variant", [1, 2])
+def test_evidence_is_reset_even_when_the_node_raises(variant):
+    _, *nodes = sync_and_async(error=ValueError("bad input"))
+    with pytest.raises(ValueError):
+        run(agent.evidence_node(nodes[variant - 1]), {"deal_id": "d1"})
+    assert agent.active_evidence.get(None) is None
+
+
+@pytest.mark.parametrize("variant", [1, 2])
+def test_incremental_node_skips_without_calling(variant):
+    seen, *nodes = sync_and_async({"debate_transcript": "new"})
+    state = {"market_analysis": "m", "product_analysis": "p", "traction_analysis": "t", "debate_transcript": "old"}
+    state["node_fingerprints"] = {"debate_agent": agent.node_fingerprint("debate_agent", state)}
+
+    assert run(agent.incremental_node("debate_agent", nodes[variant - 1]), state) == {}
+    assert seen == []
@@ -0,0 +1,64 @@
+"""Retry classification and the shared token-bucket limiter."""
+from ratelimit import TokenBucketLimiter, is_retryable
+
+
+class ResourceExhausted(Exception):
+    """Stands in for google.api_core.exceptions.ResourceExhausted, matched by name"""
+
+
+class ClientError(Exception):
+    def __init__(self, message, code=None):
+        super().__init__(message)
+        self.code = code
+
+
+def test_status_codes_decide_when_present():
+    assert is_retryable(ClientError("slow down", code=429))
+    assert is_retryable(ClientError("backend", code=503))
+    assert not is_retryable(ClientError("bad request", code=400))
+
+
+def test_message_text_alone_is_not_retryable():
+    assert not is_retryable(ValueError("Invalid argument: field 'quota' is unavailable"))
+    assert not is_retryable(ValueError("company founded in 2019 with 500 employees"))
+
+
+def test_google_error_types_are_retryable_through_wrappers():
+    assert is_retryable(ResourceExhausted("429 Resource has been exhausted"))
+    try:
+        try:
+            raise ResourceExhausted("quota")
+        except ResourceExhausted as e:
+            raise RuntimeError("Error calling model") from e
+    except RuntimeError as wrapped:
+        assert is_retryable(wrapped)
+
+
+def test_buckets_start_full_and_throttle_when_empty(tmp_path):
+    limiter = TokenBucketLimiter(tmp_path / "rl.sqlite", rpm=0, tpm=600)
+    assert limiter.acquire(600) == 0
+
+    waited = limiter.acquire(5)
+    # The tokens bucket refills at ten per second
+    assert 0.3 < waited < 2
+    assert limiter.stats()["throttled"] == 1
+
+
+def test_buckets_are_shared_through_the_file(tmp_path):
+    first = TokenBucketLimiter(tmp_path / "rl.sqlite", rpm=0, tpm=6000)
+    second = TokenBucketLimiter(tmp_path / "rl.sqlite", rpm=0, tpm=6000)
+    assert first.acquire(6000) == 0
+    assert second._try_take(3000) > 25
+
+
+def test_settle_refunds_an_overestimate(tmp_path):
+    limiter = TokenBucketLimiter(tmp_path / "rl.sqlite", rpm=0, tpm=6000)
+    limiter.acquire(6000)
+    limiter.settle(estimated=6000, actual=1000)
+    assert limiter._try_take(4000) == 0
+
+
+def test_zero_limits_disable_the_limiter(tmp_path):
+    limiter = TokenBucketLimiter(tmp_path / "rl.sqlite", rpm=0, tpm=0)
+    assert not limiter.enabled
+    assert limiter.acquire(10**9) == 0
@@ -0,0 +1,107 @@
+"""Report schemas, and the analysts' use of structured output."""
+import json
+
+import pytest
+
+from schemas import MarketReport, TractionReport, response_schema, validate_report
+
+MARKET = {"tam_estimate": "$9B (2025, industry report)", "competitors": ["Locus", "6 River"],
+          "market_timing_score": 8, "timing_reason": "Labour shortages", "red_flags": [],
+          "sources": ["https://example.com/report"]}
+
+
+def test_response_schema_requires_every_field():
+    schema = response_schema(MarketReport)
+    assert schema["required"] == list(MARKET)
+    assert schema["properties"]["competitors"]["items"] == {"type": "STRING"}
+    assert schema["properties"]["market_timing_score"]["type"] == "INTEGER"
+
+
+def test_validate_report_accepts_bare_and_fenced_json():
+    assert validate_report(MarketReport, json.dumps(MARKET)) == MARKET
+    assert validate_report(MarketReport, f"```json\n{json.dumps(MARKET)}\n```") == MARKET
+    # Extra fields are dropped
+    assert validate_report(MarketReport, json.dumps({**MARKET, "notes": "x"})) == MARKET
+
+
+@pytest.mark.parametrize("text", [
+    None,
+    "not json",
+    "[1, 2]",
+    json.dumps({k: v for k, v in MARKET.items() if k != "sources"}),
+    json.dumps({**MARKET, "market_timing_score": "8"}),
+    json.dumps({**MARKET, "market_timing_score": True}),
+    json.dumps({**MARKET, "competitors": ["Locus", 6]}),
+])
+def test_validate_report_rejects_other_shapes(text):
+    assert validate_report(MarketReport, text) is None
+
+
+def test_bool_fields_are_not_ints():
+    traction = {"metrics_seem_realistic": True, "red_flags": [], "missing_metrics": ["churn"],
+                "validation_found": "none", "traction_score": 4}
+    assert validate_report(TractionReport, json.dumps(traction)) == traction
+    assert validate_report(TractionReport, json.dumps({**traction, "metrics_seem_realistic": 1})) is None
+
+
+class FakeMessage:
+    def __init__(self, content, tool_calls=()):
+        self.content = content
+        self.tool_calls = list(tool_calls)
+
+
+@pytest.fixture
+def tool_agent(monkeypatch):
+    agent = pytest.importorskip("agent")
+    calls = []
+
+    class FakeLLM:
+        def __init__(self, answer):
+            self.answer = answer
+
+        def bind_tools(self, tools):
+            return self
+
+        def invoke(self, messages, **kwargs):
+            calls.append(kwargs)
+            return FakeMessage(self.answer)
+
+    def use_answer(first_answer, structured_answer=json.dumps(MARKET)):
+        monkeypatch.setattr(agent, "get_tools", lambda: [])
+        monkeypatch.setattr(agent, "get_llm", lambda: FakeLLM(first_answer))
+        monkeypatch.setattr(agent, "invoke_llm",
+                            lambda messages, context=None, **kwargs: FakeLLM(structured_answer).invoke(messages, **kwargs))
+        return agent.run_tool_agent("system", "user", max_tool_calls=3, report=MarketReport)
+
+    return use_answer, calls
+
+
+def test_valid_answer_without_tools_is_not_asked_for_again(tool_agent):
+    run, calls = tool_agent
+    assert validate_report(MarketReport, run(json.dumps(MARKET))) == MARKET
+    assert len(calls) == 1
+
+
+def test_invalid_answer_without_tools_is_asked_for_as_structured_output(tool_agent):
+    run, calls = tool_agent
+    assert validate_report(MarketReport, run("The market is big.")) == MARKET
+    assert len(calls) == 2
+    assert calls[1]["response_mime_type"] == "application/json"
+
+
+def test_report_json_is_found_in_prose_and_repaired():
+    from schemas import parse_json_object
+
+    text = f"Here is the report:\n```json\n{json.dumps(MARKET)[:-1]},}}\n```\nLet me know."
+    assert parse_json_object(text) == MARKET
+    assert validate_report(MarketReport, text) == MARKET
+    assert parse_json_object("no braces at all") is None
+
+
+def test_budget_parses_reports_like_the_schema_check():
+    from budget import summarize_report
+
+    assert json.loads(summarize_report(f"Summary first.\n{json.dumps(MARKET)}")) == MARKET
+    # A brace inside a long unstructured report is scanned, not backtracked over
+    unstructured = "{ " + "words " * 50_000
+    assert summarize_report(unstructured) == unstructured
@@ -0,0 +1,97 @@
+"""The search cache key and SingleFlight coalescing of identical in-flight searches."""
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from cache import SingleFlight
+
+
+def test_normalize_query_keeps_word_order():
+    agent = pytest.importorskip("agent")
+    assert agent.normalize_query("  Acme   acquires, BETA!") == "acme acquires beta"
+    assert agent.normalize_query("acme acquires beta") != agent.normalize_query("beta acquires acme")
+    assert agent.normalize_query("new new york") != agent.normalize_query("new york")
+
+
+def test_async_leader_rechecks_the_cache(monkeypatch, tmp_path):
+    agent = pytest.importorskip("agent")
+    from cache import DiskCache
+
+    search_cache = DiskCache(tmp_path / "search.sqlite", 3600, 10**6)
+    upstream = []
+
+    class Search:
+        gl = hl = k = None
+
+        async def aresults(self, query):
+            upstream.append(query)
+            return {"organic": []}
+
+    lookups = []
+    original_get = search_cache.get
+
+    def get(key):
+        lookups.append(key)
+        # The first lookup misses; by the time the leader runs, another flight has stored the results
+        if len(lookups) == 1:
+            search_cache.put(key, '{"organic": [{"title": "stored"}]}')
+            return None
+        return original_get(key)
+
+    monkeypatch.setattr(search_cache, "get", get)
+    monkeypatch.setattr(agent, "get_search_cache", lambda: search_cache)
+    monkeypatch.setattr(agent, "get_search", lambda: Search())
+
+    results = asyncio.run(agent.acached_search_results("acme funding"))
+    assert results == {"organic": [{"title": "stored"}]}
+    assert upstream == []
+
+
+def test_single_flight_runs_concurrent_calls_once():
+    flight, calls, release = SingleFlight(), [], threading.Event()
+
+    def work():
+        calls.append(1)
+        release.wait(5)
+        return "result"
+
+    with ThreadPoolExecutor(max_workers=4) as pool:
+        futures = [pool.submit(flight.do, "key", work) for _ in range(4)]
+        while flight.coalesced < 3:
+            time.sleep(0.01)
+        release.set()
+        results = [future.result() for future in futures]
+
+    assert results == ["result"] * 4
+    assert len(calls) == 1
+    # Once finished, the next call runs again
+    assert flight.do("key", lambda: "again") == "again"
+
+
+def test_single_flight_shares_exceptions():
+    flight = SingleFlight()
+
+    def fail():
+        raise RuntimeError("upstream down")
+
+    with pytest.raises(RuntimeError):
+        flight.do("key", fail)
+    assert flight.do("key", lambda: "recovered") == "recovered"
+
+
+def test_single_flight_coalesces_coroutines():
+    flight, calls = SingleFlight(), []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    async def main():
+        return await asyncio.gather(*(flight.ado("key", work) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["result"] * 5
+    assert len(calls) == 1 and flight.coalesced == 4
@@ -0,0 +1,83 @@
+"""Tool-call rounds: results come back in call order, and a slow call times out without holding up the round."""
+import asyncio
+import threading
+import time
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("langgraph")
+
+import agent
+
+
+def sync_tool(name, seconds, gate=None):
+    def func(query):
+        if gate is not None:
+            gate.wait(timeout=10)
+        time.sleep(seconds)
+        return f"{name}: {query}"
+    return SimpleNamespace(name=name, func=func, coroutine=None)
+
+
+def async_tool(name, seconds):
+    async def coroutine(query):
+        await asyncio.sleep(seconds)
+        return f"{name}: {query}"
+    return SimpleNamespace(name=name, func=None, coroutine=coroutine)
+
+
+@pytest.fixture
+def tools(monkeypatch):
+    registry = {}
+    monkeypatch.setattr(agent, "find_tool", registry.get)
+    return registry
+
+
+def calls(*names):
+    return [{"name": name, "args": {"query": f"q{i}"}} for i, name in enumerate(names)]
+
+
+def test_results_keep_call_order(tools):
+    tools.update(slow=sync_tool("slow", 0.3), fast=sync_tool("fast", 0.0), medium=sync_tool("medium", 0.25))
+
+    started = time.monotonic()
+    results = agent.run_tool_calls(calls("slow", "fast", "unknown", "medium"))
+
+    assert results == [("slow", "slow: q0"), ("fast", "fast: q1"), ("medium", "medium: q3")]
+    # Run side by side, not one after another
+    assert time.monotonic() - started < 0.5
+
+
+def test_async_results_keep_call_order(tools):
+    tools.update(slow=async_tool("slow", 0.3), fast=async_tool("fast", 0.0), threaded=sync_tool("threaded", 0.1))
+
+    results = asyncio.run(agent.arun_tool_calls(calls("slow", "threaded", "unknown", "fast")))
+
+    assert results == [("slow", "slow: q0"), ("threaded", "threaded: q1"), ("fast", "fast: q3")]
+
+
+def test_call_past_the_deadline_returns_its_timeout_message(tools, monkeypatch):
+    monkeypatch.setattr(agent, "TOOL_CALL_TIMEOUT", 0.2)
+    gate = threading.Event()
+    tools.update(stuck=sync_tool("stuck", 0.0, gate), fast=sync_tool("fast", 0.0))
+
+    started = time.monotonic()
+    try:
+        results = agent.run_tool_calls(calls("stuck", "fast"))
+    finally:
+        gate.set()
+
+    assert time.monotonic() - started < 1.0
+    assert results == [("stuck", "Error: stuck timed out after 0.2s"), ("fast", "fast: q1")]
+
+
+def test_async_call_past_the_deadline_returns_its_timeout_message(tools, monkeypatch):
+    monkeypatch.setattr(agent, "TOOL_CALL_TIMEOUT", 0.2)
+    tools.update(stuck=async_tool("stuck", 30), fast=async_tool("fast", 0.0))
+
+    started = time.monotonic()
+    results = asyncio.run(agent.arun_tool_calls(calls("stuck", "fast")))
+
+    assert time.monotonic() - started < 1.0
+    assert results == [("stuck", "Error: stuck timed out after 0.2s"), ("fast", "fast: q1")]
@@ -1,6 +1,6 @@
 import streamlit as st
-import json
-import re
+import time
+import functools
 from datetime import datetime
 from typing import Dict, Optional, Any
 import os
@@ -12,15 +12,19 @@ from pathlib import Path
 src_path = Path(__file__).parent.parent / "src"
 sys.path.insert(0, str(src_path))
 
+from jobs import JobRunner
+from cache import hash_key
+from ingest import extract_pdf_bytes
+from schemas import parse_json_object
+
 try:
-    from agent import app as workflow
-except ValueError as e:
-    st.error(f"⚠️ Configuration Error: {e}")
-    st.info("Please set your Google API Key in the sidebar.")
-    workflow = None
+    # Cheap: the agent builds its Gemini client, tools and graph on first use,
+    # so a key entered in the sidebar is picked up by the first analysis
+    from agent import stream_deal, reanalysis_state, get_app, resources_for, DealResources
+    workflow_available = True
 except ImportError as e:
     st.error(f"Failed to import agent module: {e}")
-    workflow = None
+    workflow_available = False
 
 # Page config
 st.set_page_config(
@@ -840,30 +844,8 @@ def clean_json(text: str) -> Optional[Dict[str, Any]]:
     if not text or not isinstance(text, str):
         return None
     
-    # Remove markdown code blocks
-    text = re.sub(r'```json\s*', '', text)
-    text = re.sub(r'```\s*', '', text)
-    text = text.strip()
-    
-    # Try to find JSON object in the text
-    json_match = re.search(r'\{.*\}', text, re.DOTALL)
-    if json_match:
-        json_str = json_match.group(0)
-    else:
-        json_str = text
-    
-    # Try parsing
-    try:
-        return json.loads(json_str)
-    except json.JSONDecodeError:
-        # Try to fix common issues
-        json_str = re.sub(r',\s*}', '}', json_str)
-        json_str = re.sub(r',\s*\]', ']', json_str)
-        
-        try:
-            return json.loads(json_str)
-        except json.JSONDecodeError:
-            return None
+    # The same parser the prompt budget and the schema check use, so a report reads the same everywhere
+    return parse_json_object(text)
 
 
 def extract_metrics(analysis_text: str, analysis_type: str) -> Dict[str, Any]:
@@ -871,7 +853,11 @@ def extract_metrics(analysis_text: str, analysis_type: str) -> Dict[str, Any]:
     Extract key metrics from analysis text.
     Returns a dict with extracted values or defaults.
     """
-    parsed = clean_json(analysis_text)
+    return metrics_from_report(clean_json(analysis_text), analysis_type)
+
+
+def metrics_from_report(parsed: Optional[Dict[str, Any]], analysis_type: str) -> Dict[str, Any]:
+    """extract_metrics for a report that is already parsed"""
     metrics = {}
     
     if parsed:
@@ -981,6 +967,42 @@ def get_verdict_color(memo: str) -> tuple:
         return ("memo-header-maybe", "📋 VERDICT")
 
 
+# Pipeline nodes in display order, with their live status labels
+NODE_LABELS = {
+    "research_agent": "🔍 Company Researcher",
+    "market_agent": "🕵️ Market Analyst",
+    "product_agent": "🛡️ Product Analyst",
+    "traction_agent": "📉 Traction Analyst",
+    "debate_agent": "⚔️ Debate Moderator",
+    "questions_agent": "🎯 Questions Generator",
+    "synthesizer_agent": "📝 GP Synthesizer",
+}
+
+
+def render_node_status(placeholder, label: str, state: str, seconds: Optional[float] = None):
+    """Render one pipeline row: pending, running or done"""
+    if state == "running":
+        placeholder.markdown(f"🔄 **{label}** — running...")
+    elif state == "done":
+        placeholder.markdown(f"✅ **{label}** — done in {seconds:.1f}s" if seconds is not None else f"✅ **{label}** — done")
+    else:
+        placeholder.markdown(f"<span style='color: #94a3b8;'>⏳ {label}</span>", unsafe_allow_html=True)
+
+
+def current_resources(google_key: str, serper_key: str) -> "DealResources":
+    """
+    Gemini/Serper clients (and their rate limiter and caches) for the sidebar's keys. agent keeps
+    one per key fingerprint and model settings per process, so every rerun and session shares it.
+    """
+    return resources_for(google_key, serper_key)
+
+
+@st.cache_resource
+def get_job_runner() -> JobRunner:
+    """One bounded pool of pipeline workers per server process, shared by every browser session"""
+    return JobRunner(functools.partial(stream_deal, graph=get_app()))
+
+
 def generate_report_text(state: Dict[str, str]) -> str:
     """
     Generate a formatted text report from the full state.
@@ -1031,6 +1053,41 @@ END OF REPORT
     return report
 
 
+# Result fields the results page derives its views from
+VIEW_FIELDS = ("pitch_text", "market_analysis", "product_analysis", "traction_analysis",
+               "market_data", "product_data", "traction_data",
+               "debate_transcript", "questions_to_reconsider", "final_memo")
+
+
+def build_result_views(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Everything the results page derives from a result: parsed reports, metrics, debate, verdict, report text"""
+    # The analysts' reports arrive already parsed against their schemas; only results saved
+    # before structured output existed need their JSON recovered from the text
+    parsed = {
+        kind: result.get(f"{kind}_data") or clean_json(result.get(f"{kind}_analysis", ""))
+        for kind in ("market", "product", "traction")
+    }
+    return {
+        "parsed": parsed,
+        "metrics": {kind: metrics_from_report(report, kind) for kind, report in parsed.items()},
+        "debate_messages": parse_debate_transcript(result.get('debate_transcript', '')),
+        "verdict": get_verdict_color(result.get('final_memo', '')),
+        "report_text": generate_report_text(result)
+    }
+
+
+def result_views(result: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Derived views of a result, built once per result content and kept in session state next
+    to it, so the reruns every widget interaction triggers don't re-parse the reports
+    """
+    key = hash_key({field: result.get(field) for field in VIEW_FIELDS})
+    views = st.session_state.get("analysis_views")
+    if views is None or views["key"] != key:
+        views = st.session_state.analysis_views = {"key": key, **build_result_views(result)}
+    return views
+
+
 # Ultimate Sidebar
 with st.sidebar:
     st.markdown("""
@@ -1122,6 +1179,26 @@ with st.container():
         st.info("💡 **Quick Mode**: Just enter the company name and URL. Our AI will research and generate a pitch deck automatically before analysis.")
     
     with input_tab2:
+        pitch_pdf = st.file_uploader(
+            "Upload Pitch Deck (PDF)",
+            type=["pdf"],
+            help="The deck's text is extracted into the box below, where you can review and edit it",
+            key="pitch_pdf"
+        )
+        if pitch_pdf is not None:
+            try:
+                with st.spinner("Extracting pitch deck text..."):
+                    deck = extract_pdf_bytes(pitch_pdf.getbuffer())
+            except Exception as e:
+                st.error(f"Error reading PDF: {e}")
+            else:
+                # Fill the text box once per new deck, so edits made afterwards are kept
+                if st.session_state.get("pitch_pdf_hash") != deck["hash"]:
+                    st.session_state.pitch_pdf_hash = deck["hash"]
+                    st.session_state.full_pitch = deck["text"]
+                source = "cached" if deck["cached"] else f"extracted in {deck['seconds']:.1f}s"
+                st.caption(f"📄 {pitch_pdf.name}: {deck['pages']} pages, {len(deck['text']):,} characters ({source})")
+        
         pitch_text = st.text_area(
             "Startup Pitch Deck",
             height=240,
@@ -1146,6 +1223,8 @@ if "analysis_result" not in st.session_state:
     st.session_state.analysis_result = None
 if "analysis_complete" not in st.session_state:
     st.session_state.analysis_complete = False
+if "job_id" not in st.session_state:
+    st.session_state.job_id = None
 
 # Run analysis
 if run_analysis:
@@ -1166,11 +1245,12 @@ if run_analysis:
         st.error("⚠️ Please enter either:\n• Company name and URL (Quick Mode), OR\n• Full pitch deck text")
         input_mode = None
     
-    if input_mode and workflow is None:
+    if input_mode and not (workflow_available and google_key):
         st.error("⚠️ Analysis workflow is not available. Please check your API key configuration in the sidebar.")
     elif input_mode:
         # Prepare initial state
         initial_state = {
+            "deal_id": "",  # Assigned when the graph starts
             "company_name": company_name,
             "company_url": company_url,
             "raw_input": raw_input,
@@ -1178,40 +1258,85 @@ if run_analysis:
             "market_analysis": "",
             "product_analysis": "",
             "traction_analysis": "",
+            "market_data": {},
+            "product_data": {},
+            "traction_data": {},
             "debate_transcript": "",
             "questions_to_reconsider": "",
-            "final_memo": ""
+            "final_memo": "",
+            "node_timings": [],
+            "node_fingerprints": {},
+            "failed_nodes": {},
+            "prompt_budget": []
         }
         
-        # Execute workflow with status updates
-        with st.status("🔄 Running multi-agent analysis...", expanded=True) as status:
-            try:
-                if input_mode == "quick":
-                    status.update(
-                        label="🔍 Step 1/7: Researching company from web sources...",
-                        state="running"
-                    )
-                else:
-                    status.update(
-                        label="🔄 Running analysis pipeline: Research → Market → Product → Traction → Debate → Questions → Synthesis...",
-                        state="running"
-                    )
-                
-                result = workflow.invoke(initial_state)
-                
-                status.update(label="✅ Analysis complete!", state="complete")
-                
-                st.session_state.analysis_result = result
-                st.session_state.analysis_complete = True
+        # Hand the run to the background worker pool; this session just polls the job below
+        # Each job runs with the clients for the keys this session entered
+        st.session_state.job_id = get_job_runner().submit(
+            initial_state, resources=current_resources(google_key, serper_key)
+        )
+        st.session_state.analysis_complete = False
+        st.rerun()
+
+# Poll the running job, if any
+if st.session_state.get("job_id"):
+    job = get_job_runner().get(st.session_state.job_id)
+    
+    if job is None:
+        st.session_state.job_id = None
+    elif job["status"] == "done":
+        st.session_state.analysis_result = job["result"]
+        st.session_state.analysis_complete = True
+        st.session_state.job_id = None
+        st.rerun()
+    elif job["status"] == "failed":
+        # Completed nodes are checkpointed under the job id, so a retry only reruns what's left
+        finished = [NODE_LABELS[n] for n, info in job["progress"].get("nodes", {}).items()
+                    if info.get("state") == "done" and n in NODE_LABELS]
+        st.error(f"Analysis failed: {job['error']}")
+        if finished:
+            st.caption(f"Completed before the failure: {', '.join(finished)}")
+        resume_col, dismiss_col = st.columns(2)
+        with resume_col:
+            if st.button("🔁 Resume from last completed step", use_container_width=True):
+                get_job_runner().retry(job["id"])
                 st.rerun()
-                
-            except Exception as e:
-                status.update(label=f"❌ Error: {str(e)}", state="error")
-                st.error(f"Analysis failed: {str(e)}")
+        with dismiss_col:
+            if st.button("Dismiss", use_container_width=True):
+                st.session_state.job_id = None
+                st.rerun()
+    else:
+        progress = job["progress"]
+        nodes = progress.get("nodes", {})
+        finished = sum(1 for n in nodes.values() if n.get("state") == "done")
+        
+        if job["status"] == "queued":
+            label = f"⏳ Queued (position {job['position']}) — waiting for a free pipeline worker..."
+        else:
+            running = [NODE_LABELS[n] for n, info in nodes.items() if info.get("state") == "running" and n in NODE_LABELS]
+            label = f"🔄 Step {finished + 1}/7: {', '.join(running) or 'Starting'} working..."
+        
+        with st.status(label, expanded=True, state="running"):
+            for node, node_label in NODE_LABELS.items():
+                info = nodes.get(node, {})
+                render_node_status(st.empty(), node_label, info.get("state", "pending"), info.get("seconds"))
+            
+            live_node = progress.get("live_node")
+            if live_node in NODE_LABELS and progress.get("live_text"):
+                st.markdown("---")
+                st.markdown(f"**{NODE_LABELS[live_node]}** is writing...")
+                # Only the tail is kept; the full text lands in the results
+                st.code(progress["live_text"], language=None)
+            
+            st.caption(f"Job `{job['id']}` — you can keep using the page; results appear here when ready.")
+        
+        time.sleep(1)
+        st.rerun()
 
 # Display results if analysis is complete
 if st.session_state.analysis_complete and st.session_state.analysis_result:
     result = st.session_state.analysis_result
+    views = result_views(result)
     
     st.markdown("---")
     
@@ -1223,9 +1348,9 @@ if st.session_state.analysis_complete and st.session_state.analysis_result:
     """, unsafe_allow_html=True)
     
     # Ultimate Metrics Display - Now includes traction
-    market_metrics = extract_metrics(result.get('market_analysis', ''), "market")
-    product_metrics = extract_metrics(result.get('product_analysis', ''), "product")
-    traction_metrics = extract_metrics(result.get('traction_analysis', ''), "traction")
+    market_metrics = views["metrics"]["market"]
+    product_metrics = views["metrics"]["product"]
+    traction_metrics = views["metrics"]["traction"]
     
     col1, col2, col3 = st.columns(3)
     
@@ -1306,7 +1431,7 @@ if st.session_state.analysis_complete and st.session_state.analysis_result:
     </div>
     """, unsafe_allow_html=True)
     
-    debate_messages = parse_debate_transcript(result.get('debate_transcript', ''))
+    debate_messages = views["debate_messages"]
     
     if debate_messages:
         chat_container = st.container()
@@ -1372,7 +1497,7 @@ if st.session_state.analysis_complete and st.session_state.analysis_result:
             market_analysis_raw = result.get('market_analysis', '')
             
             # Try to parse as JSON first
-            market_parsed = clean_json(market_analysis_raw)
+            market_parsed = views["parsed"]["market"]
             
             if market_parsed:
                 st.json(market_parsed)
@@ -1397,7 +1522,7 @@ if st.session_state.analysis_complete and st.session_state.analysis_result:
                 st.info("The product analysis field appears to be empty. This might indicate an issue with the agent workflow.")
             else:
                 # Try to parse as JSON first
-                product_parsed = clean_json(product_analysis_raw)
+                product_parsed = views["parsed"]["product"]
                 
                 if product_parsed:
                     st.json(product_parsed)
@@ -1419,7 +1544,7 @@ if st.session_state.analysis_complete and st.session_state.analysis_result:
             st.info("The traction analysis field appears to be empty.")
         else:
             # Try to parse as JSON first
-            traction_parsed = clean_json(traction_analysis_raw)
+            traction_parsed = views["parsed"]["traction"]
             
             if traction_parsed:
                 st.json(traction_parsed)
@@ -1461,16 +1586,33 @@ if st.session_state.analysis_complete and st.session_state.analysis_result:
     """, unsafe_allow_html=True)
     
     final_memo = result.get('final_memo', '')
-    color_class, verdict_text = get_verdict_color(final_memo)
+    color_class, verdict_text = views["verdict"]
     
     st.markdown(f'<div class="final-memo-container">', unsafe_allow_html=True)
     st.markdown(f'<div class="{color_class}">{verdict_text}</div>', unsafe_allow_html=True)
     st.markdown(final_memo)
     st.markdown('</div>', unsafe_allow_html=True)
     
+    # Incremental re-run: only nodes whose inputs changed are recomputed
+    st.markdown("---")
+    with st.expander("✏️ Edit Pitch & Re-analyze", expanded=False):
+        edited_pitch = st.text_area(
+            "Pitch text",
+            value=result.get('pitch_text', ''),
+            height=300,
+            help="Update the pitch (e.g. with new traction numbers). Research is skipped, and agents whose inputs didn't change reuse their previous output."
+        )
+        if st.button("🔁 Re-analyze with Edits", use_container_width=True, disabled=not (workflow_available and google_key)):
+            st.session_state.job_id = get_job_runner().submit(
+                reanalysis_state(result, {"pitch_text": edited_pitch}),
+                resources=current_resources(google_key, serper_key)
+            )
+            st.session_state.analysis_complete = False
+            st.rerun()
+    
     # Ultimate Download Button
     st.markdown("---")
-    report_text = generate_report_text(result)
+    report_text = views["report_text"]
     
     col1, col2, col3 = st.columns([1, 1, 1])
     with col2:
@@ -1481,6 +1623,10 @@ if st.session_state.analysis_complete and st.session_state.analysis_result:
             mime="text/plain",
             use_container_width=True
         )
+        
+        tokens_saved = sum(u.get("tokens_saved", 0) for u in result.get("prompt_budget") or [])
+        if tokens_saved:
+            st.caption(f"Prompt budgeting saved ~{tokens_saved:,} input tokens on this run")
 
 # Ultimate Footer
 st.markdown("---")